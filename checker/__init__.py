@@ -1,5 +1,7 @@
 """Fraud checker modules."""
-from checker.fraud_checker import FraudChecker, Transaction, FraudFlag
+from checker.fraud_checker import (
+    FraudChecker, Transaction, TransactionBatch, FraudFlag, RowStore, RowRefs, to_micros, format_timestamp
+)
 from checker.rule_based_checker import RuleBasedChecker
 from checker.model_based_checker import ModelBasedChecker
 from checker.predicate_checker import (
@@ -11,19 +13,34 @@ from checker.predicate_checker import (
     AggregatePredicate,
     PredicateBasedChecker
 )
-from checker.window_checker import WindowChecker
+from checker.sql_checker import SQLChecker
+from checker.window_checker import WindowChecker, WindowSpec
 from checker.velocity_checker import VelocityChecker
+from checker.quantile_sketch import DDSketch, UserQuantileSketches
 from checker.high_value_anomaly_checker import HighValueAnomalyChecker
 from checker.merchant_repetition_checker import MerchantRepetitionChecker
 from checker.geographic_shift_checker import GeographicShiftChecker
 from checker.nighttime_checker import NighttimeChecker
 from checker.unusual_merchant_checker import UnusualMerchantChecker
+from checker.streaming_window_checker import (
+    SlidingWindow,
+    StreamingWindowChecker,
+    StreamingVelocityChecker,
+    StreamingGeographicShiftChecker,
+    StreamingMerchantRepetitionChecker
+)
+from checker.llm_cache import LLMResponseCache
 from checker.llm_checker import LLMChecker
 
 __all__ = [
     'FraudChecker',
     'Transaction',
+    'TransactionBatch',
     'FraudFlag',
+    'RowStore',
+    'RowRefs',
+    'to_micros',
+    'format_timestamp',
     'RuleBasedChecker',
     'ModelBasedChecker',
     'Predicate',
@@ -33,12 +50,22 @@ __all__ = [
     'NotPredicate',
     'AggregatePredicate',
     'PredicateBasedChecker',
+    'SQLChecker',
     'WindowChecker',
+    'WindowSpec',
     'VelocityChecker',
+    'DDSketch',
+    'UserQuantileSketches',
     'HighValueAnomalyChecker',
     'MerchantRepetitionChecker',
     'GeographicShiftChecker',
     'NighttimeChecker',
     'UnusualMerchantChecker',
+    'SlidingWindow',
+    'StreamingWindowChecker',
+    'StreamingVelocityChecker',
+    'StreamingGeographicShiftChecker',
+    'StreamingMerchantRepetitionChecker',
+    'LLMResponseCache',
     'LLMChecker',
 ]
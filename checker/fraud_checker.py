@@ -1,24 +1,451 @@
 """Fraud checker interfaces and data models."""
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, TYPE_CHECKING
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Iterator, Mapping, Sequence, Union, overload, TYPE_CHECKING
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import threading
+import numpy as np
 
 if TYPE_CHECKING:
     from duckdb_repository import DuckDBRepository
 
+_EPOCH = datetime(1970, 1, 1)
+US_PER_HOUR = 3_600_000_000
+
+TimestampLike = Union[int, str, datetime, np.datetime64]
+
+
+def to_micros(value: TimestampLike) -> int:
+    """Epoch microseconds of a timestamp given as epoch micros, ISO text, datetime or datetime64.
+
+    Naive values are taken as UTC, as DuckDB's TIMESTAMP is.
+    """
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, np.datetime64):
+        return int(value.astype('datetime64[us]').astype(np.int64))
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        delta = value - _EPOCH
+        return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+    raise TypeError(f"Not a timestamp: {value!r}")
+
+
+def format_timestamp(epoch_us: int) -> str:
+    """Render epoch microseconds the way str(datetime) does."""
+    return str(_EPOCH + timedelta(microseconds=epoch_us))
+
 
 @dataclass
 class Transaction:
+    """One transaction; timestamp is epoch microseconds.
+
+    Timestamps given as text, datetime or datetime64 are converted on
+    construction. Sinks format them for output.
+    """
     user_id: str
-    timestamp: str
+    timestamp: int
     merchant_name: str
     amount: float
+    # Set for rows read from a table with a row_id column; see DuckDBRepository.insert_from_csv.
+    row_id: Optional[int] = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if type(self.timestamp) is not int:
+            self.timestamp = to_micros(self.timestamp)
+
+    @property
+    def hour(self) -> int:
+        """Hour of day, 0-23."""
+        return self.timestamp // US_PER_HOUR % 24
+
+
+class EncodedColumn:
+    """Dictionary-encoded column: values[codes] reconstructs the rows."""
+
+    def __init__(self, codes: np.ndarray, values: np.ndarray):
+        self.codes = codes
+        self.values = values
+
+    @classmethod
+    def encode(cls, column: Sequence[Any]) -> "EncodedColumn":
+        dictionary: Dict[Any, int] = {}
+        codes = np.fromiter((dictionary.setdefault(v, len(dictionary)) for v in column),
+                            dtype=np.int32, count=len(column))
+        values = np.empty(len(dictionary), dtype=object)
+        values[:] = list(dictionary)
+        return cls(codes, values)
+
+    def decode(self) -> np.ndarray:
+        return self.values[self.codes]
+
+    def take(self, indices: np.ndarray) -> "EncodedColumn":
+        return EncodedColumn(self.codes[indices], self.values)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def format_timestamps(epoch_us: np.ndarray) -> np.ndarray:
+    """Render epoch microseconds the way str(datetime) does."""
+    if len(epoch_us) and not (epoch_us % 1_000_000).any():
+        text = np.datetime_as_string(epoch_us.astype('datetime64[us]').astype('datetime64[s]'))
+        return np.char.replace(text, 'T', ' ').astype(object)
+    return np.array([format_timestamp(int(us)) for us in epoch_us], dtype=object)
+
+
+def make_transactions(user_id: np.ndarray, timestamp: np.ndarray, merchant_name: np.ndarray,
+                      amount: np.ndarray, row_id: Optional[np.ndarray] = None) -> List[Transaction]:
+    """Transactions from decoded columns, timestamps in epoch microseconds."""
+    row_ids = row_id.tolist() if row_id is not None else [None] * len(amount)
+    return [
+        Transaction(user_id=u, timestamp=t, merchant_name=m, amount=a, row_id=r)
+        for u, t, m, a, r in zip(user_id.tolist(), timestamp.tolist(),
+                                 merchant_name.tolist(), amount.tolist(), row_ids)
+    ]
+
+
+class TransactionBatch(Sequence[Transaction]):
+    """Columnar transactions backed by typed arrays.
+
+    user_id and merchant_name are dictionary-encoded, timestamp is int64 epoch
+    microseconds and amount is float64. Indexing returns Transaction views built
+    on demand, so code written against List[Transaction] keeps working.
+
+    Batches read from a table with row ids carry them in row_id, and with a
+    store, refs() hands out flagged rows as references into it.
+    """
+
+    FIELDS = ('user_id', 'timestamp', 'merchant_name', 'amount')
+
+    def __init__(self, user_id: EncodedColumn, timestamp: np.ndarray,
+                 merchant_name: EncodedColumn, amount: np.ndarray,
+                 row_id: Optional[np.ndarray] = None, store: Optional["RowStore"] = None):
+        self.user_id = user_id
+        self.timestamp = timestamp
+        self.merchant_name = merchant_name
+        self.amount = amount
+        self.row_id = row_id
+        self.store = store
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Any],
+                     store: Optional["RowStore"] = None) -> "TransactionBatch":
+        """Build from arrays keyed by field name (e.g. DuckDB fetchnumpy output).
+
+        A row_id column is kept; store is only used when there is one.
+        """
+        def encoded(column: Any) -> EncodedColumn:
+            return column if isinstance(column, EncodedColumn) else EncodedColumn.encode(column)
+
+        timestamp = np.asarray(columns['timestamp'])
+        if np.issubdtype(timestamp.dtype, np.datetime64):
+            timestamp = timestamp.astype('datetime64[us]').view(np.int64)
+        elif timestamp.dtype == object:
+            timestamp = np.array(timestamp, dtype='datetime64[us]').view(np.int64)
+        row_id = np.asarray(columns['row_id'], dtype=np.int64) if 'row_id' in columns else None
+
+        return cls(
+            user_id=encoded(columns['user_id']),
+            timestamp=timestamp.astype(np.int64, copy=False),
+            merchant_name=encoded(columns['merchant_name']),
+            amount=np.asarray(columns['amount'], dtype=np.float64),
+            row_id=row_id,
+            store=store if row_id is not None else None,
+        )
+
+    @classmethod
+    def from_transactions(cls, transactions: Sequence[Transaction]) -> "TransactionBatch":
+        return cls.from_columns({
+            'user_id': [t.user_id for t in transactions],
+            'timestamp': np.array([t.timestamp for t in transactions], dtype=np.int64),
+            'merchant_name': [t.merchant_name for t in transactions],
+            'amount': [t.amount for t in transactions],
+        })
+
+    @classmethod
+    def from_repo(cls, repo: "DuckDBRepository", table_name: str = "transactions") -> "TransactionBatch":
+        """Load a table ordered by (user_id, timestamp).
+
+        Dictionary codes are computed inside DuckDB, so no per-row Python strings
+        are created; only the distinct user and merchant values cross over.
+        Row ids, when the table has them, refer into repo.row_store.
+        """
+        has_row_ids = repo.has_row_ids(table_name)
+        data = repo.fetch_numpy(f"""
+            SELECT
+                {'row_id,' if has_row_ids else ''}
+                CAST(DENSE_RANK() OVER (ORDER BY user_id) - 1 AS INTEGER) AS user_code,
+                epoch_us(timestamp) AS timestamp,
+                CAST(DENSE_RANK() OVER (ORDER BY merchant_name) - 1 AS INTEGER) AS merchant_code,
+                CAST(amount AS DOUBLE) AS amount
+            FROM {table_name}
+            ORDER BY user_id, timestamp
+        """)
+        users = repo.fetch_numpy(
+            f"SELECT DISTINCT user_id FROM {table_name} ORDER BY user_id")['user_id']
+        merchants = repo.fetch_numpy(
+            f"SELECT DISTINCT merchant_name FROM {table_name} ORDER BY merchant_name")['merchant_name']
+
+        return cls(
+            user_id=EncodedColumn(np.asarray(data['user_code']), np.asarray(users, dtype=object)),
+            timestamp=np.asarray(data['timestamp'], dtype=np.int64),
+            merchant_name=EncodedColumn(np.asarray(data['merchant_code']),
+                                        np.asarray(merchants, dtype=object)),
+            amount=np.asarray(data['amount'], dtype=np.float64),
+            row_id=np.asarray(data['row_id'], dtype=np.int64) if has_row_ids else None,
+            store=repo.row_store if has_row_ids else None,
+        )
+
+    @classmethod
+    def iter_repo(cls, repo: "DuckDBRepository", table_name: str = "transactions",
+                  batch_size: Optional[int] = None) -> Iterator["TransactionBatch"]:
+        """Stream a table as batches ordered by (user_id, timestamp).
+
+        Batches hold at most batch_size rows, the repository's default when
+        None. Row ids, when the table has them, refer into repo.row_store.
+        """
+        row_id = "row_id, " if repo.has_row_ids(table_name) else ""
+        query = f"""
+        SELECT {row_id}user_id, timestamp, merchant_name, amount
+        FROM {table_name}
+        ORDER BY user_id, timestamp
+        """
+        batches = repo.iter_batches(query) if batch_size is None else repo.iter_batches(query, batch_size)
+        for columns in batches:
+            yield cls.from_columns(columns, store=repo.row_store)
+
+    def column(self, field: str) -> Any:
+        """Column for predicate evaluation; timestamps stay epoch microseconds."""
+        return getattr(self, field)
+
+    def columns(self) -> "BatchColumns":
+        return BatchColumns(self)
+
+    def take(self, indices: np.ndarray) -> "TransactionBatch":
+        return TransactionBatch(
+            user_id=self.user_id.take(indices),
+            timestamp=self.timestamp[indices],
+            merchant_name=self.merchant_name.take(indices),
+            amount=self.amount[indices],
+            row_id=self.row_id[indices] if self.row_id is not None else None,
+            store=self.store,
+        )
+
+    def row(self, index: int) -> Transaction:
+        return Transaction(
+            user_id=self.user_id.values[self.user_id.codes[index]],
+            timestamp=int(self.timestamp[index]),
+            merchant_name=self.merchant_name.values[self.merchant_name.codes[index]],
+            amount=float(self.amount[index]),
+            row_id=int(self.row_id[index]) if self.row_id is not None else None,
+        )
+
+    def rows(self, indices: Sequence[int]) -> List[Transaction]:
+        """Materialize the given rows, decoding each column in one vectorized pass."""
+        picked = self.take(np.asarray(indices, dtype=np.int64))
+        return make_transactions(picked.user_id.decode(), picked.timestamp,
+                                 picked.merchant_name.decode(), picked.amount, picked.row_id)
+
+    def refs(self, indices: Sequence[int]) -> Sequence[Transaction]:
+        """The given rows as RowRefs when the batch has a store, else materialized.
+
+        The rows are added to the store, which keeps each row id once.
+        """
+        if self.store is None:
+            return self.rows(indices)
+        picked = self.take(np.asarray(indices, dtype=np.int64))
+        self.store.add(picked)
+        return RowRefs(self.store, picked.row_id)
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    @overload
+    def __getitem__(self, index: int) -> Transaction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TransactionBatch": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Transaction, "TransactionBatch"]:
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TransactionBatch index out of range")
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+
+class BatchColumns(Mapping[str, Any]):
+    """Lazy field -> column view over a TransactionBatch."""
+
+    def __init__(self, batch: TransactionBatch):
+        self._batch = batch
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in TransactionBatch.FIELDS:
+            raise KeyError(field)
+        return self._batch.column(field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(TransactionBatch.FIELDS)
+
+    def __len__(self) -> int:
+        return len(TransactionBatch.FIELDS)
+
+
+class RowStore:
+    """Flagged rows kept once per row id, in columnar chunks sorted by id.
+
+    Checkers add the rows they flag and hand out RowRefs, so a row flagged
+    by several checkers is held once however many flags refer to it. Each
+    add() becomes a chunk of the rows not stored yet; the chunks are merged
+    into one past MAX_CHUNKS and before lookups. Safe to share between
+    checker threads.
+    """
+
+    MAX_CHUNKS = 16
+
+    def __init__(self) -> None:
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        self._lock = threading.Lock()
+
+    def add(self, batch: TransactionBatch) -> None:
+        assert batch.row_id is not None, "only rows with ids can be stored"
+        with self._lock:
+            new = np.ones(len(batch), dtype=bool)
+            for chunk in self._chunks:
+                new &= ~_contains(chunk['row_id'], batch.row_id)
+            row_ids, first = np.unique(batch.row_id[new], return_index=True)
+            if not len(row_ids):
+                return
+            picked = batch.take(np.flatnonzero(new)[first])
+            self._chunks.append({
+                'row_id': row_ids,
+                'user_id': picked.user_id.decode(),
+                'timestamp': picked.timestamp,
+                'merchant_name': picked.merchant_name.decode(),
+                'amount': picked.amount,
+            })
+            if len(self._chunks) > self.MAX_CHUNKS:
+                self._chunks = [_merge_chunks(self._chunks)]
+
+    def columns(self, row_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """The stored rows with the given ids, in that order; KeyError for unknown ids."""
+        with self._lock:
+            if len(self._chunks) > 1:
+                self._chunks = [_merge_chunks(self._chunks)]
+            chunk = self._chunks[0] if self._chunks else _empty_chunk()
+            positions = np.searchsorted(chunk['row_id'], row_ids)
+            found = _contains(chunk['row_id'], row_ids, positions)
+            if not found.all():
+                raise KeyError(f"Row ids not in the store: {row_ids[~found][:5].tolist()}")
+            return {name: row_ids if name == 'row_id' else column[positions]
+                    for name, column in chunk.items()}
+
+    def rows(self, row_ids: np.ndarray) -> List[Transaction]:
+        columns = self.columns(np.asarray(row_ids, dtype=np.int64))
+        return make_transactions(columns['user_id'], columns['timestamp'],
+                                 columns['merchant_name'], columns['amount'], columns['row_id'])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(chunk['row_id']) for chunk in self._chunks)
+
+
+def _contains(sorted_ids: np.ndarray, row_ids: np.ndarray,
+              positions: Optional[np.ndarray] = None) -> np.ndarray:
+    if positions is None:
+        positions = np.searchsorted(sorted_ids, row_ids)
+    if not len(sorted_ids):
+        return np.zeros(len(row_ids), dtype=bool)
+    return sorted_ids[np.minimum(positions, len(sorted_ids) - 1)] == row_ids
+
+
+def _empty_chunk() -> Dict[str, np.ndarray]:
+    return {'row_id': np.empty(0, dtype=np.int64), 'user_id': np.empty(0, dtype=object),
+            'timestamp': np.empty(0, dtype=np.int64), 'merchant_name': np.empty(0, dtype=object),
+            'amount': np.empty(0, dtype=np.float64)}
+
+
+def _merge_chunks(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """One sorted chunk from several, emptying them column by column to bound the extra memory."""
+    row_ids = np.concatenate([chunk['row_id'] for chunk in chunks])
+    order = np.argsort(row_ids, kind='stable')
+    merged = {'row_id': row_ids[order]}
+    del row_ids
+    for name in TransactionBatch.FIELDS:
+        merged[name] = np.concatenate([chunk.pop(name) for chunk in chunks])[order]
+    for chunk in chunks:
+        chunk.clear()
+    return merged
+
+
+class RowRefs(Sequence[Transaction]):
+    """Transactions referred to by row id, materialized from a RowStore on access.
+
+    Nothing is cached: every access builds fresh Transaction objects, so
+    iterate once and keep the result when the rows are needed repeatedly.
+    """
+
+    RESOLVE_BLOCK = 65_536
+
+    def __init__(self, store: RowStore, row_ids: np.ndarray):
+        self.store = store
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    @overload
+    def __getitem__(self, index: int) -> Transaction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "RowRefs": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Transaction, "RowRefs"]:
+        if isinstance(index, slice):
+            return RowRefs(self.store, self.row_ids[index])
+        return self.store.rows(self.row_ids[[index]])[0]
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for start in range(0, len(self.row_ids), self.RESOLVE_BLOCK):
+            yield from self.store.rows(self.row_ids[start:start + self.RESOLVE_BLOCK])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, RowRefs) and other.store is self.store:
+            return np.array_equal(self.row_ids, other.row_ids)
+        if isinstance(other, (RowRefs, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RowRefs({len(self)} rows)"
+
+
+def concat_rows(parts: Sequence[Sequence[Transaction]]) -> Sequence[Transaction]:
+    """Join row sequences; RowRefs into one store stay references."""
+    if parts and all(isinstance(p, RowRefs) and p.store is parts[0].store for p in parts):
+        return RowRefs(parts[0].store, np.concatenate([p.row_ids for p in parts]))
+    return [txn for part in parts for txn in part]
 
 
 @dataclass
 class FraudFlag:
-    """Supports both single-transaction and multi-transaction fraud patterns."""
-    transactions: List[Transaction]
+    """Supports both single-transaction and multi-transaction fraud patterns.
+
+    transactions is a list, or RowRefs when the checker read rows with ids;
+    either way it is a Sequence[Transaction].
+    """
+    transactions: Sequence[Transaction]
     checker_name: str
     reason: str
     confidence_score: float = 0.0
@@ -27,6 +454,19 @@ class FraudFlag:
     def transaction_count(self) -> int:
         return len(self.transactions)
 
+    @property
+    def row_ids(self) -> Optional[np.ndarray]:
+        """Row ids of the flagged transactions when the flag refers to stored rows."""
+        if isinstance(self.transactions, RowRefs):
+            return self.transactions.row_ids
+        return None
+
+    def extend(self, transactions: Sequence[Transaction]) -> None:
+        if isinstance(self.transactions, list) and not isinstance(transactions, RowRefs):
+            self.transactions.extend(transactions)
+        else:
+            self.transactions = concat_rows([self.transactions, transactions])
+
 
 class FraudChecker(ABC):
     def __init__(self, name: str):
@@ -43,8 +483,11 @@ class FraudChecker(ABC):
         return []
 
     @abstractmethod
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
-        """Returns flags for suspicious transactions only."""
+    def check(self, transactions: Sequence[Transaction]) -> List[FraudFlag]:
+        """Returns flags for suspicious transactions only.
+
+        Accepts a List[Transaction] or a columnar TransactionBatch.
+        """
         ...
 
     def __repr__(self) -> str:
@@ -1,6 +1,6 @@
 """Rapid geographic shift checker using DuckDB window functions."""
-from typing import List, Any, Optional, Dict
-from checker.window_checker import WindowChecker
+from typing import List, Any, Optional, Dict, Sequence
+from checker.window_checker import WindowChecker, WindowSpec
 from checker.fraud_checker import Transaction
 
 
@@ -21,24 +21,16 @@ class GeographicShiftChecker(WindowChecker):
             self.time_window_minutes = config.get('time_window_minutes', self.time_window_minutes)
             self.threshold = config.get('threshold', self.threshold)
 
-    def get_window_query(self, table_name: str) -> str:
-        return f"""
-        WITH windowed AS (
-            SELECT
-                user_id, timestamp, merchant_name, amount,
-                COUNT(DISTINCT merchant_name) OVER (
-                    PARTITION BY user_id ORDER BY timestamp
-                    RANGE BETWEEN INTERVAL '{self.time_window_minutes}' MINUTES PRECEDING AND CURRENT ROW
-                ) as distinct_merchants
-            FROM {table_name}
-        ),
-        flagged AS (SELECT DISTINCT user_id FROM windowed WHERE distinct_merchants > {self.threshold})
-        SELECT t.* FROM {table_name} t JOIN flagged f ON t.user_id = f.user_id
-        ORDER BY t.user_id, t.timestamp
-        """
+    def get_window_spec(self) -> WindowSpec:
+        return WindowSpec(
+            partition_by=('user_id',),
+            aggregate="COUNT(DISTINCT merchant_name)",
+            interval=f"'{self.time_window_minutes}' MINUTES",
+            threshold=self.threshold,
+        )
 
     def get_group_key(self, txn: Transaction) -> Any:
         return txn.user_id
 
-    def get_reason(self, group_key: Any, txns: List[Transaction]) -> str:
+    def get_reason(self, group_key: Any, txns: Sequence[Transaction]) -> str:
         return f"Rapid geographic shift: >{self.threshold} merchants in {self.time_window_minutes} min"
@@ -1,38 +1,181 @@
 """High-value anomaly checker using DuckDB median calculation."""
-from typing import List, Dict, Any, Optional
-from checker.rule_based_checker import RuleBasedChecker
+from typing import List, Dict, Any, Optional, Sequence, Set, TYPE_CHECKING
+from checker.sql_checker import SQLChecker
+from checker.rule_based_checker import RowGroups
 from checker.fraud_checker import Transaction, FraudFlag
+from checker.quantile_sketch import UserQuantileSketches, DEFAULT_RELATIVE_ACCURACY
 from duckdb_repository import DuckDBRepository
 
+if TYPE_CHECKING:
+    from query_plan import QueryPlan
 
-class HighValueAnomalyChecker(RuleBasedChecker):
-    """Detects transactions significantly higher than user's median."""
 
-    def __init__(self, name: str = "HighValueAnomalyChecker", multiplier: float = 3.0):
+class HighValueAnomalyChecker(SQLChecker):
+    """Detects transactions significantly higher than user's median.
+
+    With approximate=True, medians come from per-user quantile sketches with
+    the given relative_accuracy instead of an exact MEDIAN. The sketches also
+    let check() run on streamed batches, and with sketch_table set they are
+    saved in the database so incremental runs only fold in new rows. The
+    saved sketches change only in commit_state(), which execute_incremental
+    calls in the transaction that moves its watermark.
+    """
+
+    def __init__(self, name: str = "HighValueAnomalyChecker", multiplier: float = 3.0,
+                 approximate: bool = False,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 sketch_table: Optional[str] = None):
         super().__init__(name)
         self.multiplier = multiplier
+        self.approximate = approximate
+        self.relative_accuracy = relative_accuracy
+        self.sketch_table = sketch_table
+        self.sketches: Optional[UserQuantileSketches] = None
+        self._staged_sketches: Optional[UserQuantileSketches] = None
 
     def initialize(self, historical_transactions: Optional[List[Transaction]] = None,
                    config: Optional[Dict[str, Any]] = None) -> None:
         super().initialize(historical_transactions, config)
         if config:
             self.multiplier = config.get('multiplier', self.multiplier)
+            self.approximate = config.get('approximate', self.approximate)
+            self.relative_accuracy = config.get('relative_accuracy', self.relative_accuracy)
+        if self.approximate and historical_transactions:
+            self._sketches().update([t.user_id for t in historical_transactions],
+                                    [t.amount for t in historical_transactions])
+
+    def plan_relations(self) -> Set[str]:
+        return set() if self.approximate else {'user_stats'}
+
+    def incremental_scope(self) -> str:
+        return 'rows' if self.approximate and self.sketch_table else 'history'
+
+    def check(self, transactions: Sequence[Transaction]) -> List[FraudFlag]:
+        """In approximate mode, fold the batch into the sketches and flag it against them."""
+        if not self.approximate:
+            return super().check(transactions)
+
+        sketches = self._sketches()
+        sketches.update([t.user_id for t in transactions], [t.amount for t in transactions])
+
+        user_groups: Dict[str, List[Transaction]] = {}
+        for txn in transactions:
+            median = sketches.median(txn.user_id)
+            if sketches.count(txn.user_id) >= 2 and txn.amount > median * self.multiplier:
+                user_groups.setdefault(txn.user_id, []).append(txn)
 
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
-        return []
+        return [
+            self.create_flag(txns, self._reason(sketches.median(user_id)), confidence=0.85)
+            for user_id, txns in user_groups.items()
+        ]
 
-    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions") -> List[FraudFlag]:
+    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions",
+                        plan: Optional["QueryPlan"] = None) -> List[FraudFlag]:
         """Find transactions exceeding user's median by multiplier."""
-        query = f"""
-        WITH user_medians AS (
+        if self.approximate:
+            view = self._register_sketch_medians(repo, table_name)
+            try:
+                return self._check_against(repo, table_name, f"""
+                SELECT user_id, median_amount
+                FROM {view}
+                WHERE txn_count >= 2
+                """)
+            finally:
+                repo.unregister(view)
+
+        if plan is not None and plan.user_stats:
+            medians = f"""
+            SELECT user_id, median_amount
+            FROM {plan.user_stats}
+            WHERE txn_count >= 2
+            """
+        else:
+            medians = f"""
             SELECT
                 user_id,
                 MEDIAN(amount) as median_amount
             FROM {table_name}
             GROUP BY user_id
             HAVING COUNT(*) >= 2
-        )
-        SELECT
+            """
+        return self._check_against(repo, table_name, medians)
+
+    def commit_state(self, repo: DuckDBRepository) -> None:
+        """Save the sketches the last check_with_repo built to sketch_table."""
+        if self.sketch_table and self._staged_sketches is not None:
+            self._staged_sketches.save(repo, self.sketch_table)
+        self._staged_sketches = None
+
+    def approximation_report(self, repo: DuckDBRepository,
+                             table_name: str = "transactions") -> Dict[str, int]:
+        """Compare sketch medians with exact medians over table_name.
+
+        Counts the transactions flagged by each path, those only one path
+        flags, and the users whose flag differs between the two.
+        """
+        sketches = UserQuantileSketches(self.relative_accuracy)
+        sketches.update_from_repo(repo, table_name)
+        view = f"_{self.name}_report_medians"
+        repo.register(view, sketches.medians())
+        try:
+            rows = repo.fetch_items(f"""
+            WITH exact AS (
+                SELECT user_id, MEDIAN(amount) AS median_amount
+                FROM {table_name}
+                GROUP BY user_id
+                HAVING COUNT(*) >= 2
+            ),
+            hits AS (
+                SELECT
+                    t.user_id,
+                    t.amount > e.median_amount * {self.multiplier} AS exact_hit,
+                    t.amount > a.median_amount * {self.multiplier} AS approximate_hit
+                FROM {table_name} t
+                JOIN exact e ON t.user_id = e.user_id
+                JOIN {view} a ON t.user_id = a.user_id
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE exact_hit) AS exact_transactions,
+                COUNT(*) FILTER (WHERE approximate_hit) AS approximate_transactions,
+                COUNT(*) FILTER (WHERE exact_hit AND NOT approximate_hit) AS missed_transactions,
+                COUNT(*) FILTER (WHERE approximate_hit AND NOT exact_hit) AS extra_transactions,
+                COUNT(DISTINCT user_id) FILTER (WHERE exact_hit <> approximate_hit) AS differing_flags
+            FROM hits
+            """)
+        finally:
+            repo.unregister(view)
+        return {key: int(value) for key, value in rows[0].items()}
+
+    def _sketches(self) -> UserQuantileSketches:
+        if self.sketches is None:
+            self.sketches = UserQuantileSketches(self.relative_accuracy)
+        return self.sketches
+
+    def _register_sketch_medians(self, repo: DuckDBRepository, table_name: str) -> str:
+        """Fold table_name into the sketches and expose their medians as a view.
+
+        Without sketch_table the sketches are rebuilt from table_name on every
+        call; with it they are loaded and extended with table_name, and kept
+        for commit_state() to save.
+        """
+        if self.sketch_table:
+            self.sketches = UserQuantileSketches.load(repo, self.sketch_table, self.relative_accuracy)
+        else:
+            self.sketches = UserQuantileSketches(self.relative_accuracy)
+        self.sketches.update_from_repo(repo, table_name)
+        if self.sketch_table:
+            self._staged_sketches = self.sketches
+
+        view = f"_{self.name}_medians"
+        repo.register(view, self.sketches.medians())
+        return view
+
+    def _check_against(self, repo: DuckDBRepository, table_name: str,
+                       medians: str) -> List[FraudFlag]:
+        row_id = "t.row_id," if repo.has_row_ids(table_name) else ""
+        query = f"""
+        WITH user_medians AS ({medians})
+        SELECT {row_id}
             t.user_id,
             t.timestamp,
             t.merchant_name,
@@ -44,22 +187,19 @@ class HighValueAnomalyChecker(RuleBasedChecker):
         ORDER BY t.user_id, t.timestamp
         """
 
-        results = repo.fetch_items(query)
-
-        if not results:
-            return []
-
-        all_txns = self.rows_to_transactions(results)
-
-        user_groups: Dict[str, tuple[List[Transaction], float]] = {}
-        for i, txn in enumerate(all_txns):
-            if txn.user_id not in user_groups:
-                user_groups[txn.user_id] = ([], float(results[i]['median_amount']))
-            user_groups[txn.user_id][0].append(txn)
+        user_groups = RowGroups(repo)
+        user_medians: Dict[str, float] = {}
+        for columns in repo.iter_batches(query):
+            medians = columns['median_amount'].tolist()
+            for txn, median in zip(user_groups.transactions(columns), medians):
+                user_medians.setdefault(txn.user_id, float(median))
+                user_groups.add(txn.user_id, txn)
 
         flags: List[FraudFlag] = []
-        for user_id, (txns, median) in user_groups.items():
-            reason = f"Transaction exceeds {self.multiplier}x user median (${median:.2f})"
-            flags.append(self.create_flag(txns, reason, confidence=0.85))
+        for user_id, txns in user_groups.items():
+            flags.append(self.create_flag(txns, self._reason(user_medians[user_id]), confidence=0.85))
 
         return flags
+
+    def _reason(self, median: float) -> str:
+        return f"Transaction exceeds {self.multiplier}x user median (${median:.2f})"
@@ -0,0 +1,150 @@
+"""Content-addressed cache of LLM responses: in-memory LRU in front of SQLite."""
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import sqlite3
+import threading
+import time
+
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_DISK_ENTRIES = 100_000
+DEFAULT_TTL = 7 * 24 * 3600.0
+
+
+def cache_key(formatted_transactions: str, prompt_version: str, model: str) -> str:
+    """sha256 over everything that determines the response."""
+    digest = hashlib.sha256()
+    for part in (prompt_version, model, formatted_transactions):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Caches raw response text by cache_key().
+
+    Lookups go to an in-memory LRU of max_memory_entries first, then to the
+    SQLite file at path (None keeps the cache in memory only). Entries older
+    than ttl seconds are treated as misses and deleted. Once the disk store
+    holds more than max_disk_entries, the least recently used entries are
+    evicted. Each entry also records how long the original request took, so
+    saved_seconds adds up the latency that hits avoided.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_entries: int = DEFAULT_DISK_ENTRIES,
+                 ttl: float = DEFAULT_TTL) -> None:
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT response, latency, created_at FROM llm_responses WHERE key = ?",
+                    (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1], row[2])
+                    self._remember(key, entry)
+
+            if entry is not None and now - entry[2] > self.ttl:
+                self._delete(key)
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.saved_seconds += entry[1]
+            if self._conn is not None:
+                self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            return entry[0]
+
+    def put(self, key: str, response: str, latency: float = 0.0) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, (response, latency, now))
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, latency, now, now))
+            self.evictions += self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+            self.evictions += self._conn.execute("""
+                DELETE FROM llm_responses WHERE key IN (
+                    SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_disk_entries,)).rowcount
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'saved_seconds': self.saved_seconds,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_responses")
+                self._conn.commit()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _remember(self, key: str, entry: Tuple[str, float, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            if self._conn is None:
+                self.evictions += 1
+
+    def _delete(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def __enter__(self) -> "LLMResponseCache":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
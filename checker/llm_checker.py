@@ -1,22 +1,107 @@
 """LLM-based fraud checker using AI analysis."""
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
+import time
 from checker.model_based_checker import ModelBasedChecker
-from checker.fraud_checker import Transaction
+from checker.fraud_checker import Transaction, format_timestamp
+from checker.llm_cache import LLMResponseCache, cache_key
+
+DEFAULT_MODEL = "claude-sonnet-4-5"
+DEFAULT_CHUNK_TOKENS = 8000
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_BACKOFF = 1.0
+
+PROMPT_VERSION = "1"
+PROMPT_TEMPLATE = """Analyze these transactions for fraud patterns. Return ONLY a JSON array of suspicious transaction indices (0-based).
+
+Transactions:
+{transactions}
+
+Look for: velocity spikes, unusual amounts, late-night high values, merchant repetition, geographic shifts.
+
+Return format: {{"suspicious_indices": [1, 5, 7], "reason": "explanation"}}"""
+
+COMPACT_PROMPT_TEMPLATE = """Analyze these transactions for fraud patterns. Return ONLY a JSON array of suspicious transaction indices.
+
+Transactions are grouped per user. Each group starts with "@user first_timestamp"; each row is
+index|seconds since the user's previous transaction|merchant id|amount in dollars.
+Merchant ids are defined in the "merchants" line.
+
+{transactions}
+
+Look for: velocity spikes, unusual amounts, late-night high values, merchant repetition, geographic shifts.
+
+Return format: {{"suspicious_indices": [1, 5, 7], "reason": "explanation"}}"""
+
+ENCODINGS = ('verbose', 'compact')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting: about four characters per token."""
+    return len(text) // 4 + 1
 
 
 class LLMChecker(ModelBasedChecker):
-    """Uses LLM to detect fraud patterns in transactions."""
+    """Uses LLM to detect fraud patterns in transactions.
+
+    Transactions are split into chunks of at most max_chunk_tokens prompt
+    tokens, keeping each user's transactions together where they fit, and
+    the chunks are sent concurrently through the async client. At most
+    max_concurrency requests are in flight; each gets timeout seconds and
+    up to max_retries retries with exponential backoff. A chunk that still
+    fails contributes no flags. base_url points the client at another
+    endpoint, e.g. a local stub server in tests.
+
+    With a cache, each chunk's response is stored under a hash of its
+    formatted transactions, PROMPT_VERSION and the model, so an identical
+    chunk is answered without a request. Bump PROMPT_VERSION whenever
+    PROMPT_TEMPLATE changes.
+
+    encoding='compact' sends a merchant dictionary and per-user rows with
+    time deltas instead of one verbose line per transaction; rows keep
+    their chunk index so responses map back the same way.
+    """
 
-    def __init__(self, name: str = "LLMChecker", api_key: Optional[str] = None):
+    def __init__(self, name: str = "LLMChecker", api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 model: str = DEFAULT_MODEL,
+                 max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 backoff: float = DEFAULT_BACKOFF,
+                 cache: Optional[LLMResponseCache] = None,
+                 encoding: str = 'verbose'):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding!r}, expected one of {ENCODINGS}")
         super().__init__(name)
         self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.cache = cache
+        self.encoding = encoding
 
     def initialize(self, historical_transactions: Optional[List[Transaction]] = None,
                    config: Optional[Dict[str, Any]] = None) -> None:
         super().initialize(historical_transactions, config)
         if config:
             self.api_key = config.get('api_key', self.api_key)
+            self.base_url = config.get('base_url', self.base_url)
+            self.model = config.get('model', self.model)
+            self.max_chunk_tokens = config.get('max_chunk_tokens', self.max_chunk_tokens)
+            self.max_concurrency = config.get('max_concurrency', self.max_concurrency)
+            self.max_retries = config.get('max_retries', self.max_retries)
+            self.timeout = config.get('timeout', self.timeout)
+            self.backoff = config.get('backoff', self.backoff)
+            self.encoding = config.get('encoding', self.encoding)
 
     def predict(self, transactions: List[Transaction]) -> List[tuple[List[Transaction], str, float]]:
         """Send transactions to LLM for fraud detection."""
@@ -26,45 +111,178 @@ class LLMChecker(ModelBasedChecker):
         if not transactions:
             return []
 
-        txn_data = self._format_transactions(transactions)
+        return asyncio.run(self.predict_async(transactions))
+
+    async def predict_async(self, transactions: List[Transaction]) -> List[tuple[List[Transaction], str, float]]:
+        """predict() for callers that already run an event loop."""
+        if not self.api_key or not transactions:
+            return []
 
         try:
             import anthropic
-            client = anthropic.Anthropic(api_key=self.api_key)
+        except ImportError:
+            print("LLM checker error: the anthropic package is not installed")
+            return []
 
-            response = client.messages.create(
-                model="claude-sonnet-4-5",
-                max_tokens=2000,
-                messages=[{
-                    "role": "user",
-                    "content": f"""Analyze these transactions for fraud patterns. Return ONLY a JSON array of suspicious transaction indices (0-based).
+        client = anthropic.AsyncAnthropic(api_key=self.api_key, base_url=self.base_url,
+                                          max_retries=0, timeout=self.timeout)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        chunks = self._chunk_transactions(transactions)
 
-Transactions:
-{txn_data}
+        async def run(chunk: List[int]) -> List[tuple[List[Transaction], str, float]]:
+            async with semaphore:
+                return await self._predict_chunk(client, [transactions[i] for i in chunk])
 
-Look for: velocity spikes, unusual amounts, late-night high values, merchant repetition, geographic shifts.
+        try:
+            results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        finally:
+            await client.close()
 
-Return format: {{"suspicious_indices": [1, 5, 7], "reason": "explanation"}}"""
-                }]
-            )
+        return [prediction for predictions in results for prediction in predictions]
+
+    async def _predict_chunk(self, client: Any,
+                             chunk: List[Transaction]) -> List[tuple[List[Transaction], str, float]]:
+        """Send one chunk, retrying with exponential backoff. Indices are local to chunk."""
+        formatted = self._format_transactions(chunk)
+        prompt = self._prompt_template().format(transactions=formatted)
+
+        key = (cache_key(formatted, f"{PROMPT_VERSION}-{self.encoding}", self.model)
+               if self.cache is not None else None)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._parse_llm_response(cached, chunk)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                start = time.perf_counter()
+                response = await asyncio.wait_for(
+                    client.messages.create(
+                        model=self.model,
+                        max_tokens=2000,
+                        messages=[{"role": "user", "content": prompt}]
+                    ),
+                    timeout=self.timeout
+                )
+                text = response.content[0].text
+                if key is not None:
+                    self.cache.put(key, text, time.perf_counter() - start)
+                return self._parse_llm_response(text, chunk)
+
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"LLM checker error: {e!r} (chunk of {len(chunk)} transactions, "
+                          f"{attempt + 1} attempts)")
+                    return []
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        return []
 
-            result = self._parse_llm_response(response.content[0].text, transactions)
-            return result
+    def estimate_tokens(self, transactions: List[Transaction]) -> int:
+        return estimate_tokens(self._format_transactions(transactions))
 
+    def token_report(self, transactions: List[Transaction]) -> Dict[str, Any]:
+        """Prompt tokens for transactions in every encoding.
+
+        Counted by the Messages count_tokens endpoint when an api_key is set
+        and it is reachable, otherwise estimated from prompt length.
+        """
+        prompts = {}
+        for encoding in ENCODINGS:
+            checker = LLMChecker(encoding=encoding)
+            prompts[encoding] = checker._prompt_template().format(
+                transactions=checker._format_transactions(transactions))
+
+        report: Dict[str, Any] = {'method': 'estimate', 'transactions': len(transactions)}
+        report.update({encoding: estimate_tokens(prompt) for encoding, prompt in prompts.items()})
+        if not self.api_key:
+            return report
+
+        try:
+            import anthropic
+            client = anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url,
+                                         max_retries=self.max_retries, timeout=self.timeout)
+            counted = {
+                encoding: client.messages.count_tokens(
+                    model=self.model, messages=[{"role": "user", "content": prompt}]).input_tokens
+                for encoding, prompt in prompts.items()
+            }
         except Exception as e:
-            print(f"LLM checker error: {e}")
-            return []
+            print(f"LLM token count failed, reporting estimates: {e!r}")
+            return report
+
+        report.update(counted)
+        report['method'] = 'count_tokens'
+        return report
+
+    def _prompt_template(self) -> str:
+        return COMPACT_PROMPT_TEMPLATE if self.encoding == 'compact' else PROMPT_TEMPLATE
+
+    def _chunk_transactions(self, transactions: List[Transaction]) -> List[List[int]]:
+        """Split transaction indices into chunks that fit max_chunk_tokens.
+
+        Users are packed whole, in order of first appearance; a user whose
+        transactions alone exceed the budget is split across chunks.
+        """
+        by_user: Dict[str, List[int]] = {}
+        for i, txn in enumerate(transactions):
+            by_user.setdefault(txn.user_id, []).append(i)
+
+        budget = max(self.max_chunk_tokens - estimate_tokens(self._prompt_template()), 1)
+        chunks: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+
+        for indices in by_user.values():
+            total = self.estimate_tokens([transactions[i] for i in indices])
+            costs = [total / len(indices)] * len(indices)
+            if current and used + total > budget:
+                chunks.append(current)
+                current, used = [], 0
+            for i, cost in zip(indices, costs):
+                if current and used + cost > budget:
+                    chunks.append(current)
+                    current, used = [], 0
+                current.append(i)
+                used += cost
+
+        if current:
+            chunks.append(current)
+        return chunks
 
     def _format_transactions(self, transactions: List[Transaction]) -> str:
         """Format transactions for LLM."""
+        if self.encoding == 'compact':
+            return self._format_compact(transactions)
+
         lines = []
         for i, txn in enumerate(transactions):
             lines.append(
-                f"{i}: user={txn.user_id}, time={txn.timestamp}, "
+                f"{i}: user={txn.user_id}, time={format_timestamp(txn.timestamp)}, "
                 f"merchant={txn.merchant_name}, amount=${txn.amount:.2f}"
             )
         return "\n".join(lines)
 
+    def _format_compact(self, transactions: List[Transaction]) -> str:
+        """Merchant dictionary, then per-user rows of index|delta seconds|merchant id|amount."""
+        merchants: Dict[str, int] = {}
+        by_user: Dict[str, List[int]] = {}
+        for i, txn in enumerate(transactions):
+            merchants.setdefault(txn.merchant_name, len(merchants))
+            by_user.setdefault(txn.user_id, []).append(i)
+
+        lines = ["merchants: " + "; ".join(f"{code}={name}" for name, code in merchants.items())]
+        for user_id, indices in by_user.items():
+            indices.sort(key=lambda i: transactions[i].timestamp)
+            lines.append(f"@{user_id} {format_timestamp(transactions[indices[0]].timestamp)}")
+            previous = None
+            for i in indices:
+                txn = transactions[i]
+                delta = 0 if previous is None else (txn.timestamp - previous) // 1_000_000
+                previous = txn.timestamp
+                lines.append(f"{i}|{delta}|{merchants[txn.merchant_name]}|{txn.amount:.2f}")
+        return "\n".join(lines)
+
     def _parse_llm_response(self, response_text: str,
                            transactions: List[Transaction]) -> List[tuple[List[Transaction], str, float]]:
         """Parse LLM response into predictions."""
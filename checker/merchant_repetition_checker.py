@@ -1,6 +1,6 @@
 """Merchant repetition checker using DuckDB window functions."""
-from typing import List, Any, Optional, Dict
-from checker.window_checker import WindowChecker
+from typing import List, Any, Optional, Dict, Sequence
+from checker.window_checker import WindowChecker, WindowSpec
 from checker.fraud_checker import Transaction
 
 
@@ -21,26 +21,17 @@ class MerchantRepetitionChecker(WindowChecker):
             self.time_window_hours = config.get('time_window_hours', self.time_window_hours)
             self.threshold = config.get('threshold', self.threshold)
 
-    def get_window_query(self, table_name: str) -> str:
-        return f"""
-        WITH windowed AS (
-            SELECT
-                user_id, merchant_name, timestamp, amount,
-                COUNT(*) OVER (
-                    PARTITION BY user_id, merchant_name ORDER BY timestamp
-                    RANGE BETWEEN INTERVAL '{self.time_window_hours}' HOURS PRECEDING AND CURRENT ROW
-                ) as count_in_window
-            FROM {table_name}
-        ),
-        flagged AS (SELECT DISTINCT user_id, merchant_name FROM windowed WHERE count_in_window > {self.threshold})
-        SELECT t.* FROM {table_name} t
-        JOIN flagged f ON t.user_id = f.user_id AND t.merchant_name = f.merchant_name
-        ORDER BY t.user_id, t.merchant_name, t.timestamp
-        """
+    def get_window_spec(self) -> WindowSpec:
+        return WindowSpec(
+            partition_by=('user_id', 'merchant_name'),
+            aggregate="COUNT(*)",
+            interval=f"'{self.time_window_hours}' HOURS",
+            threshold=self.threshold,
+        )
 
     def get_group_key(self, txn: Transaction) -> Any:
         return (txn.user_id, txn.merchant_name)
 
-    def get_reason(self, group_key: Any, txns: List[Transaction]) -> str:
+    def get_reason(self, group_key: Any, txns: Sequence[Transaction]) -> str:
         _, merchant = group_key
         return f"Excessive txns at {merchant}: >{self.threshold} in {self.time_window_hours}h window"
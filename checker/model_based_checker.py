@@ -1,5 +1,5 @@
 """Model-based fraud checker base class."""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from abc import abstractmethod
 from checker.fraud_checker import FraudChecker, Transaction, FraudFlag
 
@@ -17,12 +17,16 @@ class ModelBasedChecker(FraudChecker):
         """
         ...
 
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
+    def estimate_tokens(self, transactions: List[Transaction]) -> int:
+        """Prompt tokens predict() would spend on transactions; 0 for models without a token cost."""
+        return 0
+
+    def check(self, transactions: Sequence[Transaction]) -> List[FraudFlag]:
         """Run model prediction and convert to FraudFlags."""
         if not transactions:
             return []
 
-        predictions = self.predict(transactions)
+        predictions = self.predict(list(transactions))
 
         flags: List[FraudFlag] = []
         for flagged_txns, reason, confidence in predictions:
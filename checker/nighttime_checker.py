@@ -1,11 +1,15 @@
 """Nighttime high-value transaction checker."""
-from typing import List, Dict, Any, Optional
-from checker.rule_based_checker import RuleBasedChecker
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from checker.sql_checker import SQLChecker
+from checker.rule_based_checker import RowGroups
 from checker.fraud_checker import Transaction, FraudFlag
 from duckdb_repository import DuckDBRepository
 
+if TYPE_CHECKING:
+    from query_plan import QueryPlan
 
-class NighttimeChecker(RuleBasedChecker):
+
+class NighttimeChecker(SQLChecker):
     """Detects high-value transactions during late-night hours."""
 
     def __init__(self, name: str = "NighttimeChecker",
@@ -25,13 +29,15 @@ class NighttimeChecker(RuleBasedChecker):
             self.end_hour = config.get('end_hour', self.end_hour)
             self.min_amount = config.get('min_amount', self.min_amount)
 
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
-        return []
+    def incremental_scope(self) -> str:
+        return 'rows'
 
-    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions") -> List[FraudFlag]:
+    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions",
+                        plan: Optional["QueryPlan"] = None) -> List[FraudFlag]:
         """Find high-value transactions during nighttime hours."""
+        row_id = "row_id, " if repo.has_row_ids(table_name) else ""
         query = f"""
-        SELECT user_id, timestamp, merchant_name, amount
+        SELECT {row_id}user_id, timestamp, merchant_name, amount
         FROM {table_name}
         WHERE HOUR(timestamp) >= {self.start_hour}
           AND HOUR(timestamp) < {self.end_hour}
@@ -39,18 +45,10 @@ class NighttimeChecker(RuleBasedChecker):
         ORDER BY user_id, timestamp
         """
 
-        results = repo.fetch_items(query)
-
-        if not results:
-            return []
-
-        all_txns = self.rows_to_transactions(results)
-
-        user_groups: Dict[str, List[Transaction]] = {}
-        for txn in all_txns:
-            if txn.user_id not in user_groups:
-                user_groups[txn.user_id] = []
-            user_groups[txn.user_id].append(txn)
+        user_groups = RowGroups(repo)
+        for columns in repo.iter_batches(query):
+            for txn in user_groups.transactions(columns):
+                user_groups.add(txn.user_id, txn)
 
         flags: List[FraudFlag] = []
         for user_id, txns in user_groups.items():
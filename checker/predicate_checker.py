@@ -1,8 +1,47 @@
 """Predicate-based fraud checker using predicate trees."""
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Mapping, Sequence
 from abc import ABC, abstractmethod
+import operator
+import numpy as np
 from checker.rule_based_checker import RuleBasedChecker
-from checker.fraud_checker import Transaction, FraudFlag
+from checker.fraud_checker import (
+    Transaction, FraudFlag, TransactionBatch, EncodedColumn, US_PER_HOUR, to_micros, format_timestamp
+)
+
+Columns = Mapping[str, Any]
+
+_COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+def transactions_to_columns(transactions: Sequence[Transaction]) -> Dict[str, np.ndarray]:
+    """Pivot Transaction objects into one array per field."""
+    return {
+        'user_id': np.array([t.user_id for t in transactions], dtype=object),
+        'timestamp': np.array([t.timestamp for t in transactions], dtype=np.int64),
+        'merchant_name': np.array([t.merchant_name for t in transactions], dtype=object),
+        'amount': np.array([t.amount for t in transactions], dtype=np.float64),
+    }
+
+
+def _map_distinct(column: Any, func: Callable[[Any], bool]) -> np.ndarray:
+    """Apply func once per distinct value and broadcast the result to every row."""
+    if isinstance(column, EncodedColumn):
+        hits = np.fromiter((func(v) for v in column.values.tolist()), dtype=bool,
+                           count=len(column.values))
+        return hits[column.codes]
+    try:
+        values, inverse = np.unique(column, return_inverse=True)
+    except TypeError:
+        return np.fromiter((func(v) for v in column.tolist()), dtype=bool, count=len(column))
+    hits = np.fromiter((func(v) for v in values.tolist()), dtype=bool, count=len(values))
+    return hits[inverse.reshape(-1)]
 
 
 class Predicate(ABC):
@@ -16,45 +55,87 @@ class Predicate(ABC):
     def to_sql(self) -> str:
         ...
 
+    def evaluate_columns(self, columns: Columns) -> np.ndarray:
+        """Evaluate over whole columns at once, returning a boolean mask.
+
+        Raises NotImplementedError when the node has no vectorized form; callers
+        then fall back to per-row evaluate().
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} has no columnar evaluation")
+
+
+def _column_length(columns: Columns) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
 
 class FieldPredicate(Predicate):
-    """Leaf predicate: field comparison."""
+    """Leaf predicate: field comparison.
+
+    timestamp compares as epoch microseconds, so the value may be given as
+    ISO text, a datetime or epoch micros. The pseudo-field 'hour' is the
+    hour of day of the timestamp, 0-23.
+    """
 
     def __init__(self, field: str, operator: str, value: Any):
         self.field = field
         self.operator = operator
         self.value = value
+        self._operand = (to_micros(value) if field == 'timestamp' and operator in _COMPARISONS
+                         else value)
 
     def evaluate(self, transaction: Transaction) -> bool:
         field_value: Any = getattr(transaction, self.field)
 
         if self.operator == '>':
-            return bool(field_value > self.value)
+            return bool(field_value > self._operand)
         elif self.operator == '<':
-            return bool(field_value < self.value)
+            return bool(field_value < self._operand)
         elif self.operator == '>=':
-            return bool(field_value >= self.value)
+            return bool(field_value >= self._operand)
         elif self.operator == '<=':
-            return bool(field_value <= self.value)
+            return bool(field_value <= self._operand)
         elif self.operator == '==':
-            return bool(field_value == self.value)
+            return bool(field_value == self._operand)
         elif self.operator == '!=':
-            return bool(field_value != self.value)
+            return bool(field_value != self._operand)
         elif self.operator == 'contains':
-            return bool(self.value in str(field_value))
+            return bool(self.value in self._text(field_value))
         return False
 
+    def evaluate_columns(self, columns: Columns) -> np.ndarray:
+        if self.field == 'hour':
+            column = np.asarray(columns['timestamp']) // US_PER_HOUR % 24
+        else:
+            column = columns[self.field]
+
+        compare = _COMPARISONS.get(self.operator)
+        if compare is not None:
+            if isinstance(column, EncodedColumn) or column.dtype == object:
+                return _map_distinct(column, lambda v: bool(compare(v, self._operand)))
+            return np.asarray(compare(column, self._operand), dtype=bool)
+        elif self.operator == 'contains':
+            return _map_distinct(column, lambda v: self.value in self._text(v))
+        return np.zeros(len(column), dtype=bool)
+
+    def _text(self, field_value: Any) -> str:
+        return format_timestamp(field_value) if self.field == 'timestamp' else str(field_value)
+
     def to_sql(self) -> str:
-        if self.operator == 'contains':
-            return f"{self.field} LIKE '%{self.value}%'"
-        elif self.operator == '==':
-            if isinstance(self.value, str):
-                return f"{self.field} = '{self.value}'"
-            return f"{self.field} = {self.value}"
+        if self.field == 'hour':
+            column = "HOUR(timestamp)"
+        elif self.field == 'timestamp' and self.operator == 'contains':
+            column = "CAST(timestamp AS VARCHAR)"
         else:
-            if isinstance(self.value, str):
-                return f"{self.field} {self.operator} '{self.value}'"
-            return f"{self.field} {self.operator} {self.value}"
+            column = self.field
+
+        if self.operator == 'contains':
+            return f"{column} LIKE '%{self.value}%'"
+        sql_operator = '=' if self.operator == '==' else self.operator
+        if self.field == 'timestamp':
+            return f"{column} {sql_operator} TIMESTAMP '{format_timestamp(self._operand)}'"
+        if isinstance(self.value, str):
+            return f"{column} {sql_operator} '{self.value}'"
+        return f"{column} {sql_operator} {self.value}"
 
 
 class AndPredicate(Predicate):
@@ -66,6 +147,12 @@ class AndPredicate(Predicate):
     def evaluate(self, transaction: Transaction) -> bool:
         return all(p.evaluate(transaction) for p in self.predicates)
 
+    def evaluate_columns(self, columns: Columns) -> np.ndarray:
+        mask = np.ones(_column_length(columns), dtype=bool)
+        for p in self.predicates:
+            mask &= p.evaluate_columns(columns)
+        return mask
+
     def to_sql(self) -> str:
         clauses = [p.to_sql() for p in self.predicates]
         return f"({' AND '.join(clauses)})"
@@ -80,6 +167,12 @@ class OrPredicate(Predicate):
     def evaluate(self, transaction: Transaction) -> bool:
         return any(p.evaluate(transaction) for p in self.predicates)
 
+    def evaluate_columns(self, columns: Columns) -> np.ndarray:
+        mask = np.zeros(_column_length(columns), dtype=bool)
+        for p in self.predicates:
+            mask |= p.evaluate_columns(columns)
+        return mask
+
     def to_sql(self) -> str:
         clauses = [p.to_sql() for p in self.predicates]
         return f"({' OR '.join(clauses)})"
@@ -94,6 +187,9 @@ class NotPredicate(Predicate):
     def evaluate(self, transaction: Transaction) -> bool:
         return not self.predicate.evaluate(transaction)
 
+    def evaluate_columns(self, columns: Columns) -> np.ndarray:
+        return ~self.predicate.evaluate_columns(columns)
+
     def to_sql(self) -> str:
         return f"NOT ({self.predicate.to_sql()})"
 
@@ -131,9 +227,17 @@ class PredicateBasedChecker(RuleBasedChecker):
         self.reason = reason
         self.confidence = confidence
 
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
+    def check(self, transactions: Sequence[Transaction]) -> List[FraudFlag]:
         """Evaluate predicate tree against transactions."""
-        flagged = [txn for txn in transactions if self.predicate.evaluate(txn)]
+        try:
+            if isinstance(transactions, TransactionBatch):
+                mask = self.predicate.evaluate_columns(transactions.columns())
+                flagged = transactions.refs(np.flatnonzero(mask))
+            else:
+                mask = self.predicate.evaluate_columns(transactions_to_columns(transactions))
+                flagged = [transactions[i] for i in np.flatnonzero(mask)]
+        except NotImplementedError:
+            flagged = [txn for txn in transactions if self.predicate.evaluate(txn)]
 
         if not flagged:
             return []
@@ -143,3 +247,45 @@ class PredicateBasedChecker(RuleBasedChecker):
     def get_sql_predicate(self) -> str:
         """Get SQL WHERE clause from predicate tree."""
         return self.predicate.to_sql()
+
+    def supports_sql(self) -> bool:
+        """True when the predicate tree compiles to a row-level WHERE clause."""
+        return _is_row_predicate(self.predicate)
+
+
+def _is_row_predicate(predicate: Predicate) -> bool:
+    if isinstance(predicate, (AndPredicate, OrPredicate)):
+        return all(_is_row_predicate(p) for p in predicate.predicates)
+    if isinstance(predicate, NotPredicate):
+        return _is_row_predicate(predicate.predicate)
+    return isinstance(predicate, FieldPredicate)
+
+
+MASK_BITS = 62
+
+
+def fused_predicate_query(checkers: List[PredicateBasedChecker], table_name: str,
+                          with_row_ids: bool = False) -> str:
+    """Compile several predicate checkers into one scan.
+
+    Each output row carries mask_<n> columns where bit i of mask_<n> is set
+    when checker n * MASK_BITS + i matched. Only rows matching at least one
+    checker are returned, with their row_id when with_row_ids is set.
+    """
+    clauses = [f"COALESCE({c.get_sql_predicate()}, FALSE)" for c in checkers]
+
+    masks = []
+    for group_start in range(0, len(clauses), MASK_BITS):
+        group = clauses[group_start:group_start + MASK_BITS]
+        bits = " | ".join(
+            f"(CAST({clause} AS BIGINT) << {bit})" for bit, clause in enumerate(group)
+        )
+        masks.append(f"{bits} AS mask_{group_start // MASK_BITS}")
+
+    return f"""
+    SELECT {'row_id, ' if with_row_ids else ''}user_id, timestamp, merchant_name, amount,
+           {', '.join(masks)}
+    FROM {table_name}
+    WHERE {' OR '.join(clauses)}
+    ORDER BY user_id, timestamp
+    """
@@ -0,0 +1,196 @@
+"""Mergeable relative-error quantile sketches for per-user amount statistics."""
+import math
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+import numpy as np
+from duckdb_repository import DuckDBRepository
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+_MIN_INDEXABLE = 1e-9
+
+
+class DDSketch:
+    """Log-bucketed quantile sketch (DDSketch) with a relative error bound.
+
+    A value x lands in bucket ceil(log_gamma(x)) with gamma = (1 + a) / (1 - a),
+    so any quantile estimate is within a factor of (1 +/- a) of the true order
+    statistic. Two sketches with the same accuracy merge by adding bucket
+    counts. Amounts at or below zero are kept in a separate zero bucket and
+    estimated as 0.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.ln_gamma = math.log(self.gamma)
+        self.keys = np.empty(0, dtype=np.int32)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.zero_count = 0
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum()) + self.zero_count
+
+    def key_expression(self, column: str) -> str:
+        """SQL computing the bucket of column, NULL for the zero bucket."""
+        return (f"CASE WHEN {column} > {_MIN_INDEXABLE} "
+                f"THEN CAST(CEIL(LN({column}) / {self.ln_gamma!r}) AS INTEGER) END")
+
+    def add(self, value: float) -> None:
+        self.add_many(np.array([value], dtype=np.float64))
+
+    def add_many(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        positive = values > _MIN_INDEXABLE
+        self.zero_count += int(len(values) - positive.sum())
+        keys = np.ceil(np.log(values[positive]) / self.ln_gamma).astype(np.int32)
+        self.add_counts(*np.unique(keys, return_counts=True))
+
+    def add_counts(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        """Add pre-aggregated bucket counts, e.g. from a GROUP BY in DuckDB."""
+        if not len(keys):
+            return
+        if not len(self.keys) and (np.diff(keys) > 0).all():
+            self.keys = np.asarray(keys, dtype=np.int32)
+            self.counts = np.asarray(counts, dtype=np.int64)
+            return
+        merged, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        totals = np.zeros(len(merged), dtype=np.int64)
+        np.add.at(totals, inverse, np.concatenate([self.counts, counts]))
+        self.keys = merged.astype(np.int32)
+        self.counts = totals
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        self.zero_count += other.zero_count
+        self.add_counts(other.keys, other.counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the value at rank floor(q * (count - 1)), or None if empty."""
+        total = self.count
+        if total == 0:
+            return None
+        rank = int(q * (total - 1))
+        if rank < self.zero_count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side='right'))
+        return 2 * self.gamma ** int(self.keys[index]) / (self.gamma + 1)
+
+
+class UserQuantileSketches:
+    """One DDSketch of transaction amounts per user.
+
+    Sketches are filled from a DuckDB table with a single hash aggregate
+    (no per-user sort), from in-memory batches, or from a previously saved
+    table, so medians can be kept up to date without rescanning history.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.sketches: Dict[str, DDSketch] = {}
+        self._template = DDSketch(relative_accuracy)
+
+    def sketch(self, user_id: str) -> DDSketch:
+        if user_id not in self.sketches:
+            self.sketches[user_id] = DDSketch(self.relative_accuracy)
+        return self.sketches[user_id]
+
+    def update(self, user_ids: Sequence[str], amounts: Sequence[float]) -> None:
+        """Add a batch of (user_id, amount) observations."""
+        users, inverse = np.unique(np.asarray(user_ids, dtype=object), return_inverse=True)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(users) + 1))
+        for i, user_id in enumerate(users):
+            self.sketch(user_id).add_many(amounts[order[bounds[i]:bounds[i + 1]]])
+
+    def update_from_repo(self, repo: DuckDBRepository, table_name: str) -> None:
+        """Add every row of table_name, bucketed inside DuckDB."""
+        columns = repo.fetch_numpy(f"""
+            SELECT user_id, {self._template.key_expression('amount')} AS bucket, COUNT(*) AS n
+            FROM {table_name}
+            GROUP BY ALL
+            ORDER BY user_id, bucket
+        """)
+        self._add_bucket_columns(columns['user_id'], columns['bucket'], columns['n'])
+
+    def merge(self, other: "UserQuantileSketches") -> None:
+        for user_id, sketch in other.sketches.items():
+            self.sketch(user_id).merge(sketch)
+
+    def median(self, user_id: str) -> Optional[float]:
+        sketch = self.sketches.get(user_id)
+        return sketch.quantile(0.5) if sketch is not None else None
+
+    def count(self, user_id: str) -> int:
+        sketch = self.sketches.get(user_id)
+        return sketch.count if sketch is not None else 0
+
+    def medians(self) -> Dict[str, np.ndarray]:
+        """Columns user_id, txn_count and median_amount for every sketched user."""
+        users = sorted(self.sketches)
+        return {
+            'user_id': np.array(users, dtype=object),
+            'txn_count': np.array([self.sketches[u].count for u in users], dtype=np.int64),
+            'median_amount': np.array([self.sketches[u].quantile(0.5) for u in users],
+                                      dtype=np.float64),
+        }
+
+    def save(self, repo: DuckDBRepository, table_name: str) -> None:
+        """Replace table_name with one row per (user, bucket); bucket NULL is the zero bucket."""
+        user_ids, buckets, counts = zip(*self._bucket_rows()) if self.sketches else ((), (), ())
+        view = f"_{table_name}_rows"
+        repo.register(view, {
+            'user_id': np.array(user_ids, dtype=object),
+            'bucket': np.array(buckets, dtype=np.float64),
+            'count': np.array(counts, dtype=np.int64),
+        })
+        try:
+            repo.execute(f"""
+                CREATE OR REPLACE TABLE {table_name} AS
+                SELECT user_id::VARCHAR AS user_id, bucket::INTEGER AS bucket, count::BIGINT AS count,
+                       {self.relative_accuracy!r} AS relative_accuracy
+                FROM {view}
+            """)
+        finally:
+            repo.unregister(view)
+
+    @classmethod
+    def load(cls, repo: DuckDBRepository, table_name: str,
+             relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> "UserQuantileSketches":
+        """Load sketches saved by save(), or return empty sketches if table_name does not exist."""
+        if not repo.table_exists(table_name):
+            return cls(relative_accuracy)
+        accuracy = repo.fetch_items(f"SELECT DISTINCT relative_accuracy FROM {table_name}")
+        sketches = cls(float(accuracy[0]['relative_accuracy']) if accuracy else relative_accuracy)
+        columns = repo.fetch_numpy(
+            f"SELECT user_id, bucket, count FROM {table_name} ORDER BY user_id, bucket")
+        sketches._add_bucket_columns(columns['user_id'], columns['bucket'], columns['count'])
+        return sketches
+
+    def _bucket_rows(self) -> Iterator[Tuple[str, float, int]]:
+        for user_id, sketch in self.sketches.items():
+            if sketch.zero_count:
+                yield user_id, np.nan, sketch.zero_count
+            for key, count in zip(sketch.keys.tolist(), sketch.counts.tolist()):
+                yield user_id, float(key), count
+
+    def _add_bucket_columns(self, user_ids: np.ndarray, buckets: np.ndarray,
+                            counts: np.ndarray) -> None:
+        if not len(user_ids):
+            return
+        zero = np.ma.getmaskarray(buckets)
+        keys = np.ma.getdata(buckets)
+        if keys.dtype.kind == 'f':
+            zero |= np.isnan(keys)
+        counts = np.asarray(counts, dtype=np.int64)
+
+        starts = np.flatnonzero(np.r_[True, user_ids[1:] != user_ids[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(user_ids)]):
+            sketch = self.sketch(user_ids[start])
+            rows = slice(start, end)
+            sketch.zero_count += int(counts[rows][zero[rows]].sum())
+            live = ~zero[rows]
+            sketch.add_counts(keys[rows][live].astype(np.int32), counts[rows][live])
@@ -1,6 +1,10 @@
 """Rule-based fraud checkers."""
-from typing import List, Dict, Any, Optional
-from checker.fraud_checker import FraudChecker, Transaction, FraudFlag
+from typing import List, Dict, Any, Iterator, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING
+import numpy as np
+from checker.fraud_checker import FraudChecker, Transaction, TransactionBatch, FraudFlag, RowRefs
+
+if TYPE_CHECKING:
+    from duckdb_repository import DuckDBRepository
 
 
 class RuleBasedChecker(FraudChecker):
@@ -15,7 +19,7 @@ class RuleBasedChecker(FraudChecker):
         if config:
             self.config = config
 
-    def create_flag(self, transactions: List[Transaction], reason: str,
+    def create_flag(self, transactions: Sequence[Transaction], reason: str,
                    confidence: float = 0.8) -> FraudFlag:
         """Helper to create fraud flags."""
         return FraudFlag(
@@ -30,9 +34,45 @@ class RuleBasedChecker(FraudChecker):
         return [
             Transaction(
                 user_id=row['user_id'],
-                timestamp=str(row['timestamp']),
+                timestamp=row['timestamp'],
                 merchant_name=row['merchant_name'],
                 amount=float(row['amount'])
             )
             for row in rows
         ]
+
+    def columns_to_transactions(self, columns: Mapping[str, np.ndarray]) -> List[Transaction]:
+        """Convert a column batch (e.g. from DuckDBRepository.iter_batches) to Transaction objects."""
+        batch = TransactionBatch.from_columns(columns)
+        return batch.rows(np.arange(len(batch)))
+
+
+class RowGroups:
+    """Rows a checker flags, grouped by key for one flag per group.
+
+    Rows read with a row_id are added to the repository's RowStore and
+    grouped as ids, so each group becomes RowRefs rather than a list of
+    Transaction copies. Rows without ids are grouped as Transactions.
+    """
+
+    def __init__(self, repo: "DuckDBRepository") -> None:
+        self.store = repo.row_store
+        self._groups: Dict[Any, List[Any]] = {}
+
+    def transactions(self, columns: Mapping[str, np.ndarray]) -> List[Transaction]:
+        """Transactions of one batch from DuckDBRepository.iter_batches."""
+        batch = TransactionBatch.from_columns(columns, store=self.store)
+        if batch.store is not None:
+            batch.store.add(batch)
+        return batch.rows(np.arange(len(batch)))
+
+    def add(self, key: Any, txn: Transaction) -> None:
+        rows = self._groups.setdefault(key, [])
+        rows.append(txn if txn.row_id is None else txn.row_id)
+
+    def items(self) -> Iterator[Tuple[Any, Sequence[Transaction]]]:
+        for key, rows in self._groups.items():
+            if rows and not isinstance(rows[0], Transaction):
+                yield key, RowRefs(self.store, np.array(rows, dtype=np.int64))
+            else:
+                yield key, rows
@@ -0,0 +1,34 @@
+"""Base class for checkers that run as SQL inside DuckDB."""
+from typing import List, Optional, Sequence, Set, TYPE_CHECKING
+from abc import abstractmethod
+from checker.rule_based_checker import RuleBasedChecker
+from checker.fraud_checker import Transaction, FraudFlag
+from duckdb_repository import DuckDBRepository
+
+if TYPE_CHECKING:
+    from query_plan import QueryPlan
+
+
+class SQLChecker(RuleBasedChecker):
+    """Checker evaluated against a DuckDB table rather than in-memory transactions."""
+
+    def check(self, transactions: Sequence[Transaction]) -> List[FraudFlag]:
+        return []
+
+    @abstractmethod
+    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions",
+                        plan: Optional["QueryPlan"] = None) -> List[FraudFlag]:
+        """Run against table_name, reusing relations from plan when given."""
+        ...
+
+    def plan_relations(self) -> Set[str]:
+        """Names of shared QueryPlan relations this checker can read from."""
+        return set()
+
+    def incremental_scope(self) -> str:
+        """Which IncrementalScope relation this checker needs: 'rows', 'window' or 'history'."""
+        return 'history'
+
+    def commit_state(self, repo: DuckDBRepository) -> None:
+        """Save state check_with_repo staged; called as an incremental run moves its watermark."""
+        pass
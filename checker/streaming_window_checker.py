@@ -0,0 +1,173 @@
+"""Incremental sliding-window counterparts of the SQL window checkers."""
+from typing import List, Dict, Any, Optional, Sequence, Set
+from abc import abstractmethod
+from collections import Counter, deque
+from checker.fraud_checker import Transaction, FraudFlag
+from checker.window_checker import WindowChecker
+from checker.velocity_checker import VelocityChecker
+from checker.geographic_shift_checker import GeographicShiftChecker
+from checker.merchant_repetition_checker import MerchantRepetitionChecker
+
+# How far an event may trail the newest event seen, across keys, and still find its key's window.
+DEFAULT_ALLOWED_LATENESS_US = 3_600_000_000
+
+
+class SlidingWindow:
+    """Events of one key within the trailing window, plus per-value counts.
+
+    Mirrors SQL's RANGE BETWEEN <width> PRECEDING AND CURRENT ROW: an event at
+    time t sees every earlier event with timestamp >= t - width.
+    """
+
+    def __init__(self, width_us: int, track_merchants: bool = False):
+        self.width_us = width_us
+        self.track_merchants = track_merchants
+        self.events: deque[tuple[int, Transaction]] = deque()
+        self.merchant_counts: Counter[str] = Counter()
+
+    def add(self, timestamp_us: int, txn: Transaction) -> None:
+        horizon = timestamp_us - self.width_us
+        while self.events and self.events[0][0] < horizon:
+            _, expired = self.events.popleft()
+            if self.track_merchants:
+                self.merchant_counts[expired.merchant_name] -= 1
+                if not self.merchant_counts[expired.merchant_name]:
+                    del self.merchant_counts[expired.merchant_name]
+        self.events.append((timestamp_us, txn))
+        if self.track_merchants:
+            self.merchant_counts[txn.merchant_name] += 1
+
+    @property
+    def latest_us(self) -> int:
+        return self.events[-1][0]
+
+    @property
+    def count(self) -> int:
+        return len(self.events)
+
+    @property
+    def distinct_merchants(self) -> int:
+        return len(self.merchant_counts)
+
+    def transactions(self) -> List[Transaction]:
+        return [txn for _, txn in self.events]
+
+
+class StreamingWindowChecker(WindowChecker):
+    """Evaluates a WindowChecker's rule one event at a time.
+
+    Keeps a SlidingWindow per group key and decides each incoming event in
+    O(1) amortized time. check() feeds events into the same state, so it can be
+    called once with a whole file or repeatedly with micro-batches. Events must
+    arrive in timestamp order per key; each check() call sorts its own input.
+
+    Replaying a full file flags exactly the keys the SQL query flags. A flag is
+    emitted each time a key crosses the threshold, once per episode, and carries
+    the window contents at that moment; the episode ends when the key's window
+    value drops back to the threshold.
+
+    Keys may interleave out of order. The watermark is the newest timestamp
+    seen; a key whose latest event is more than a window width plus
+    allowed_lateness_us behind it is dropped. An event that late for a
+    dropped key starts a new window.
+    """
+
+    def __init__(self, *args: Any, allowed_lateness_us: int = DEFAULT_ALLOWED_LATENESS_US,
+                 **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.allowed_lateness_us = allowed_lateness_us
+        self.watermark_us: Optional[int] = None
+        self._windows: Dict[Any, SlidingWindow] = {}
+        self.flagged_keys: Set[Any] = set()
+
+    @abstractmethod
+    def window_width_us(self) -> int:
+        ...
+
+    @abstractmethod
+    def window_value(self, window: SlidingWindow) -> int:
+        """The quantity compared against the threshold."""
+        ...
+
+    def tracks_merchants(self) -> bool:
+        return False
+
+    def reset(self) -> None:
+        self._windows.clear()
+        self.flagged_keys.clear()
+        self.watermark_us = None
+
+    def observe(self, txn: Transaction) -> Optional[FraudFlag]:
+        """Add one event; return a flag if it pushes its key over the threshold."""
+        key = self.get_group_key(txn)
+        # Re-inserting keeps _windows ordered by each key's latest event.
+        window = self._windows.pop(key, None)
+        if window is None:
+            window = SlidingWindow(self.window_width_us(), self.tracks_merchants())
+        self._windows[key] = window
+
+        window.add(txn.timestamp, txn)
+        if self.watermark_us is None or txn.timestamp > self.watermark_us:
+            self.watermark_us = txn.timestamp
+            self._drop_idle(self.watermark_us - window.width_us - self.allowed_lateness_us)
+
+        if self.window_value(window) <= self.threshold:
+            self.flagged_keys.discard(key)
+            return None
+        if key in self.flagged_keys:
+            return None
+
+        self.flagged_keys.add(key)
+        txns = window.transactions()
+        return self.create_flag(txns, self.get_reason(key, txns), confidence=0.85)
+
+    def _drop_idle(self, horizon_us: int) -> None:
+        """Drop the windows, oldest first, whose events all fall before horizon_us."""
+        while self._windows:
+            key = next(iter(self._windows))
+            if self._windows[key].latest_us >= horizon_us:
+                break
+            del self._windows[key]
+            self.flagged_keys.discard(key)
+
+    def check(self, transactions: Sequence[Transaction]) -> List[FraudFlag]:
+        ordered = sorted(transactions, key=lambda t: t.timestamp)
+        flags: List[FraudFlag] = []
+        for txn in ordered:
+            flag = self.observe(txn)
+            if flag is not None:
+                flags.append(flag)
+        return flags
+
+
+class StreamingVelocityChecker(StreamingWindowChecker, VelocityChecker):
+    """Streaming VelocityChecker: more than threshold events per user in the window."""
+
+    def window_width_us(self) -> int:
+        return self.time_window_minutes * 60_000_000
+
+    def window_value(self, window: SlidingWindow) -> int:
+        return window.count
+
+
+class StreamingGeographicShiftChecker(StreamingWindowChecker, GeographicShiftChecker):
+    """Streaming GeographicShiftChecker: more than threshold distinct merchants per user."""
+
+    def window_width_us(self) -> int:
+        return self.time_window_minutes * 60_000_000
+
+    def window_value(self, window: SlidingWindow) -> int:
+        return window.distinct_merchants
+
+    def tracks_merchants(self) -> bool:
+        return True
+
+
+class StreamingMerchantRepetitionChecker(StreamingWindowChecker, MerchantRepetitionChecker):
+    """Streaming MerchantRepetitionChecker: more than threshold events per user and merchant."""
+
+    def window_width_us(self) -> int:
+        return self.time_window_hours * 3_600_000_000
+
+    def window_value(self, window: SlidingWindow) -> int:
+        return window.count
@@ -1,11 +1,15 @@
 """Unusual merchant checker using DuckDB."""
-from typing import List, Dict, Any, Optional
-from checker.rule_based_checker import RuleBasedChecker
+from typing import List, Dict, Any, Optional, Set, TYPE_CHECKING
+from checker.sql_checker import SQLChecker
+from checker.rule_based_checker import RowGroups
 from checker.fraud_checker import Transaction, FraudFlag
 from duckdb_repository import DuckDBRepository
 
+if TYPE_CHECKING:
+    from query_plan import QueryPlan
 
-class UnusualMerchantChecker(RuleBasedChecker):
+
+class UnusualMerchantChecker(SQLChecker):
     """Detects new merchants with anomalously high transactions."""
 
     def __init__(self, name: str = "UnusualMerchantChecker", multiplier: float = 2.0):
@@ -18,17 +22,24 @@ class UnusualMerchantChecker(RuleBasedChecker):
         if config:
             self.multiplier = config.get('multiplier', self.multiplier)
 
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
-        return []
+    def plan_relations(self) -> Set[str]:
+        return {'user_stats'}
 
-    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions") -> List[FraudFlag]:
+    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions",
+                        plan: Optional["QueryPlan"] = None) -> List[FraudFlag]:
         """Find first-time merchants with high amounts relative to user average."""
-        query = f"""
-        WITH user_avg AS (
+        if plan is not None and plan.user_stats:
+            averages = f"SELECT user_id, avg_amount FROM {plan.user_stats}"
+        else:
+            averages = f"""
             SELECT user_id, AVG(amount) as avg_amount
             FROM {table_name}
             GROUP BY user_id
-        ),
+            """
+
+        row_id = "t.row_id, " if repo.has_row_ids(table_name) else ""
+        query = f"""
+        WITH user_avg AS ({averages}),
         merchant_counts AS (
             SELECT user_id, merchant_name, COUNT(*) as txn_count
             FROM {table_name}
@@ -39,7 +50,7 @@ class UnusualMerchantChecker(RuleBasedChecker):
             FROM merchant_counts
             WHERE txn_count = 1
         )
-        SELECT t.user_id, t.timestamp, t.merchant_name, t.amount, ua.avg_amount
+        SELECT {row_id}t.user_id, t.timestamp, t.merchant_name, t.amount, ua.avg_amount
         FROM {table_name} t
         JOIN new_merchants nm ON t.user_id = nm.user_id AND t.merchant_name = nm.merchant_name
         JOIN user_avg ua ON t.user_id = ua.user_id
@@ -47,22 +58,17 @@ class UnusualMerchantChecker(RuleBasedChecker):
         ORDER BY t.user_id, t.timestamp
         """
 
-        results = repo.fetch_items(query)
-
-        if not results:
-            return []
-
-        all_txns = self.rows_to_transactions(results)
-
-        user_groups: Dict[str, tuple[List[Transaction], float]] = {}
-        for i, txn in enumerate(all_txns):
-            if txn.user_id not in user_groups:
-                user_groups[txn.user_id] = ([], float(results[i]['avg_amount']))
-            user_groups[txn.user_id][0].append(txn)
+        user_groups = RowGroups(repo)
+        user_averages: Dict[str, float] = {}
+        for columns in repo.iter_batches(query):
+            averages = columns['avg_amount'].tolist()
+            for txn, avg in zip(user_groups.transactions(columns), averages):
+                user_averages.setdefault(txn.user_id, float(avg))
+                user_groups.add(txn.user_id, txn)
 
         flags: List[FraudFlag] = []
-        for user_id, (txns, avg) in user_groups.items():
-            reason = f"New merchant with {self.multiplier}x avg amount (${avg:.2f})"
+        for user_id, txns in user_groups.items():
+            reason = f"New merchant with {self.multiplier}x avg amount (${user_averages[user_id]:.2f})"
             flags.append(self.create_flag(txns, reason, confidence=0.82))
 
         return flags
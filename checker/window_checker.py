@@ -1,19 +1,76 @@
 """Generic window function checker base class."""
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Any, Optional, Sequence, Tuple, TYPE_CHECKING
 from abc import abstractmethod
-from collections import defaultdict
-from checker.rule_based_checker import RuleBasedChecker
+from dataclasses import dataclass
+from checker.sql_checker import SQLChecker
+from checker.rule_based_checker import RowGroups
 from checker.fraud_checker import Transaction, FraudFlag
 from duckdb_repository import DuckDBRepository
 
+if TYPE_CHECKING:
+    from query_plan import QueryPlan
 
-class WindowChecker(RuleBasedChecker):
+
+@dataclass(frozen=True)
+class WindowSpec:
+    """A per-partition sliding window: aggregate over the preceding interval > threshold."""
+    partition_by: Tuple[str, ...]
+    aggregate: str
+    interval: str
+    threshold: int
+
+    def window_expression(self) -> str:
+        return (
+            f"{self.aggregate} OVER ("
+            f"PARTITION BY {', '.join(self.partition_by)} ORDER BY timestamp "
+            f"RANGE BETWEEN INTERVAL {self.interval} PRECEDING AND CURRENT ROW)"
+        )
+
+    def join_condition(self, left: str, right: str) -> str:
+        return " AND ".join(f"{left}.{c} = {right}.{c}" for c in self.partition_by)
+
+    def order_by(self, alias: str) -> str:
+        return ", ".join(f"{alias}.{c}" for c in (*self.partition_by, "timestamp"))
+
+
+class WindowChecker(SQLChecker):
     """Generic checker using DuckDB window functions."""
 
-    @abstractmethod
+    def get_window_spec(self) -> Optional[WindowSpec]:
+        """Describe the window so QueryPlan can fuse it with others. None opts out."""
+        return None
+
+    def incremental_scope(self) -> str:
+        return 'window'
+
     def get_window_query(self, table_name: str) -> str:
         """Return SQL query with window function."""
-        ...
+        spec = self.get_window_spec()
+        if spec is None:
+            raise NotImplementedError(f"{self.__class__.__name__} must define a window spec or query")
+
+        return f"""
+        WITH windowed AS (
+            SELECT
+                {', '.join(spec.partition_by)}, timestamp,
+                {spec.window_expression()} as window_value
+            FROM {table_name}
+        ),
+        flagged AS (SELECT DISTINCT {', '.join(spec.partition_by)} FROM windowed WHERE window_value > {spec.threshold})
+        SELECT t.* FROM {table_name} t JOIN flagged f ON {spec.join_condition('t', 'f')}
+        ORDER BY {spec.order_by('t')}
+        """
+
+    def get_planned_query(self, table_name: str, hits_table: str, hit_column: str) -> str:
+        """Return the flagged rows using window hits precomputed by a QueryPlan."""
+        spec = self.get_window_spec()
+        assert spec is not None
+        return f"""
+        SELECT t.* FROM {table_name} t
+        JOIN {hits_table} f ON {spec.join_condition('t', 'f')}
+        WHERE f.{hit_column}
+        ORDER BY {spec.order_by('t')}
+        """
 
     @abstractmethod
     def get_group_key(self, txn: Transaction) -> Any:
@@ -21,27 +78,23 @@ class WindowChecker(RuleBasedChecker):
         ...
 
     @abstractmethod
-    def get_reason(self, group_key: Any, txns: List[Transaction]) -> str:
+    def get_reason(self, group_key: Any, txns: Sequence[Transaction]) -> str:
         """Generate reason string for flag."""
         ...
 
-    def check(self, transactions: List[Transaction]) -> List[FraudFlag]:
-        return []
-
-    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions") -> List[FraudFlag]:
+    def check_with_repo(self, repo: DuckDBRepository, table_name: str = "transactions",
+                        plan: Optional["QueryPlan"] = None) -> List[FraudFlag]:
         """Generic window function execution."""
-        query = self.get_window_query(table_name)
-        results = repo.fetch_items(query)
-
-        if not results:
-            return []
-
-        all_txns = self.rows_to_transactions(results)
+        hits = plan.window_hits(self) if plan is not None else None
+        if hits is not None:
+            query = self.get_planned_query(table_name, *hits)
+        else:
+            query = self.get_window_query(table_name)
 
-        groups: Dict[Any, List[Transaction]] = defaultdict(list)
-        for txn in all_txns:
-            key = self.get_group_key(txn)
-            groups[key].append(txn)
+        groups = RowGroups(repo)
+        for columns in repo.iter_batches(query):
+            for txn in groups.transactions(columns):
+                groups.add(self.get_group_key(txn), txn)
 
         flags: List[FraudFlag] = []
         for key, txns in groups.items():
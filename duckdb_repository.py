@@ -1,45 +1,388 @@
 """DuckDB repository for SQL database operations."""
-from typing import List, Dict, Any, Optional
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Mapping, Optional, Sequence, Union, TYPE_CHECKING
 import duckdb
+import numpy as np
+
+if TYPE_CHECKING:
+    import pyarrow
+    from checker.fraud_checker import RowStore
+
+DEFAULT_BATCH_SIZE = 100_000
+
+# Column types every ingest reads its input as; nothing is inferred.
+TRANSACTION_SCHEMA: Dict[str, str] = {
+    'user_id': 'VARCHAR',
+    'timestamp': 'TIMESTAMP',
+    'merchant_name': 'VARCHAR',
+    'amount': 'DOUBLE',
+}
+INGEST_FORMATS = ('csv', 'parquet', 'jsonl')
+
+# CSV input is read with this fixed dialect rather than a sniffed one.
+CSV_DIALECT = "delim = ',', quote = '\"', escape = '\"'"
+
+# One path or glob, or a list of them.
+Paths = Union[str, Sequence[str]]
+
+
+def ingest_format(path: str) -> str:
+    """Input format from path's extension, ignoring compression suffixes; CSV when unknown."""
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes
+                if suffix.lower() not in ('.gz', '.zst')]
+    extension = suffixes[-1] if suffixes else ''
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+SIZE_UNITS = {
+    '': 1, 'b': 1, 'byte': 1, 'bytes': 1,
+    'kb': 10 ** 3, 'mb': 10 ** 6, 'gb': 10 ** 9, 'tb': 10 ** 12,
+    'kib': 2 ** 10, 'mib': 2 ** 20, 'gib': 2 ** 30, 'tib': 2 ** 40,
+}
+
+
+def parse_size(size: str) -> int:
+    """Bytes in a size written as DuckDB writes them, e.g. '12GB' or '1.5 GiB'."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d*)?)\s*([a-zA-Z]*)\s*", size)
+    if not match or match.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {size!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+@dataclass
+class DuckDBSettings:
+    """Resource limits for a DuckDB database; None keeps DuckDB's default.
+
+    Past memory_limit, DuckDB spills sorts, joins, aggregates and table
+    data to temp_directory, which defaults to <database>.tmp, or .tmp in
+    the working directory for in-memory databases.
+    """
+    memory_limit: Optional[str] = None
+    threads: Optional[int] = None
+    temp_directory: Optional[str] = None
+
+    def statements(self) -> List[str]:
+        statements = []
+        if self.memory_limit is not None:
+            statements.append(f"SET memory_limit = '{self.memory_limit}'")
+        if self.threads is not None:
+            statements.append(f"SET threads = {self.threads}")
+        if self.temp_directory is not None:
+            statements.append(f"SET temp_directory = '{self.temp_directory}'")
+        return statements
+
+    def share(self, processes: int, index: int) -> "DuckDBSettings":
+        """The settings for process index of processes running side by side.
+
+        Memory and threads are divided between the processes, and each
+        spills to its own subdirectory so their temp files cannot collide.
+        """
+        memory_limit = (None if self.memory_limit is None
+                        else f"{parse_size(self.memory_limit) // processes}B")
+        threads = max(1, (self.threads or os.cpu_count() or 1) // processes)
+        temp_directory = os.path.join(self.temp_directory or ".tmp", f"shard-{index}")
+        return DuckDBSettings(memory_limit, threads, temp_directory)
 
 
 class DuckDBRepository:
-    def __init__(self, db_path: str = ":memory:") -> None:
+    def __init__(self, db_path: str = ":memory:", settings: Optional[DuckDBSettings] = None) -> None:
         self.db_path: str = db_path
         self.conn: duckdb.DuckDBPyConnection = duckdb.connect(db_path)
+        for statement in (settings or DuckDBSettings()).statements():
+            self.conn.execute(statement)
+        # Imported here: the checker package imports this module.
+        from checker.fraud_checker import RowStore
+        self.row_store: "RowStore" = RowStore()
+        self._reset_counters()
 
-    def fetch_items(
-        self, query: str, params: Optional[tuple[Any, ...]] = None
-    ) -> List[Dict[str, Any]]:
+    def _reset_counters(self) -> None:
+        self.rows_fetched: int = 0
+        self._profiles: Optional[List[Dict[str, Any]]] = None
+        self._profile_pending = False
+
+    def _run(self, query: str, params: Optional[tuple[Any, ...]] = None) -> duckdb.DuckDBPyConnection:
+        self._collect_profile()
         if params:
             result = self.conn.execute(query, params)
         else:
             result = self.conn.execute(query)
+        self._profile_pending = self._profiles is not None
+        return result
+
+    def enable_profiling(self) -> None:
+        """Keep DuckDB's JSON profile of every query run through this repository.
+
+        Profiling is per connection, so enable it on the cursor a checker uses.
+        """
+        self.conn.execute("PRAGMA enable_profiling='no_output'")
+        self._profiles = []
+
+    def collect_profiles(self) -> List[Dict[str, Any]]:
+        """Profiles of the queries since the last call, oldest first."""
+        self._collect_profile()
+        if self._profiles is None:
+            return []
+        profiles, self._profiles = self._profiles, []
+        return profiles
+
+    def _collect_profile(self) -> None:
+        """DuckDB only keeps the last query's profile, so save it before the next query runs."""
+        if not self._profile_pending or not hasattr(self.conn, "get_profiling_information"):
+            return
+        self._profile_pending = False
+        self._profiles.append(json.loads(self.conn.get_profiling_information(format="json")))
+
+    def fetch_items(
+        self, query: str, params: Optional[tuple[Any, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        result = self._run(query, params)
 
         columns = [desc[0] for desc in result.description]
         rows = result.fetchall()
+        self.rows_fetched += len(rows)
 
         return [dict(zip(columns, row)) for row in rows]
 
-    def execute(self, command: str, params: Optional[tuple[Any, ...]] = None) -> int:
-        if params:
-            result = self.conn.execute(command, params)
+    def fetch_numpy(
+        self, query: str, params: Optional[tuple[Any, ...]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Fetch the full result as one NumPy array per column."""
+        columns = self._run(query, params).fetchnumpy()
+        self.rows_fetched += len(next(iter(columns.values()), ()))
+        return columns
+
+    def fetch_arrow(
+        self, query: str, params: Optional[tuple[Any, ...]] = None
+    ) -> "pyarrow.Table":
+        """Fetch the full result as an Arrow table. Requires pyarrow."""
+        result = self._run(query, params)
+        if hasattr(result, "to_arrow_table"):
+            table = result.to_arrow_table()
         else:
-            result = self.conn.execute(command)
+            table = result.fetch_arrow_table()
+        self.rows_fetched += table.num_rows
+        return table
+
+    def iter_batches(
+        self, query: str, batch_size: int = DEFAULT_BATCH_SIZE,
+        params: Optional[tuple[Any, ...]] = None
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Stream the result as column batches of at most batch_size rows.
+
+        Uses Arrow record batches when pyarrow is installed, otherwise falls back
+        to fetchmany(). Either way only one batch is held in Python at a time.
+        """
+        result = self._run(query, params)
+        columns = [desc[0] for desc in result.description]
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    return
+                self.rows_fetched += len(rows)
+                yield _rows_to_columns(columns, rows)
+
+        if hasattr(result, "to_arrow_reader"):
+            reader = result.to_arrow_reader(batch_size)
+        else:
+            reader = result.fetch_record_batch(batch_size)
+        for batch in reader:
+            if batch.num_rows:
+                self.rows_fetched += batch.num_rows
+                yield {
+                    name: batch.column(i).to_numpy(zero_copy_only=False)
+                    for i, name in enumerate(columns)
+                }
+
+    def execute(self, command: str, params: Optional[tuple[Any, ...]] = None) -> int:
+        result = self._run(command, params)
 
         row = result.fetchone()
         return int(row[0]) if row and result.description else 0
 
+    def register(self, view_name: str, columns: Dict[str, np.ndarray]) -> None:
+        """Expose in-memory NumPy columns as a view on this connection.
+
+        Goes through an Arrow table when pyarrow is installed; DuckDB's
+        conversion of plain NumPy object arrays is much slower.
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            self.conn.register(view_name, columns)
+            return
+        self.conn.register(view_name, pyarrow.table(columns))
+
+    def unregister(self, view_name: str) -> None:
+        self.conn.unregister(view_name)
+
     def insert_from_csv(self, csv_path: str, table_name: str) -> int:
-        """Creates table and loads CSV data."""
-        create_query = f"CREATE TABLE {table_name} AS SELECT * FROM read_csv_auto('{csv_path}')"
-        self.conn.execute(create_query)
+        """Creates table and loads CSV data; see insert_from_files."""
+        return self.insert_from_files(csv_path, table_name, 'csv')
 
-        count_query = f"SELECT COUNT(*) FROM {table_name}"
-        result = self.conn.execute(count_query)
+    def insert_from_files(self, paths: Paths, table_name: str, format: Optional[str] = None,
+                          schema: Mapping[str, str] = TRANSACTION_SCHEMA) -> int:
+        """Creates table_name from every file paths match, and returns the row count.
+
+        format is one of INGEST_FORMATS, by default from the first path's
+        extension. Columns are matched to schema by name, in any order, and
+        read with schema's types; other columns are allowed and not kept.
+        A missing schema column raises ValueError. Nothing is sniffed: CSV
+        files are read with CSV_DIALECT and a header row. Rows get a row_id
+        in file order, unique across the database's tables, unless a CSV or
+        Parquet input has a row_id column of its own; JSONL rows are always
+        numbered afresh.
+        """
+        query = self._ingest_query(paths, format, schema)
+        result = self.conn.execute(f"CREATE TABLE {table_name} AS {query}")
         row = result.fetchone()
         return int(row[0]) if row else 0
 
+    def partition_files(self, paths: Paths, directory: str, shards: int,
+                        format: Optional[str] = None,
+                        schema: Mapping[str, str] = TRANSACTION_SCHEMA) -> List[str]:
+        """Writes paths to directory as Parquet, split into shards by a hash of user_id.
+
+        Input is read as insert_from_files reads it, and rows are numbered
+        before the split, so row ids stay unique across shards. directory
+        must be new or empty. Returns a Parquet glob per non-empty shard,
+        in shard order.
+        """
+        query = self._ingest_query(paths, format, schema, f", hash(user_id) % {shards} AS shard")
+        self.conn.execute(f"COPY ({query}) TO '{directory}' (FORMAT PARQUET, PARTITION_BY (shard))")
+        shard_dirs = sorted(Path(directory).glob("shard=*"), key=lambda path: int(path.name.split("=")[1]))
+        return [str(path / "*.parquet") for path in shard_dirs]
+
+    def _ingest_query(self, paths: Paths, format: Optional[str], schema: Mapping[str, str],
+                      extra_columns: str = "", with_row_ids: bool = True) -> str:
+        """SELECT of the rows in paths with schema's columns, a row_id and extra_columns."""
+        files = [paths] if isinstance(paths, str) else list(paths)
+        if not files:
+            raise ValueError("No input files given")
+        format = format or ingest_format(files[0])
+        listing = "[" + ", ".join(f"'{path}'" for path in files) + "]"
+        types = "{" + ", ".join(f"'{name}': '{type_}'" for name, type_ in schema.items()) + "}"
+        if format == 'csv':
+            # Read as text, matched by header name, and cast below: columns=
+            # would match by position, types= would sniff the other columns.
+            source = (f"read_csv({listing}, header = true, auto_detect = false, {CSV_DIALECT}, "
+                      f"union_by_name = true, all_varchar = true)")
+        elif format == 'jsonl':
+            source = f"read_json({listing}, format = 'newline_delimited', columns = {types})"
+        elif format == 'parquet':
+            source = f"read_parquet({listing}, union_by_name = true)"
+        else:
+            raise ValueError(f"Unknown ingest format {format!r}, expected one of {INGEST_FORMATS}")
+
+        available = self._columns(source)
+        missing = [name for name in schema if name not in available]
+        if missing:
+            raise ValueError(f"{', '.join(files)} has no column {', '.join(missing)}")
+
+        # Naming the columns lets DuckDB skip the others in Parquet files.
+        columns = [f'CAST("{name}" AS {type_}) AS "{name}"' for name, type_ in schema.items()]
+        if 'row_id' not in schema:
+            if "row_id" in available:
+                columns.append("CAST(row_id AS BIGINT) AS row_id")
+            elif with_row_ids:
+                columns.append(self._row_id_expression())
+        return f"SELECT {', '.join(columns)}{extra_columns} FROM {source}"
+
+    def has_row_ids(self, relation: str) -> bool:
+        """Whether relation, a table, view or subquery, has the row_id column ingest assigns."""
+        return self._has_column(relation, "row_id")
+
+    def _has_column(self, relation: str, column: str) -> bool:
+        return column in self._columns(relation)
+
+    def _columns(self, relation: str) -> List[str]:
+        result = self.conn.execute(f"SELECT * FROM {relation} LIMIT 0")
+        return [desc[0] for desc in result.description]
+
+    def _row_id_expression(self) -> str:
+        """Numbers rows in scan order, after the highest row_id in any table."""
+        tables = self.conn.execute("""
+            SELECT schema_name, table_name FROM duckdb_columns()
+            WHERE column_name = 'row_id' AND NOT internal
+              AND database_name = current_database()
+              AND (schema_name, table_name) IN (SELECT (schema_name, table_name) FROM duckdb_tables())
+        """).fetchall()
+        next_id = 0
+        if tables:
+            maxima = " UNION ALL ".join(
+                f'SELECT MAX(row_id) AS m FROM "{schema}"."{table}"' for schema, table in tables)
+            row = self.conn.execute(f"SELECT COALESCE(MAX(m) + 1, 0) FROM ({maxima})").fetchone()
+            next_id = int(row[0]) if row else 0
+        return f"row_number() OVER () - 1 + {next_id} AS row_id"
+
+    def table_exists(self, table_name: str) -> bool:
+        result = self.conn.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", (table_name,))
+        row = result.fetchone()
+        return bool(row and row[0])
+
+    def append_from_csv(self, csv_path: str, table_name: str) -> int:
+        """Appends CSV data to table_name, creating it on first use; see append_from_files."""
+        return self.append_from_files(csv_path, table_name, 'csv')
+
+    def append_from_files(self, paths: Paths, table_name: str, format: Optional[str] = None,
+                          schema: Mapping[str, str] = TRANSACTION_SCHEMA) -> int:
+        """Appends every file paths match to table_name, creating it on first use.
+
+        Input is read as insert_from_files reads it. Every row is tagged
+        with an ingest_run id and the run is recorded in ingest_runs, so
+        later runs can tell new rows from history.
+        """
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_runs (
+                run_id INTEGER,
+                table_name VARCHAR,
+                source VARCHAR,
+                row_count BIGINT,
+                ingested_at TIMESTAMP
+            )
+        """)
+        row = self.conn.execute(
+            "SELECT COALESCE(MAX(run_id), 0) + 1 FROM ingest_runs WHERE table_name = ?",
+            (table_name,)).fetchone()
+        run_id = int(row[0]) if row else 1
+
+        exists = self.table_exists(table_name)
+        # Tables created before row ids existed keep working without them.
+        source = self._ingest_query(paths, format, schema, f", {run_id} AS ingest_run",
+                                    with_row_ids=not exists or self.has_row_ids(table_name))
+        if exists:
+            result = self.conn.execute(f"INSERT INTO {table_name} BY NAME {source}")
+        else:
+            result = self.conn.execute(f"CREATE TABLE {table_name} AS {source}")
+        inserted = result.fetchone()
+        row_count = int(inserted[0]) if inserted else 0
+
+        self.conn.execute(
+            "INSERT INTO ingest_runs VALUES (?, ?, ?, ?, now()::TIMESTAMP)",
+            (run_id, table_name, paths if isinstance(paths, str) else ", ".join(paths), row_count))
+        return row_count
+
+    def cursor(self) -> "DuckDBRepository":
+        """A repository on a new cursor of the same database, for use from another thread."""
+        repo = DuckDBRepository.__new__(DuckDBRepository)
+        repo.db_path = self.db_path
+        repo.conn = self.conn.cursor()
+        repo.row_store = self.row_store
+        repo._reset_counters()
+        return repo
+
     def close(self) -> None:
         if self.conn:
             self.conn.close()
@@ -49,3 +392,12 @@ class DuckDBRepository:
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         self.close()
+
+
+def _rows_to_columns(columns: List[str], rows: List[tuple[Any, ...]]) -> Dict[str, np.ndarray]:
+    """Transpose fetchmany() tuples into object arrays keyed by column name."""
+    arrays: Dict[str, np.ndarray] = {}
+    for name, values in zip(columns, zip(*rows)):
+        arrays[name] = np.empty(len(values), dtype=object)
+        arrays[name][:] = values
+    return arrays
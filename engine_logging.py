@@ -0,0 +1,88 @@
+"""Queue-backed logging so callers never wait on file or terminal I/O."""
+import atexit
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List
+
+DEFAULT_QUEUE_SIZE = 10_000
+LOG_FORMATS = ('text', 'json')
+LOG_POLICIES = ('block', 'drop')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+TEXT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, thread, message and exc_info if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def make_formatter(log_format: str) -> logging.Formatter:
+    if log_format == 'json':
+        return JsonFormatter()
+    if log_format == 'text':
+        return logging.Formatter(fmt=TEXT_FORMAT, datefmt=TEXT_DATE_FORMAT)
+    raise ValueError(f"Unknown log format {log_format!r}, expected one of {LOG_FORMATS}")
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # put_nowait would fail on a full queue; wait for the listener to make room.
+        self.queue.put(self._sentinel)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Puts records on a bounded queue drained by a QueueListener thread.
+
+    When the queue is full, policy 'block' waits for room and 'drop'
+    discards the record and counts it in dropped. Records are formatted
+    into their message on the calling thread, the rest happens on the
+    listener thread. stop() runs at exit at the latest, so queued records
+    are not lost.
+    """
+
+    def __init__(self, handlers: List[logging.Handler], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 policy: str = 'block') -> None:
+        if policy not in LOG_POLICIES:
+            raise ValueError(f"Unknown log policy {policy!r}, expected one of {LOG_POLICIES}")
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.policy = policy
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = _Listener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        self._stopped = False
+        atexit.register(self.stop)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def stop(self) -> None:
+        """Drain the queue, stop the listener thread and close the target handlers."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
@@ -1,33 +1,97 @@
 """Execution engine for fraud detection with dual logging support."""
 import logging
 from logging.handlers import RotatingFileHandler
+import multiprocessing
+import os
 import sys
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, Dict, Any, Callable, ContextManager, Iterable, Optional, Sequence, Tuple
 from datetime import datetime
-from checker import FraudChecker, Transaction, FraudFlag, PredicateBasedChecker, FieldPredicate, OrPredicate, AndPredicate
+import numpy as np
+from checker import FraudChecker, Transaction, TransactionBatch, FraudFlag, PredicateBasedChecker, FieldPredicate, OrPredicate, AndPredicate
+from checker import ModelBasedChecker, RowRefs, RowStore
+from checker import (
+    VelocityChecker,
+    GeographicShiftChecker,
+    MerchantRepetitionChecker,
+    HighValueAnomalyChecker,
+    NighttimeChecker,
+    UnusualMerchantChecker,
+    StreamingVelocityChecker,
+    StreamingGeographicShiftChecker,
+    StreamingMerchantRepetitionChecker
+)
+from checker.predicate_checker import fused_predicate_query, MASK_BITS
+from checker.fraud_checker import concat_rows
+from checker.sql_checker import SQLChecker
+from checker.window_checker import WindowChecker
+from duckdb_repository import DuckDBRepository, DuckDBSettings
+from engine_logging import BoundedQueueHandler, DEFAULT_QUEUE_SIZE, make_formatter
+from incremental import IncrementalScope
+from metrics import MetricsRegistry
+from query_plan import QueryPlan
+from sharding import START_METHOD, init_worker, merge_shards, run_shard
+from sinks import FlagSink
+
+
+# (checker name, input rows, run)
+CheckerTask = Tuple[str, int, Callable[[], List[FraudFlag]]]
+
+DEFAULT_CASCADE_MAX_USERS = 100
+DEFAULT_CASCADE_CONTEXT_SECONDS = 24 * 3600.0
 
 
 class ExecutionEngine:
     def __init__(self, log_file: str = "fraud_detection.log",
                  max_bytes: int = 10*1024*1024,
-                 backup_count: int = 5) -> None:
-        self.logger: logging.Logger = self._setup_logging(log_file, max_bytes, backup_count)
+                 backup_count: int = 5,
+                 max_workers: int = 1,
+                 log_format: str = 'text',
+                 log_queue_size: int = DEFAULT_QUEUE_SIZE,
+                 log_policy: str = 'block') -> None:
+        self._log_queue: Optional[BoundedQueueHandler] = None
+        # Shard processes build their engines with the same logging.
+        self._log_options: Dict[str, Any] = dict(
+            log_file=log_file, max_bytes=max_bytes, backup_count=backup_count,
+            log_format=log_format, log_queue_size=log_queue_size, log_policy=log_policy)
+        self.logger: logging.Logger = self._setup_logging(log_file, max_bytes, backup_count,
+                                                          log_format, log_queue_size, log_policy)
         self.checkers: List[FraudChecker] = []
+        self.max_workers = max_workers
+        self.cascade_max_users: Optional[int] = DEFAULT_CASCADE_MAX_USERS
+        self.cascade_max_tokens: Optional[int] = None
+        self.cascade_context_seconds: float = DEFAULT_CASCADE_CONTEXT_SECONDS
+        self.sink: Optional[FlagSink] = None
+        self._sink_lock = threading.Lock()
+        self.metrics = MetricsRegistry()
+        self.metrics_prometheus_path: Optional[str] = None
+        self.metrics_json_path: Optional[str] = None
+        self.profile_sql = False
+        self._current_run = threading.local()
         self.logger.info("=" * 80)
         self.logger.info("Execution Engine initialized at %s", datetime.now())
         self.logger.info("=" * 80)
 
-    def _setup_logging(self, log_file: str, max_bytes: int, backup_count: int) -> logging.Logger:
+    def _setup_logging(self, log_file: str, max_bytes: int, backup_count: int,
+                       log_format: str = 'text', queue_size: int = DEFAULT_QUEUE_SIZE,
+                       policy: str = 'block') -> logging.Logger:
+        """Log to log_file and stdout from a listener thread behind a bounded queue.
+
+        policy decides what a full queue does to the caller: 'block' waits,
+        'drop' discards the record. log_format 'json' writes JSON lines.
+        """
         logger = logging.getLogger("FraudDetectionEngine")
         logger.setLevel(logging.INFO)
 
         if logger.handlers:
+            for handler in logger.handlers:
+                if isinstance(handler, BoundedQueueHandler):
+                    handler.stop()
             logger.handlers.clear()
 
-        formatter = logging.Formatter(
-            fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        formatter = make_formatter(log_format)
 
         file_handler = RotatingFileHandler(
             log_file,
@@ -41,13 +105,20 @@ class ExecutionEngine:
         stdout_handler.setLevel(logging.INFO)
         stdout_handler.setFormatter(formatter)
 
-        logger.addHandler(file_handler)
-        logger.addHandler(stdout_handler)
+        self._log_queue = BoundedQueueHandler([file_handler, stdout_handler], queue_size, policy)
+        logger.addHandler(self._log_queue)
 
         return logger
 
-    def configure_checkers(self) -> None:
-        """Configure the checker pipeline. Edit this method to add checkers."""
+    def configure_checkers(self, streaming: bool = False, approximate: bool = False,
+                           sketch_table: Optional[str] = None) -> None:
+        """Configure the checker pipeline. Edit this method to add checkers.
+
+        With streaming, window checkers keep incremental state across execute()
+        calls and checkers that need the DuckDB table are left out, except for
+        median checks, which switch to quantile sketches. approximate uses the
+        sketches in batch runs too; sketch_table persists them between runs.
+        """
         self.checkers = [
             PredicateBasedChecker(
                 name="HighValueChecker",
@@ -96,22 +167,446 @@ class ExecutionEngine:
             ),
         ]
 
-    def execute(self, transactions: List[Transaction]) -> List[FraudFlag]:
+        if streaming:
+            self.checkers += [
+                StreamingVelocityChecker(),
+                StreamingGeographicShiftChecker(),
+                StreamingMerchantRepetitionChecker(),
+                HighValueAnomalyChecker(approximate=True),
+            ]
+        else:
+            self.checkers += [
+                VelocityChecker(),
+                GeographicShiftChecker(),
+                MerchantRepetitionChecker(),
+                HighValueAnomalyChecker(approximate=approximate, sketch_table=sketch_table),
+                NighttimeChecker(),
+                UnusualMerchantChecker(),
+            ]
+
+    def attach_sink(self, sink: Optional[FlagSink]) -> None:
+        """Write every final flag to sink as soon as its checker finishes."""
+        self.sink = sink
+
+    def configure_metrics(self, prometheus_path: Optional[str] = None,
+                          json_path: Optional[str] = None, profile_sql: bool = False) -> None:
+        """Choose where shutdown() writes self.metrics, and whether to profile SQL.
+
+        Every checker run is recorded in self.metrics either way. With
+        profile_sql, each query a SQL checker runs also keeps DuckDB's JSON
+        profile, at some cost per query.
+        """
+        self.metrics_prometheus_path = prometheus_path
+        self.metrics_json_path = json_path
+        self.profile_sql = profile_sql
+
+    def configure_cascade(self, max_users: Optional[int] = DEFAULT_CASCADE_MAX_USERS,
+                          max_tokens: Optional[int] = None,
+                          context_seconds: float = DEFAULT_CASCADE_CONTEXT_SECONDS) -> None:
+        """Limit what the cascade forwards to model-based checkers per run.
+
+        Flagged users are ranked by their highest flag confidence; at most
+        max_users of them, and only as many as fit in max_tokens of model
+        input, are forwarded with their transactions from context_seconds
+        before their first flagged transaction up to their last.
+        """
+        self.cascade_max_users = max_users
+        self.cascade_max_tokens = max_tokens
+        self.cascade_context_seconds = context_seconds
+
+    def execute(self, transactions: Sequence[Transaction],
+                repo: Optional[DuckDBRepository] = None,
+                table_name: str = "transactions") -> List[FraudFlag]:
+        """Run every checker. With a repo, SQL checkers run against table_name.
+
+        Model-based checkers only see the users the other checkers flagged.
+        """
         self.logger.info("Starting execution with %d transactions", len(transactions))
+        all_flags = self._execute(self._cheap_checkers(), transactions, repo, table_name)
+        all_flags = self._in_checker_order(
+            all_flags + self._cascade(all_flags, transactions=transactions))
+        self.logger.info("Execution completed. Total flags: %d", len(all_flags))
+        return all_flags
 
-        all_flags: List[FraudFlag] = []
-        for checker in self.checkers:
-            self.logger.info("Running checker: %s", checker.name)
-            flags = checker.check(transactions)
-            all_flags.extend(flags)
-            self.logger.info("  Found %d fraud flags", len(flags))
+    def execute_batches(self, batches: Iterable[Sequence[Transaction]],
+                        repo: Optional[DuckDBRepository] = None,
+                        table_name: str = "transactions") -> List[FraudFlag]:
+        """Run the pipeline batch by batch so only one batch is resident at a time.
+
+        Flags from the same checker and reason are merged across batches. Row-level
+        checkers give the same result as a single execute() over all rows; checkers
+        that look across rows only see one batch at a time. With a repo, SQL
+        checkers run once against the whole table instead of per batch.
+        """
+        in_memory = [c for c in self._cheap_checkers() if repo is None or not isinstance(c, SQLChecker)]
+
+        merged: Dict[Tuple[str, str, float], FraudFlag] = {}
+        for batch in batches:
+            self.logger.info("Starting batch with %d transactions", len(batch))
+            for flag in self._execute(in_memory, batch, emit=False):
+                key = (flag.checker_name, flag.reason, flag.confidence_score)
+                if key in merged:
+                    merged[key].extend(flag.transactions)
+                else:
+                    merged[key] = flag
+
+        all_flags = list(merged.values())
+        self._emit(all_flags)
+        if repo is not None:
+            all_flags.extend(self.execute_repo_checkers(repo, table_name))
+        all_flags.extend(self._cascade(all_flags, repo, table_name))
+        return self._in_checker_order(all_flags)
+
+    def execute_repo_checkers(self, repo: DuckDBRepository,
+                              table_name: str = "transactions") -> List[FraudFlag]:
+        """Run all SQL checkers over one shared QueryPlan."""
+        sql_checkers = [c for c in self.checkers if isinstance(c, SQLChecker)]
+        return self._execute(sql_checkers, [], repo, table_name)
+
+    def execute_sql(self, repo: DuckDBRepository, table_name: str = "transactions") -> List[FraudFlag]:
+        """Run all predicate checkers as one fused DuckDB scan, alongside the SQL checkers."""
+        all_flags = self._execute_sql(self._cheap_checkers(), repo, table_name)
+        all_flags = self._in_checker_order(all_flags + self._cascade(all_flags, repo, table_name))
+        self.logger.info("Execution completed. Total flags: %d", len(all_flags))
+        return all_flags
+
+    def execute_incremental(self, repo: DuckDBRepository,
+                            table_name: str = "transactions") -> List[FraudFlag]:
+        """Check only what rows ingested since the last incremental run can affect.
+
+        Row-level checkers see just the new rows, window checkers see the new
+        rows' users within the longest window around them, and per-user
+        aggregate checkers see those users' full history. The watermark moves
+        forward only after every checker has finished, together with any state
+        the checkers saved, such as quantile sketches.
+        """
+        lookback = [spec.interval for spec in
+                    (c.get_window_spec() for c in self.checkers if isinstance(c, WindowChecker))
+                    if spec is not None]
+
+        with IncrementalScope(repo, table_name, lookback).build() as scope:
+            self.logger.info("Incremental run over ingest runs %d..%d: %d new transactions",
+                             scope.watermark + 1, scope.latest_run, scope.new_row_count)
+            if scope.new_row_count == 0:
+                return []
+
+            by_scope: Dict[str, List[FraudChecker]] = {name: [] for name in IncrementalScope.SCOPES}
+            for checker in self._cheap_checkers():
+                name = checker.incremental_scope() if isinstance(checker, SQLChecker) else 'rows'
+                by_scope[name].append(checker)
+
+            all_flags: List[FraudFlag] = []
+            for name, checkers in by_scope.items():
+                if checkers:
+                    all_flags.extend(self._execute_sql(checkers, repo, scope.table_for(name)))
+            all_flags.extend(self._cascade(all_flags, repo, table_name))
+            scope.commit([lambda c=c: c.commit_state(repo) for checkers in by_scope.values()
+                          for c in checkers if isinstance(c, SQLChecker)])
+
+        all_flags = self._in_checker_order(all_flags)
+        self.logger.info("Execution completed. Total flags: %d", len(all_flags))
+        return all_flags
+
+    def execute_sharded(self, shard_paths: Sequence[str], fused: bool = False,
+                        processes: Optional[int] = None,
+                        settings: Optional[DuckDBSettings] = None) -> List[FraudFlag]:
+        """Check each user_id shard in its own process, then merge the flags.
+
+        shard_paths come from DuckDBRepository.partition_files. Each shard is
+        loaded into its own DuckDB database and checked by its own engine,
+        as execute_sql (fused) or execute_batches would check the whole
+        table; every checker partitions by user_id, so the merged flags are
+        the ones an unsharded run finds. Model-based checkers then run here,
+        with context read from the shard files. processes defaults to one
+        per shard, up to the CPU count; they divide the memory and threads
+        of settings between them.
+        """
+        if not shard_paths:
+            return []
+        settings = settings or DuckDBSettings()
+        processes = processes or min(len(shard_paths), os.cpu_count() or 1)
+        checkers = self._cheap_checkers()
+        options = dict(self._log_options, max_workers=self.max_workers)
+        self.logger.info("Starting sharded execution: %d shards on %d processes",
+                         len(shard_paths), processes)
 
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                                 mp_context=multiprocessing.get_context(START_METHOD)) as pool:
+            futures = [pool.submit(run_shard, path, checkers, fused,
+                                   settings.share(processes, index), options)
+                       for index, path in enumerate(shard_paths)]
+            results = [future.result() for future in futures]
+        for result in results:
+            self.metrics.add(result.runs)
+
+        merged = {c.name for c in checkers if not isinstance(c, SQLChecker)}
+        all_flags = self._in_checker_order(merge_shards(results, RowStore(), merged))
+        self._emit(all_flags)
+        if any(isinstance(c, ModelBasedChecker) for c in self.checkers):
+            with DuckDBRepository(settings=settings) as repo:
+                repo.execute(f"CREATE VIEW transactions AS SELECT * FROM "
+                             f"read_parquet({list(shard_paths)}, hive_partitioning = false)")
+                all_flags = self._in_checker_order(all_flags + self._cascade(all_flags, repo))
         self.logger.info("Execution completed. Total flags: %d", len(all_flags))
         return all_flags
 
+    def _cheap_checkers(self) -> List[FraudChecker]:
+        return [c for c in self.checkers if not isinstance(c, ModelBasedChecker)]
+
+    def _cascade(self, flags: List[FraudFlag], repo: Optional[DuckDBRepository] = None,
+                 table_name: str = "transactions",
+                 transactions: Optional[Sequence[Transaction]] = None) -> List[FraudFlag]:
+        """Run model-based checkers on the users the cheap checkers flagged.
+
+        Context rows come from table_name when a repo is given, otherwise from
+        transactions, otherwise only the flagged transactions are forwarded.
+        """
+        model_checkers = [c for c in self.checkers if isinstance(c, ModelBasedChecker)]
+        if not model_checkers or not flags:
+            return []
+
+        ranking: Dict[str, Tuple[float, int]] = {}
+        spans: Dict[str, Tuple[int, int]] = {}
+        for flag in flags:
+            for txn in flag.transactions:
+                confidence, hits = ranking.get(txn.user_id, (0.0, 0))
+                ranking[txn.user_id] = (max(confidence, flag.confidence_score), hits + 1)
+                ts = txn.timestamp
+                first, last = spans.get(txn.user_id, (ts, ts))
+                spans[txn.user_id] = (min(first, ts), max(last, ts))
+
+        users = sorted(ranking, key=lambda u: (-ranking[u][0], -ranking[u][1], u))
+        if self.cascade_max_users is not None:
+            users = users[:self.cascade_max_users]
+        context = self._cascade_context({u: spans[u] for u in users}, flags, repo,
+                                        table_name, transactions)
+
+        forwarded: List[Transaction] = []
+        tokens = 0
+        for user_id in users:
+            user_tokens = max(c.estimate_tokens(context[user_id]) for c in model_checkers)
+            if self.cascade_max_tokens is not None and tokens + user_tokens > self.cascade_max_tokens:
+                break
+            forwarded.extend(context[user_id])
+            tokens += user_tokens
+
+        self.logger.info("Cascade: forwarding %d of %d flagged users (%d transactions, ~%d tokens) "
+                         "to %d model checkers", len({t.user_id for t in forwarded}), len(ranking),
+                         len(forwarded), tokens, len(model_checkers))
+        if not forwarded:
+            return []
+        return self._run_tasks([(c.name, len(forwarded), lambda c=c: c.check(forwarded))
+                                for c in model_checkers])
+
+    def _cascade_context(self, spans: Dict[str, Tuple[int, int]], flags: List[FraudFlag],
+                         repo: Optional[DuckDBRepository], table_name: str,
+                         transactions: Optional[Sequence[Transaction]]) -> Dict[str, List[Transaction]]:
+        """Each user's transactions from context_seconds before their first flag to their last."""
+        context: Dict[str, List[Transaction]] = {user_id: [] for user_id in spans}
+        context_us = int(self.cascade_context_seconds * 1_000_000)
+
+        if repo is not None:
+            view = "_cascade_users"
+            users = list(spans)
+            repo.register(view, {
+                'user_id': np.array(users, dtype=object),
+                'first_us': np.array([spans[u][0] - context_us for u in users], dtype=np.int64),
+                'last_us': np.array([spans[u][1] for u in users], dtype=np.int64),
+            })
+            row_id = "t.row_id, " if repo.has_row_ids(table_name) else ""
+            try:
+                query = f"""
+                SELECT {row_id}t.user_id, t.timestamp, t.merchant_name, t.amount
+                FROM {table_name} t
+                JOIN {view} u ON t.user_id = u.user_id
+                WHERE epoch_us(t.timestamp) BETWEEN u.first_us AND u.last_us
+                ORDER BY t.user_id, t.timestamp
+                """
+                for columns in repo.iter_batches(query):
+                    for txn in TransactionBatch.from_columns(columns):
+                        context[txn.user_id].append(txn)
+            finally:
+                repo.unregister(view)
+            return context
+
+        if transactions is None:
+            seen = set()
+            transactions = [t for flag in flags for t in flag.transactions
+                            if id(t) not in seen and not seen.add(id(t))]
+        for txn in transactions:
+            span = spans.get(txn.user_id)
+            if span is not None and span[0] - context_us <= txn.timestamp <= span[1]:
+                context[txn.user_id].append(txn)
+        for user_txns in context.values():
+            user_txns.sort(key=lambda t: t.timestamp)
+        return context
+
+    def _execute_sql(self, checkers: List[FraudChecker], repo: DuckDBRepository,
+                     table_name: str) -> List[FraudFlag]:
+        fused = [c for c in checkers
+                 if isinstance(c, PredicateBasedChecker) and c.supports_sql()]
+        for checker in checkers:
+            if checker not in fused and not isinstance(checker, SQLChecker):
+                self.logger.warning("Skipping checker %s: not expressible in SQL", checker.name)
+
+        sql_checkers = [c for c in checkers if isinstance(c, SQLChecker)]
+        with self._plan(sql_checkers, repo, table_name) as plan:
+            tasks = self._repo_tasks(sql_checkers, repo, table_name, plan)
+            if fused:
+                tasks.insert(0, (f"FusedPredicateScan[{len(fused)}]", self._table_rows(repo, table_name),
+                                 lambda: self._with_cursor(
+                                     repo, lambda cursor: self._execute_fused(fused, cursor, table_name))))
+            return self._in_checker_order(self._run_tasks(tasks))
+
+    def _execute(self, checkers: List[FraudChecker], transactions: Sequence[Transaction],
+                 repo: Optional[DuckDBRepository] = None,
+                 table_name: str = "transactions", emit: bool = True) -> List[FraudFlag]:
+        sql_checkers = [c for c in checkers if repo is not None and isinstance(c, SQLChecker)]
+        tasks: List[CheckerTask] = [
+            (c.name, len(transactions), lambda c=c: c.check(transactions))
+            for c in checkers if c not in sql_checkers
+        ]
+
+        with self._plan(sql_checkers, repo, table_name) as plan:
+            if repo is not None:
+                tasks.extend(self._repo_tasks(sql_checkers, repo, table_name, plan))
+            return self._in_checker_order(self._run_tasks(tasks, emit))
+
+    def _plan(self, sql_checkers: List[SQLChecker], repo: Optional[DuckDBRepository],
+              table_name: str) -> ContextManager[Optional[QueryPlan]]:
+        if repo is None or not sql_checkers:
+            return nullcontext()
+        self.logger.info("Building shared query plan for %d SQL checkers", len(sql_checkers))
+        return QueryPlan(repo, table_name).build(sql_checkers)
+
+    def _repo_tasks(self, sql_checkers: List[SQLChecker], repo: DuckDBRepository,
+                    table_name: str, plan: Optional[QueryPlan]) -> List[CheckerTask]:
+        if not sql_checkers:
+            return []
+        rows = self._table_rows(repo, table_name)
+        return [
+            (c.name, rows, lambda c=c: self._with_cursor(
+                repo, lambda cursor: c.check_with_repo(cursor, table_name, plan)))
+            for c in sql_checkers
+        ]
+
+    def _table_rows(self, repo: DuckDBRepository, table_name: str) -> int:
+        return repo.execute(f"SELECT COUNT(*) FROM {table_name}")
+
+    def _with_cursor(self, repo: DuckDBRepository,
+                     run: Callable[[DuckDBRepository], List[FraudFlag]]) -> List[FraudFlag]:
+        """Give each checker its own cursor so concurrent queries do not share a connection.
+
+        Rows fetched through the cursor, and its query profiles with
+        profile_sql, are added to the checker run measured on this thread.
+        """
+        cursor = repo.cursor()
+        if self.profile_sql:
+            cursor.enable_profiling()
+        try:
+            return run(cursor)
+        finally:
+            record = getattr(self._current_run, 'record', None)
+            if record is not None:
+                record.db_rows += cursor.rows_fetched
+                record.profiles.extend(cursor.collect_profiles())
+            cursor.close()
+
+    def _run_tasks(self, tasks: List[CheckerTask], emit: bool = True) -> List[FraudFlag]:
+        """Run checker tasks, concurrently when max_workers > 1. Results keep task order.
+
+        With emit, each task's flags go to the sink once it and every earlier
+        task have finished, so the sink sees the same order for any number of
+        workers. Every task is recorded in self.metrics.
+        """
+        def timed(name: str, input_rows: int, run: Callable[[], List[FraudFlag]]) -> List[FraudFlag]:
+            self.logger.info("Running checker: %s", name)
+            with self.metrics.measure(name, input_rows) as record:
+                self._current_run.record = record
+                try:
+                    flags = run()
+                finally:
+                    self._current_run.record = None
+                record.flags = len(flags)
+                record.flagged_transactions = sum(flag.transaction_count for flag in flags)
+            self.logger.info("  %s: found %d fraud flags in %.3fs (%.3fs CPU, %d rows in, "
+                             "%d rows from DuckDB)", name, len(flags), record.wall_seconds,
+                             record.cpu_seconds, input_rows, record.db_rows)
+            return flags
+
+        def finished(flags: List[FraudFlag]) -> List[FraudFlag]:
+            if emit:
+                self._emit(flags)
+            return flags
+
+        if self.max_workers > 1 and len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix="checker") as pool:
+                futures = [pool.submit(timed, *task) for task in tasks]
+                # Waiting in task order holds back tasks that finish early.
+                results = [finished(future.result()) for future in futures]
+        else:
+            results = [finished(timed(*task)) for task in tasks]
+
+        return [flag for flags in results for flag in flags]
+
+    def _emit(self, flags: List[FraudFlag]) -> None:
+        if self.sink is None or not flags:
+            return
+        with self._sink_lock:
+            self.sink.write_all(flags)
+
+    def _execute_fused(self, fused: List[PredicateBasedChecker], repo: DuckDBRepository,
+                       table_name: str) -> List[FraudFlag]:
+        self.logger.info("Running %d predicate checkers in one scan of %s", len(fused), table_name)
+        flagged: List[List[Sequence[Transaction]]] = [[] for _ in fused]
+        candidates = 0
+        query = fused_predicate_query(fused, table_name, repo.has_row_ids(table_name))
+        for columns in repo.iter_batches(query):
+            batch = TransactionBatch.from_columns(columns, store=repo.row_store)
+            # Every candidate matched some checker: store the batch once, refer to it per checker.
+            rows = batch.refs(np.arange(len(batch)))
+            candidates += len(rows)
+            for index in range(len(fused)):
+                mask = np.asarray(columns[f"mask_{index // MASK_BITS}"], dtype=np.int64)
+                hits = np.flatnonzero(mask & (1 << (index % MASK_BITS)))
+                if isinstance(rows, RowRefs):
+                    flagged[index].append(RowRefs(rows.store, rows.row_ids[hits]))
+                else:
+                    flagged[index].append([rows[i] for i in hits])
+        self.logger.info("  Scan returned %d candidate rows", candidates)
+
+        all_flags: List[FraudFlag] = []
+        for checker, parts in zip(fused, flagged):
+            txns = concat_rows(parts)
+            self.logger.info("Checker %s: %d fraud flags", checker.name, 1 if txns else 0)
+            if txns:
+                all_flags.append(checker.create_flag(txns, checker.reason, checker.confidence))
+        return all_flags
+
+    def _in_checker_order(self, flags: List[FraudFlag]) -> List[FraudFlag]:
+        order = {checker.name: i for i, checker in enumerate(self.checkers)}
+        return sorted(flags, key=lambda f: order.get(f.checker_name, len(order)))
+
     def shutdown(self) -> None:
+        if self.metrics_prometheus_path:
+            self.metrics.write_prometheus(self.metrics_prometheus_path)
+            self.logger.info("Prometheus metrics written to %s", self.metrics_prometheus_path)
+        if self.metrics_json_path:
+            self.metrics.write_json(self.metrics_json_path)
+            self.logger.info("Metrics summary written to %s", self.metrics_json_path)
         self.logger.info("Shutting down execution engine")
         self.logger.info("=" * 80)
+        if self._log_queue is not None:
+            self._log_queue.stop()
+            if self._log_queue.dropped:
+                sys.stderr.write(f"{self._log_queue.dropped} log records were dropped "
+                                 f"because the log queue was full\n")
+            # Later records still reach the files, just synchronously.
+            self.logger.removeHandler(self._log_queue)
+            for handler in self._log_queue.listener.handlers:
+                self.logger.addHandler(handler)
+            self._log_queue = None
         logging.shutdown()
 
 
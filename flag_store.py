@@ -0,0 +1,193 @@
+"""Consolidates overlapping fraud flags into one record per transaction."""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from checker import FraudFlag, Transaction, RowStore, RowRefs
+
+TransactionKey = Union[int, Tuple[str, int, str, float]]
+# (checker name, reason, confidence)
+Hit = Tuple[str, str, float]
+
+
+def transaction_key(txn: Transaction) -> TransactionKey:
+    """Identifies a transaction by its row id, or without one by its fields,
+    so copies made by different checkers match."""
+    if txn.row_id is not None:
+        return txn.row_id
+    return (txn.user_id, txn.timestamp, txn.merchant_name, txn.amount)
+
+
+def combined_score(hits: Iterable[Hit]) -> float:
+    """Noisy-OR of the checkers' confidences, each checker counted once at its highest."""
+    by_checker: Dict[str, float] = {}
+    for checker, _, confidence in hits:
+        by_checker[checker] = max(by_checker.get(checker, 0.0), confidence)
+    clean = 1.0
+    for confidence in by_checker.values():
+        clean *= 1.0 - confidence
+    return 1.0 - clean
+
+
+@dataclass
+class FlaggedTransaction:
+    transaction: Transaction
+    hits: List[Hit]
+    risk_score: float
+    hit_ids: Tuple[int, ...]
+
+
+class FlagStore:
+    """Every flagged transaction once, with the checker hits against it.
+
+    Hits are interned, and so are the sets of hits transactions end up
+    with: each transaction stores one hit-set id, and scores are computed
+    once per distinct set. The same hit twice on a transaction counts once.
+    Flags holding RowRefs are stored as row ids and only materialized, in
+    bulk, by get() and entries().
+    """
+
+    ENTRY_BLOCK_SIZE = 65_536
+
+    def __init__(self) -> None:
+        self._index: Dict[TransactionKey, int] = {}
+        # A Transaction, or the row id of one in _row_store.
+        self._transactions: List[Union[Transaction, int]] = []
+        self._row_store: Optional[RowStore] = None
+        self._set_ids: List[int] = []
+        self._hit_ids: Dict[Hit, int] = {}
+        self._hits: List[Hit] = []
+        self._set_index: Dict[Tuple[int, ...], int] = {}
+        self._sets: List[Tuple[int, ...]] = []
+        self._with_hit: Dict[Tuple[int, int], int] = {}
+        self.flag_count = 0
+
+    def add(self, flag: FraudFlag) -> None:
+        hit = (flag.checker_name, flag.reason, flag.confidence_score)
+        hit_id = self._hit_ids.setdefault(hit, len(self._hits))
+        if hit_id == len(self._hits):
+            self._hits.append(hit)
+        single = self._intern_set((hit_id,))
+
+        if isinstance(flag.transactions, RowRefs):
+            assert self._row_store in (None, flag.transactions.store), "one row store per FlagStore"
+            self._row_store = flag.transactions.store
+            rows: Iterable[Any] = flag.transactions.row_ids.tolist()
+        else:
+            rows = flag.transactions
+
+        index, transactions, set_ids = self._index, self._transactions, self._set_ids
+        for row in rows:
+            if isinstance(row, int):
+                key = row
+            elif row.row_id is not None:
+                key = row.row_id
+            else:
+                key = (row.user_id, row.timestamp, row.merchant_name, row.amount)
+            position = index.get(key)
+            if position is None:
+                index[key] = len(transactions)
+                transactions.append(row)
+                set_ids.append(single)
+            else:
+                set_ids[position] = self._add_hit(set_ids[position], hit_id)
+        self.flag_count += 1
+
+    def add_all(self, flags: Iterable[FraudFlag]) -> None:
+        for flag in flags:
+            self.add(flag)
+
+    def _intern_set(self, hit_ids: Tuple[int, ...]) -> int:
+        set_id = self._set_index.setdefault(hit_ids, len(self._sets))
+        if set_id == len(self._sets):
+            self._sets.append(hit_ids)
+        return set_id
+
+    def _add_hit(self, set_id: int, hit_id: int) -> int:
+        transition = (set_id, hit_id)
+        result = self._with_hit.get(transition)
+        if result is None:
+            hit_ids = self._sets[set_id]
+            result = set_id if hit_id in hit_ids else self._intern_set(hit_ids + (hit_id,))
+            self._with_hit[transition] = result
+        return result
+
+    @property
+    def hits(self) -> List[Hit]:
+        """Distinct hits in the order they were first seen; hit_ids index into this."""
+        return list(self._hits)
+
+    @property
+    def hit_count(self) -> int:
+        sizes = [len(hit_ids) for hit_ids in self._sets]
+        return sum(sizes[set_id] for set_id in self._set_ids)
+
+    def get(self, txn: Transaction) -> FlaggedTransaction:
+        """The stored record for txn; KeyError if no checker flagged it."""
+        index = self._index[transaction_key(txn)]
+        transaction = self._materialize([self._transactions[index]])[0]
+        return self._entry(index, transaction, self._set_entries()[self._set_ids[index]])
+
+    def entries(self) -> Iterator[FlaggedTransaction]:
+        """Flagged transactions, highest risk first, then by user and time.
+
+        The order is found from columns; Transactions are built one block
+        of ENTRY_BLOCK_SIZE at a time.
+        """
+        sets = self._set_entries()
+        scores = np.array([score for _, score in sets], dtype=np.float64)[
+            np.array(self._set_ids, dtype=np.int64)]
+        users, timestamps = self._sort_columns()
+        _, user_codes = np.unique(users, return_inverse=True)
+        order = np.lexsort((timestamps, user_codes, -scores)).tolist()
+        for start in range(0, len(order), self.ENTRY_BLOCK_SIZE):
+            block = order[start:start + self.ENTRY_BLOCK_SIZE]
+            transactions = self._materialize([self._transactions[i] for i in block])
+            for index, transaction in zip(block, transactions):
+                yield self._entry(index, transaction, sets[self._set_ids[index]])
+
+    def _sort_columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """user_id and timestamp of every stored transaction, without building Transactions."""
+        users = np.empty(len(self._transactions), dtype=object)
+        timestamps = np.empty(len(self._transactions), dtype=np.int64)
+        positions = [i for i, row in enumerate(self._transactions) if isinstance(row, int)]
+        if positions:
+            assert self._row_store is not None
+            columns = self._row_store.columns(
+                np.array([self._transactions[i] for i in positions], dtype=np.int64))
+            users[positions] = columns['user_id']
+            timestamps[positions] = columns['timestamp']
+        for i, row in enumerate(self._transactions):
+            if not isinstance(row, int):
+                users[i] = row.user_id
+                timestamps[i] = row.timestamp
+        return users, timestamps
+
+    def _materialize(self, rows: List[Union[Transaction, int]]) -> List[Transaction]:
+        """rows with row ids replaced by Transactions from the row store, looked up in one pass."""
+        positions = [i for i, row in enumerate(rows) if isinstance(row, int)]
+        if not positions:
+            return list(rows)
+        assert self._row_store is not None
+        resolved = list(rows)
+        row_ids = np.array([rows[i] for i in positions], dtype=np.int64)
+        for position, txn in zip(positions, self._row_store.rows(row_ids)):
+            resolved[position] = txn
+        return resolved
+
+    def _set_entries(self) -> List[Tuple[List[Hit], float]]:
+        entries = []
+        for hit_ids in self._sets:
+            hits = [self._hits[h] for h in hit_ids]
+            entries.append((hits, combined_score(hits)))
+        return entries
+
+    def _entry(self, index: int, transaction: Transaction,
+               set_entry: Tuple[List[Hit], float]) -> FlaggedTransaction:
+        hits, score = set_entry
+        return FlaggedTransaction(transaction, hits, score, self._sets[self._set_ids[index]])
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __contains__(self, txn: object) -> bool:
+        return isinstance(txn, Transaction) and transaction_key(txn) in self._index
@@ -0,0 +1,116 @@
+"""Watermark-based incremental checking over a persistent transactions table."""
+import uuid
+from typing import Any, Callable, Dict, Sequence
+from duckdb_repository import DuckDBRepository
+
+
+class IncrementalScope:
+    """Relations covering only what rows ingested since the last checked run can affect.
+
+    Rows are attributed to runs by the ingest_run column that
+    DuckDBRepository.append_from_csv writes. The scope exposes three tables:
+
+    - rows: the new rows only, for row-level checkers.
+    - window: rows of users with new rows, from the longest window before their
+      earliest new row to the same distance after their latest, so sliding
+      windows that include a new row see all of their history.
+    - history: every row of users with new rows, for per-user aggregates.
+
+    The tables are plain rather than TEMP so checkers can read them through
+    repo.cursor(); their names are unique to the scope, so tables a crashed
+    process left in a database file never collide.
+
+    commit() advances the watermark once the run's flags are safely written.
+    """
+
+    SCOPES = ('rows', 'window', 'history')
+
+    def __init__(self, repo: DuckDBRepository, table_name: str = "transactions",
+                 lookback_intervals: Sequence[str] = ()) -> None:
+        self.repo = repo
+        self.table_name = table_name
+        self.lookback = (
+            f"GREATEST({', '.join(f'INTERVAL {i}' for i in lookback_intervals)})"
+            if lookback_intervals else "INTERVAL 0 SECOND"
+        )
+        self.prefix = f"_incr_{uuid.uuid4().hex[:12]}"
+        self.watermark = 0
+        self.latest_run = 0
+        self.new_row_count = 0
+        self._tables: Dict[str, str] = {}
+
+    def build(self) -> "IncrementalScope":
+        self.repo.execute("""
+            CREATE TABLE IF NOT EXISTS check_watermarks (
+                table_name VARCHAR PRIMARY KEY,
+                run_id INTEGER,
+                checked_at TIMESTAMP
+            )
+        """)
+        rows = self.repo.fetch_items(
+            "SELECT run_id FROM check_watermarks WHERE table_name = ?", (self.table_name,))
+        self.watermark = int(rows[0]['run_id']) if rows else 0
+        rows = self.repo.fetch_items(
+            f"SELECT COALESCE(MAX(ingest_run), 0) AS latest FROM {self.table_name}")
+        self.latest_run = int(rows[0]['latest'])
+
+        self._create('rows', f"""
+            SELECT * FROM {self.table_name}
+            WHERE ingest_run > {self.watermark} AND ingest_run <= {self.latest_run}
+        """)
+        touched = self._create('touched', f"""
+            SELECT user_id, MIN(timestamp) AS first_new, MAX(timestamp) AS last_new
+            FROM {self._tables['rows']}
+            GROUP BY user_id
+        """)
+        self._create('window', f"""
+            SELECT t.* FROM {self.table_name} t
+            JOIN {touched} u ON t.user_id = u.user_id
+            WHERE t.timestamp BETWEEN u.first_new - {self.lookback} AND u.last_new + {self.lookback}
+        """)
+        self._create('history', f"""
+            SELECT t.* FROM {self.table_name} t
+            JOIN {touched} u ON t.user_id = u.user_id
+        """)
+
+        rows = self.repo.fetch_items(f"SELECT COUNT(*) AS n FROM {self._tables['rows']}")
+        self.new_row_count = int(rows[0]['n'])
+        return self
+
+    def _create(self, scope: str, query: str) -> str:
+        name = f"{self.prefix}_{scope}"
+        self.repo.execute(f"CREATE OR REPLACE TABLE {name} AS {query}")
+        self._tables[scope] = name
+        return name
+
+    def table_for(self, scope: str) -> str:
+        return self._tables[scope]
+
+    def commit(self, staged: Sequence[Callable[[], None]] = ()) -> None:
+        """Mark every run up to latest_run as checked.
+
+        staged writes, such as state checkers built from the new rows, run
+        in the same transaction, so they land exactly when the watermark moves.
+        """
+        self.repo.conn.begin()
+        try:
+            for write in staged:
+                write()
+            self.repo.execute(
+                "INSERT OR REPLACE INTO check_watermarks VALUES (?, ?, now()::TIMESTAMP)",
+                (self.table_name, self.latest_run))
+        except BaseException:
+            self.repo.conn.rollback()
+            raise
+        self.repo.conn.commit()
+
+    def drop(self) -> None:
+        for name in self._tables.values():
+            self.repo.execute(f"DROP TABLE IF EXISTS {name}")
+        self._tables.clear()
+
+    def __enter__(self) -> "IncrementalScope":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.drop()
@@ -1,90 +1,207 @@
 """Main entry point for fraud detection system."""
+import argparse
+import glob
 import sys
-from pathlib import Path
-from typing import List
+import tempfile
+from contextlib import nullcontext
+from typing import List, Optional
 from execution_engine import ExecutionEngine
-from duckdb_repository import DuckDBRepository
-from checker import Transaction, FraudFlag
+from duckdb_repository import DuckDBRepository, DuckDBSettings, INGEST_FORMATS
+from checker import TransactionBatch, FraudFlag
+from stream_ingest import read_jsonl, micro_batches, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_BATCH_AGE
+from sinks import open_sink, SINK_FORMATS
+from engine_logging import LOG_FORMATS, LOG_POLICIES
 
 
-def load_transactions_from_csv(csv_path: str, repo: DuckDBRepository) -> List[Transaction]:
-    """Load transactions from CSV into DuckDB and return as Transaction objects."""
+def load_transactions_from_csv(csv_path: str, repo: DuckDBRepository) -> TransactionBatch:
+    """Load transactions from CSV into DuckDB and return them as a columnar batch."""
     row_count = repo.insert_from_csv(csv_path, 'transactions')
     print(f"Loaded {row_count} transactions from {csv_path}")
 
-    results = repo.fetch_items("SELECT * FROM transactions ORDER BY user_id, timestamp")
+    return TransactionBatch.from_repo(repo, 'transactions')
 
-    transactions = [
-        Transaction(
-            user_id=row['user_id'],
-            timestamp=str(row['timestamp']),
-            merchant_name=row['merchant_name'],
-            amount=float(row['amount'])
-        )
-        for row in results
-    ]
 
-    return transactions
-
-
-def write_results(flags: List[FraudFlag], output_path: str) -> None:
-    """Write fraud flags to output file."""
-    with open(output_path, 'w') as f:
-        f.write("Fraud Detection Results\n")
-        f.write("=" * 80 + "\n\n")
-
-        if not flags:
-            f.write("No suspicious transactions found.\n")
-            return
-
-        f.write(f"Total fraud patterns detected: {len(flags)}\n\n")
-
-        for i, flag in enumerate(flags, 1):
-            f.write(f"Pattern #{i}\n")
-            f.write(f"  Checker: {flag.checker_name}\n")
-            f.write(f"  Reason: {flag.reason}\n")
-            f.write(f"  Confidence: {flag.confidence_score:.2f}\n")
-            f.write(f"  Transactions ({flag.transaction_count}):\n")
-
-            for txn in flag.transactions:
-                f.write(f"    - {txn.user_id} | {txn.timestamp} | {txn.merchant_name} | ${txn.amount:.2f}\n")
-
-            f.write("\n")
+def write_results(flags: List[FraudFlag], output_path: str,
+                  output_format: Optional[str] = None, consolidate: bool = True) -> None:
+    """Write fraud flags to output file, one record per flagged transaction unless consolidate is off."""
+    with open_sink(output_path, output_format, consolidate=consolidate) as sink:
+        sink.write_all(flags)
 
     print(f"Results written to {output_path}")
 
 
-def main(csv_path: str, output_path: str = "fraud_results.txt") -> None:
-    """Main fraud detection pipeline."""
-    engine = ExecutionEngine()
-
-    engine.configure_checkers()
-
-    with DuckDBRepository() as repo:
-        transactions = load_transactions_from_csv(csv_path, repo)
-
-        print(f"\nRunning fraud detection on {len(transactions)} transactions...\n")
-
-        flags = engine.execute(transactions)
+def main_stream(input_path: str, output_path: str = "fraud_results.txt", follow: bool = False,
+                max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                max_batch_age: float = DEFAULT_MAX_BATCH_AGE, max_workers: int = 1,
+                output_format: Optional[str] = None, metrics_prometheus: Optional[str] = None,
+                metrics_json: Optional[str] = None, log_format: str = 'text',
+                log_policy: str = 'block') -> None:
+    """Streaming pipeline: JSONL in, micro-batches through the engine, flags out as found."""
+    engine = ExecutionEngine(max_workers=max_workers, log_format=log_format, log_policy=log_policy)
+    engine.configure_checkers(streaming=True)
+    engine.configure_metrics(metrics_prometheus, metrics_json)
+
+    source = sys.stdin if input_path == "-" else open(input_path)
+    sink = open_sink(output_path, output_format, streaming=True)
+    engine.attach_sink(sink)
+    try:
+        for batch in micro_batches(read_jsonl(source, follow), max_batch_size, max_batch_age):
+            engine.execute(batch)
+            sink.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.close()
+        if source is not sys.stdin:
+            source.close()
+
+    print(f"\nFound {sink.pattern_count} fraud patterns, written to {output_path}\n")
+    engine.shutdown()
 
-        print(f"\nFound {len(flags)} fraud patterns\n")
 
-    write_results(flags, output_path)
+def main(input_path: str, output_path: str = "fraud_results.txt", fused: bool = False,
+         max_workers: int = 1, db_path: str = ":memory:", incremental: bool = False,
+         approximate: bool = False, output_format: Optional[str] = None,
+         metrics_prometheus: Optional[str] = None, metrics_json: Optional[str] = None,
+         profile_sql: bool = False, log_format: str = 'text', log_policy: str = 'block',
+         consolidate: bool = True, shards: int = 1, shard_dir: Optional[str] = None,
+         settings: Optional[DuckDBSettings] = None, input_format: Optional[str] = None) -> None:
+    """Main fraud detection pipeline.
+
+    input_path is a CSV, Parquet or JSONL file or glob; input_format
+    defaults from its extension. With incremental, the input is appended
+    to the transactions table in db_path and only what the new rows can
+    affect is re-checked. With approximate, per-user medians come from
+    quantile sketches, kept in db_path when running incrementally.
+    Per-checker metrics go to metrics_prometheus and metrics_json on
+    shutdown. The report has one record per flagged
+    transaction with all its checker hits, or with consolidate off, one
+    block per flag. With shards > 1, the input is split by user_id into
+    Parquet shards under shard_dir (a temporary directory by default), each
+    checked in its own process. settings bound DuckDB's memory and threads;
+    past the memory limit it spills to disk, so with fused, where only
+    flagged rows reach Python, inputs larger than RAM can be checked.
+    """
+    engine = ExecutionEngine(max_workers=max_workers, log_format=log_format, log_policy=log_policy)
+    engine.configure_metrics(metrics_prometheus, metrics_json, profile_sql=profile_sql)
+
+    engine.configure_checkers(approximate=approximate,
+                              sketch_table='amount_sketches' if approximate and incremental else None)
+
+    shard_space = (tempfile.TemporaryDirectory() if shards > 1 and shard_dir is None
+                   else nullcontext(shard_dir))
+    with DuckDBRepository(db_path, settings) as repo, shard_space as shard_dir, \
+            open_sink(output_path, output_format, consolidate=consolidate) as sink:
+        engine.attach_sink(sink)
+        if shards > 1:
+            paths = repo.partition_files(input_path, shard_dir, shards, input_format)
+            print(f"Split {input_path} into {len(paths)} shards by user_id under {shard_dir}")
+        elif incremental:
+            row_count = repo.append_from_files(input_path, 'transactions', input_format)
+            print(f"Appended {row_count} transactions from {input_path} to {db_path}")
+        else:
+            row_count = repo.insert_from_files(input_path, 'transactions', input_format)
+            print(f"Loaded {row_count} transactions from {input_path}")
+
+        if shards > 1:
+            print(f"\nRunning sharded fraud detection on {len(paths)} shards...\n")
+            flags = engine.execute_sharded(paths, fused=fused, settings=settings)
+        elif incremental:
+            print(f"\nRunning incremental fraud detection on {row_count} new transactions...\n")
+            flags = engine.execute_incremental(repo)
+        elif fused:
+            print(f"\nRunning fused SQL fraud detection on {row_count} transactions...\n")
+            flags = engine.execute_sql(repo)
+        else:
+            print(f"\nRunning fraud detection on {row_count} transactions...\n")
+            flags = engine.execute_batches(TransactionBatch.iter_repo(repo), repo=repo)
+
+        if consolidate:
+            print(f"\nFound {len(flags)} fraud patterns over {len(sink.store)} transactions\n")
+        else:
+            print(f"\nFound {len(flags)} fraud patterns\n")
 
+    print(f"Results written to {output_path}")
     engine.shutdown()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <csv_file> [output_file]")
-        print("Example: python main.py sample_transactions.csv fraud_results.txt")
-        sys.exit(1)
-
-    csv_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "fraud_results.txt"
-
-    if not Path(csv_file).exists():
-        print(f"Error: File not found: {csv_file}")
+    parser = argparse.ArgumentParser(
+        description="Detect fraudulent patterns in a transactions CSV or JSONL stream.",
+        epilog="Example: python main.py sample_transactions.csv fraud_results.txt"
+    )
+    parser.add_argument("csv_file", help="Input transactions: a CSV, Parquet or JSONL file or quoted glob, "
+                                         "or JSONL with --stream ('-' for stdin)")
+    parser.add_argument("output_file", nargs="?", default="fraud_results.txt",
+                        help="Report path (default: fraud_results.txt)")
+    parser.add_argument("--input-format", choices=INGEST_FORMATS, default=None,
+                        help="Input format (default: from the input file extension, else CSV)")
+    parser.add_argument("--sql", action="store_true",
+                        help="Evaluate predicate checkers as one fused DuckDB scan")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Run independent checkers concurrently on this many threads")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read newline-delimited JSON transactions and process them in micro-batches")
+    parser.add_argument("--follow", action="store_true",
+                        help="With --stream, keep reading as the input file grows")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="With --stream, close a micro-batch at this many transactions")
+    parser.add_argument("--batch-age", type=float, default=DEFAULT_MAX_BATCH_AGE,
+                        help="With --stream, close a micro-batch after this many seconds")
+    parser.add_argument("--db", default=":memory:",
+                        help="DuckDB database file to keep transactions in (default: in-memory)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append to the --db table and re-check only what the new rows affect")
+    parser.add_argument("--format", choices=SINK_FORMATS, default=None,
+                        help="Output format (default: from the output file extension, else text)")
+    parser.add_argument("--approximate", action="store_true",
+                        help="Estimate per-user medians with mergeable quantile sketches")
+    parser.add_argument("--metrics-prom", metavar="FILE",
+                        help="Write per-checker metrics in Prometheus text format on exit")
+    parser.add_argument("--metrics-json", metavar="FILE",
+                        help="Write a JSON summary of per-checker metrics on exit")
+    parser.add_argument("--profile-sql", action="store_true",
+                        help="Include DuckDB's query profiles for SQL checkers in the metrics")
+    parser.add_argument("--per-checker", action="store_true",
+                        help="Report one block per checker flag instead of one record per transaction")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="text",
+                        help="Log as text lines or as JSON objects, one per line")
+    parser.add_argument("--log-policy", choices=LOG_POLICIES, default="block",
+                        help="When the log queue is full, wait for room or drop the record")
+    parser.add_argument("--memory-limit", metavar="SIZE",
+                        help="Cap DuckDB's memory, e.g. 12GB; beyond it DuckDB spills to --temp-dir")
+    parser.add_argument("--threads", type=int,
+                        help="DuckDB worker threads (default: one per core)")
+    parser.add_argument("--temp-dir", metavar="DIR",
+                        help="Where DuckDB spills (default: <db>.tmp, or .tmp for in-memory)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the input by user_id into this many shards, each checked in its own process")
+    parser.add_argument("--shard-dir", metavar="DIR",
+                        help="With --shards, write the shards to this new or empty directory "
+                             "(default: a temporary one)")
+    args = parser.parse_args()
+
+    if args.incremental and args.db == ":memory:":
+        parser.error("--incremental needs a persistent --db file")
+    if args.shards > 1 and (args.incremental or args.stream):
+        parser.error("--shards does not combine with --incremental or --stream")
+
+    if args.csv_file != "-" and not glob.glob(args.csv_file):
+        print(f"Error: File not found: {args.csv_file}")
         sys.exit(1)
 
-    main(csv_file, output_file)
+    if args.stream:
+        main_stream(args.csv_file, args.output_file, follow=args.follow,
+                    max_batch_size=args.batch_size, max_batch_age=args.batch_age,
+                    max_workers=args.workers, output_format=args.format,
+                    metrics_prometheus=args.metrics_prom, metrics_json=args.metrics_json,
+                    log_format=args.log_format, log_policy=args.log_policy)
+    else:
+        main(args.csv_file, args.output_file, fused=args.sql, max_workers=args.workers,
+             db_path=args.db, incremental=args.incremental, approximate=args.approximate,
+             output_format=args.format, metrics_prometheus=args.metrics_prom,
+             metrics_json=args.metrics_json, profile_sql=args.profile_sql,
+             log_format=args.log_format, log_policy=args.log_policy,
+             consolidate=not args.per_checker, shards=args.shards, shard_dir=args.shard_dir,
+             settings=DuckDBSettings(args.memory_limit, args.threads, args.temp_dir),
+             input_format=args.input_format)
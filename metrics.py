@@ -0,0 +1,185 @@
+"""In-process metrics for checker runs, exported as Prometheus text and JSON."""
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+DEFAULT_SAMPLE_INTERVAL = 0.01
+METRIC_PREFIX = "fraud_checker"
+
+# (name, type, help, summary() key)
+PROMETHEUS_METRICS: Tuple[Tuple[str, str, str, str], ...] = (
+    ("runs_total", "counter", "Checker invocations.", "runs"),
+    ("wall_seconds_total", "counter", "Wall-clock time spent in the checker.", "wall_seconds"),
+    ("cpu_seconds_total", "counter",
+     "Process CPU time while the checker ran, DuckDB threads included.", "cpu_seconds"),
+    ("input_rows_total", "counter", "Transactions the checker was given.", "input_rows"),
+    ("db_rows_total", "counter", "Rows the checker fetched from DuckDB.", "db_rows"),
+    ("flags_total", "counter", "Fraud flags produced.", "flags"),
+    ("flagged_transactions_total", "counter", "Transactions across produced flags.",
+     "flagged_transactions"),
+    ("peak_rss_delta_bytes", "gauge",
+     "Largest rise in resident memory over the start of any single run.", "peak_rss_delta_bytes"),
+    ("duckdb_latency_seconds_total", "counter", "DuckDB query latency from profiling.",
+     "duckdb_latency_seconds"),
+    ("duckdb_rows_scanned_total", "counter", "Rows DuckDB scanned, from profiling.",
+     "duckdb_rows_scanned"),
+)
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Process high-water mark; ru_maxrss is in KiB on Linux and bytes on macOS."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class CheckerRun:
+    """One checker invocation.
+
+    cpu_seconds is process CPU time, so it includes DuckDB's worker threads
+    and, with concurrent checkers, time spent by the others. profiles holds
+    DuckDB's JSON profile of each query when SQL profiling is on.
+    """
+    checker: str
+    started_at: float
+    input_rows: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    db_rows: int = 0
+    flags: int = 0
+    flagged_transactions: int = 0
+    rss_delta_bytes: int = 0
+    peak_rss_delta_bytes: int = 0
+    profiles: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class MetricsRegistry:
+    """Collects CheckerRun records from any thread.
+
+    While at least one run is being measured, a background thread samples
+    resident memory every sample_interval seconds to find each run's peak.
+    """
+
+    def __init__(self, sample_interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        self.sample_interval = sample_interval
+        self.runs: List[CheckerRun] = []
+        self._lock = threading.Lock()
+        self._active: Dict[int, List[int]] = {}
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def measure(self, checker: str, input_rows: int = 0) -> Iterator[CheckerRun]:
+        """Time the block and record it; the caller fills in flags and db_rows."""
+        run = CheckerRun(checker, time.time(), input_rows)
+        start_rss = current_rss_bytes()
+        with self._lock:
+            self._active[id(run)] = [start_rss, start_rss]
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True,
+                                                 name="metrics-rss")
+                self._sampler.start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield run
+        finally:
+            run.wall_seconds = time.perf_counter() - wall
+            run.cpu_seconds = time.process_time() - cpu
+            end_rss = current_rss_bytes()
+            with self._lock:
+                _, peak = self._active.pop(id(run))
+                run.rss_delta_bytes = end_rss - start_rss
+                run.peak_rss_delta_bytes = max(peak, end_rss) - start_rss
+                self.runs.append(run)
+
+    def add(self, runs: Iterable[CheckerRun]) -> None:
+        """Record runs measured by another registry, e.g. in a shard process."""
+        with self._lock:
+            self.runs.extend(runs)
+
+    def _sample(self) -> None:
+        while True:
+            rss = current_rss_bytes()
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                for watermark in self._active.values():
+                    watermark[1] = max(watermark[1], rss)
+            time.sleep(self.sample_interval)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per checker, in the order checkers first ran."""
+        with self._lock:
+            runs = list(self.runs)
+
+        totals: Dict[str, Dict[str, Any]] = {}
+        for run in runs:
+            entry = totals.setdefault(run.checker, {
+                'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'input_rows': 0,
+                'db_rows': 0, 'flags': 0, 'flagged_transactions': 0, 'peak_rss_delta_bytes': 0,
+                'duckdb_latency_seconds': 0.0, 'duckdb_rows_scanned': 0,
+            })
+            entry['runs'] += 1
+            for key in ('wall_seconds', 'cpu_seconds', 'input_rows', 'db_rows',
+                        'flags', 'flagged_transactions'):
+                entry[key] += getattr(run, key)
+            entry['peak_rss_delta_bytes'] = max(entry['peak_rss_delta_bytes'],
+                                                run.peak_rss_delta_bytes)
+            for profile in run.profiles:
+                entry['duckdb_latency_seconds'] += profile.get('latency', 0.0)
+                entry['duckdb_rows_scanned'] += profile.get('cumulative_rows_scanned', 0)
+        return totals
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format, one series per checker."""
+        summary = self.summary()
+        lines = []
+        for name, kind, help_text, key in PROMETHEUS_METRICS:
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for checker, entry in summary.items():
+                lines.append(f'{metric}{{checker="{_escape_label(checker)}"}} {entry[key]}')
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> Dict[str, Any]:
+        with self._lock:
+            runs = [asdict(run) for run in self.runs]
+        return {'checkers': self.summary(), 'runs': runs}
+
+    def write_prometheus(self, path: str) -> None:
+        _write_atomic(path, self.to_prometheus())
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.to_json(), indent=2) + "\n")
+
+    def clear(self) -> None:
+        with self._lock:
+            self.runs.clear()
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Write through a temporary file so scrapers never read a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
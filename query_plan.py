@@ -0,0 +1,106 @@
+"""Shared query plan for SQL-backed checkers."""
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+from collections import defaultdict
+from duckdb_repository import DuckDBRepository
+from checker.sql_checker import SQLChecker
+from checker.window_checker import WindowChecker, WindowSpec
+
+
+class QueryPlan:
+    """Materializes relations that several SQL checkers would otherwise recompute.
+
+    - user_stats: one GROUP BY user_id pass with COUNT, MEDIAN and AVG of amount.
+    - window hits: every WindowChecker that shares a PARTITION BY is evaluated in
+      one window pass, so the (partition, timestamp) sort and the table scan
+      happen once per partitioning instead of once per checker.
+
+    Relations are plain tables (not TEMP) so cursors on the same database can
+    read them; drop() removes them. Their names are unique to the plan, so
+    tables a crashed process left in a database file never collide.
+    """
+
+    def __init__(self, repo: DuckDBRepository, table_name: str = "transactions") -> None:
+        self.repo = repo
+        self.table_name = table_name
+        self.prefix = f"_plan_{uuid.uuid4().hex[:12]}"
+        self.user_stats: Optional[str] = None
+        self._window_hits: Dict[int, Tuple[str, str]] = {}
+        self._tables: List[str] = []
+
+    def build(self, checkers: Sequence[SQLChecker]) -> "QueryPlan":
+        relations = set().union(*(c.plan_relations() for c in checkers)) if checkers else set()
+        if 'user_stats' in relations:
+            self._build_user_stats()
+
+        by_partition: Dict[Tuple[str, ...], List[Tuple[WindowChecker, WindowSpec]]] = defaultdict(list)
+        for checker in checkers:
+            if isinstance(checker, WindowChecker):
+                spec = checker.get_window_spec()
+                if spec is not None:
+                    by_partition[spec.partition_by].append((checker, spec))
+
+        for group_index, (partition_by, members) in enumerate(by_partition.items()):
+            self._build_window_hits(group_index, partition_by, members)
+
+        return self
+
+    def window_hits(self, checker: WindowChecker) -> Optional[Tuple[str, str]]:
+        """(table, boolean column) marking the partitions where checker fires."""
+        return self._window_hits.get(id(checker))
+
+    def _create(self, suffix: str, query: str) -> str:
+        name = f"{self.prefix}_{suffix}"
+        self.repo.execute(f"CREATE OR REPLACE TABLE {name} AS {query}")
+        self._tables.append(name)
+        return name
+
+    def _build_user_stats(self) -> None:
+        self.user_stats = self._create("user_stats", f"""
+            SELECT
+                user_id,
+                COUNT(*) AS txn_count,
+                MEDIAN(amount) AS median_amount,
+                AVG(amount) AS avg_amount
+            FROM {self.table_name}
+            GROUP BY user_id
+        """)
+
+    def _build_window_hits(self, group_index: int, partition_by: Tuple[str, ...],
+                           members: List[Tuple[WindowChecker, WindowSpec]]) -> None:
+        keys = ', '.join(partition_by)
+        values = ",\n".join(
+            f"{spec.window_expression()} AS w{i}" for i, (_, spec) in enumerate(members)
+        )
+        hits = ",\n".join(
+            f"BOOL_OR(w{i} > {spec.threshold}) AS hit_{i}" for i, (_, spec) in enumerate(members)
+        )
+        any_hit = " OR ".join(f"BOOL_OR(w{i} > {spec.threshold})" for i, (_, spec) in enumerate(members))
+
+        table = self._create(f"windows_{group_index}", f"""
+            SELECT {keys},
+                {hits}
+            FROM (
+                SELECT {keys},
+                    {values}
+                FROM {self.table_name}
+            )
+            GROUP BY {keys}
+            HAVING {any_hit}
+        """)
+
+        for i, (checker, _) in enumerate(members):
+            self._window_hits[id(checker)] = (table, f"hit_{i}")
+
+    def drop(self) -> None:
+        for name in self._tables:
+            self.repo.execute(f"DROP TABLE IF EXISTS {name}")
+        self._tables.clear()
+        self._window_hits.clear()
+        self.user_stats = None
+
+    def __enter__(self) -> "QueryPlan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.drop()
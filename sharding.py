@@ -0,0 +1,103 @@
+"""Sharded execution: transactions split by user_id, each shard checked in its own process."""
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple, Union
+import numpy as np
+from checker import FraudChecker, FraudFlag, RowRefs, RowStore, Transaction, TransactionBatch
+from duckdb_repository import DuckDBRepository, DuckDBSettings
+from metrics import CheckerRun
+
+# Workers are forked where possible: spawned ones re-import the caller's
+# __main__ module, which scripts without a __main__ guard do not survive.
+START_METHOD = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+# (checker name, reason, confidence, row ids, or Transactions for flags without them)
+PackedFlag = Tuple[str, str, float, Union[np.ndarray, List[Transaction]]]
+
+
+@dataclass
+class ShardResult:
+    """What a shard process sends back: its flags, the rows they refer to, and its checker runs."""
+    source: str
+    flags: List[PackedFlag]
+    rows: Dict[str, np.ndarray]
+    runs: List[CheckerRun]
+
+
+def init_worker() -> None:
+    """Drop the engine log handler a forked worker inherits; its listener thread is not inherited."""
+    logging.getLogger("FraudDetectionEngine").handlers.clear()
+
+
+def run_shard(source: str, checkers: List[FraudChecker], fused: bool, settings: DuckDBSettings,
+              engine_options: Dict[str, Any]) -> ShardResult:
+    """Check the Parquet files at source with a new engine and in-memory DuckDB database.
+
+    Runs in a worker process. fused runs the checkers as execute_sql does,
+    otherwise as execute_batches does.
+    """
+    # Imported here: the engine imports this module.
+    from execution_engine import ExecutionEngine
+
+    engine = ExecutionEngine(**engine_options)
+    engine.checkers = checkers
+    try:
+        with DuckDBRepository(settings=settings) as repo:
+            repo.insert_from_files(source, "transactions", 'parquet')
+            engine.logger.info("Checking shard %s", source)
+            if fused:
+                flags = engine.execute_sql(repo)
+            else:
+                flags = engine.execute_batches(TransactionBatch.iter_repo(repo), repo=repo)
+
+            packed: List[PackedFlag] = [
+                (flag.checker_name, flag.reason, flag.confidence_score,
+                 flag.row_ids if flag.row_ids is not None else list(flag.transactions))
+                for flag in flags
+            ]
+            row_ids = [flag.row_ids for flag in flags if flag.row_ids is not None]
+            rows = repo.row_store.columns(np.unique(np.concatenate(row_ids))) if row_ids else {}
+            return ShardResult(source, packed, rows, list(engine.metrics.runs))
+    finally:
+        engine.shutdown()
+
+
+def merge_shards(results: Iterable[ShardResult], store: RowStore,
+                 merged_checkers: Set[str]) -> List[FraudFlag]:
+    """The shards' flags, ordered by user within each checker as an unsharded run orders them.
+
+    Flags of merged_checkers, which an unsharded run reports once per
+    (checker, reason, confidence), are merged across shards; every other
+    flag is kept as it is. Flagged rows are added to store.
+    """
+    flags: List[FraudFlag] = []
+    merged: Dict[Tuple[str, str, float], FraudFlag] = {}
+    for result in results:
+        if result.rows:
+            store.add(TransactionBatch.from_columns(result.rows))
+        for name, reason, confidence, rows in result.flags:
+            transactions = RowRefs(store, rows) if isinstance(rows, np.ndarray) else rows
+            key = (name, reason, confidence)
+            if name not in merged_checkers:
+                flags.append(FraudFlag(transactions, name, reason, confidence))
+            elif key in merged:
+                merged[key].extend(transactions)
+            else:
+                merged[key] = FraudFlag(transactions, name, reason, confidence)
+                flags.append(merged[key])
+
+    for flag in merged.values():
+        flag.transactions = _by_user(flag.transactions)
+    # Users sit in one shard each, so a stable sort by first user restores the unsharded order.
+    first_users = {id(flag): flag.transactions[0].user_id for flag in flags}
+    return sorted(flags, key=lambda flag: first_users[id(flag)])
+
+
+def _by_user(transactions: Sequence[Transaction]) -> Sequence[Transaction]:
+    """transactions grouped by user in sorted order, each user's rows kept in their order."""
+    if isinstance(transactions, RowRefs):
+        users = transactions.store.columns(transactions.row_ids)['user_id']
+        _, codes = np.unique(users, return_inverse=True)
+        return RowRefs(transactions.store, transactions.row_ids[np.argsort(codes, kind='stable')])
+    return sorted(transactions, key=lambda t: t.user_id)
@@ -0,0 +1,416 @@
+"""Result sinks that write fraud flags as they are produced."""
+import csv
+import itertools
+import json
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from checker import FraudFlag, RowRefs
+from checker.fraud_checker import format_timestamp, format_timestamps
+from flag_store import FlagStore, FlaggedTransaction
+
+SINK_FORMATS = ('text', 'jsonl', 'csv', 'parquet')
+FLAG_COLUMNS = ('pattern', 'checker', 'reason', 'confidence',
+                'user_id', 'timestamp', 'merchant_name', 'amount')
+CONSOLIDATED_COLUMNS = ('user_id', 'timestamp', 'merchant_name', 'amount',
+                        'risk_score', 'hit_count', 'checkers', 'reasons')
+DEFAULT_SPOOL_BYTES = 8 * 1024 * 1024
+DEFAULT_ROW_GROUP_SIZE = 100_000
+FORMAT_BLOCK_SIZE = 65_536
+
+
+class FlagSink(ABC):
+    """Receives flags one at a time; close() finishes the output.
+
+    Patterns are numbered in the order they arrive, starting at 1.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.pattern_count = 0
+        self.row_count = 0
+
+    def write(self, flag: FraudFlag) -> None:
+        self.pattern_count += 1
+        self.row_count += flag.transaction_count
+        self._write(self.pattern_count, flag)
+
+    def write_all(self, flags: Iterable[FraudFlag]) -> None:
+        for flag in flags:
+            self.write(flag)
+
+    @abstractmethod
+    def _write(self, pattern: int, flag: FraudFlag) -> None:
+        ...
+
+    def flush(self) -> None:
+        """Make everything written so far visible to readers, where the format allows it."""
+
+    @abstractmethod
+    def close(self) -> None:
+        ...
+
+    def __enter__(self) -> "FlagSink":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
+
+
+def flag_columns(pattern: int, flag: FraudFlag) -> Dict[str, List[Any]]:
+    """One row per flagged transaction, FLAG_COLUMNS in order."""
+    n = flag.transaction_count
+    user_id, timestamp, merchant_name, amount = transaction_fields(flag)
+    return {
+        'pattern': [pattern] * n,
+        'checker': [flag.checker_name] * n,
+        'reason': [flag.reason] * n,
+        'confidence': [flag.confidence_score] * n,
+        'user_id': user_id,
+        'timestamp': timestamp,
+        'merchant_name': merchant_name,
+        'amount': amount,
+    }
+
+
+def transaction_fields(flag: FraudFlag) -> Tuple[List[Any], List[str], List[Any], List[float]]:
+    """user_id, timestamp, merchant_name and amount of the flag's transactions.
+
+    Timestamps are formatted here, for output. RowRefs are read column by
+    column from their store, without building Transaction objects.
+    """
+    if isinstance(flag.transactions, RowRefs):
+        columns = flag.transactions.store.columns(flag.transactions.row_ids)
+        return (columns['user_id'].tolist(), format_timestamps(columns['timestamp']).tolist(),
+                columns['merchant_name'].tolist(), columns['amount'].tolist())
+    transactions = flag.transactions
+    timestamps = np.fromiter((t.timestamp for t in transactions), dtype=np.int64, count=len(transactions))
+    return ([t.user_id for t in transactions], format_timestamps(timestamps).tolist(),
+            [t.merchant_name for t in transactions], [float(t.amount) for t in transactions])
+
+
+class TextReportSink(FlagSink):
+    """The human-readable report, one block per pattern.
+
+    The total goes at the top, so blocks are spooled (in memory up to
+    spool_bytes, then in a temporary file) and copied after the header on
+    close(). With streaming, blocks go straight to the file under a
+    streaming header and no total is written.
+    """
+
+    def __init__(self, path: str, streaming: bool = False,
+                 spool_bytes: int = DEFAULT_SPOOL_BYTES) -> None:
+        super().__init__(path)
+        self.streaming = streaming
+        if streaming:
+            self._out = open(path, 'w')
+            self._out.write("Fraud Detection Results (streaming)\n")
+            self._out.write("=" * 80 + "\n\n")
+            self._out.flush()
+        else:
+            self._out = tempfile.SpooledTemporaryFile(max_size=spool_bytes, mode='w+')
+
+    def _write(self, pattern: int, flag: FraudFlag) -> None:
+        self._out.write(format_flag(pattern, flag))
+
+    def flush(self) -> None:
+        self._out.flush()
+
+    def close(self) -> None:
+        if self._out.closed:
+            return
+        if self.streaming:
+            self._out.close()
+            return
+
+        with open(self.path, 'w') as f:
+            f.write("Fraud Detection Results\n")
+            f.write("=" * 80 + "\n\n")
+
+            if not self.pattern_count:
+                f.write("No suspicious transactions found.\n")
+            else:
+                f.write(f"Total fraud patterns detected: {self.pattern_count}\n\n")
+                self._out.seek(0)
+                shutil.copyfileobj(self._out, f)
+        self._out.close()
+
+
+def format_flag(pattern: int, flag: FraudFlag) -> str:
+    """One pattern block of the text report."""
+    lines = [
+        f"Pattern #{pattern}\n",
+        f"  Checker: {flag.checker_name}\n",
+        f"  Reason: {flag.reason}\n",
+        f"  Confidence: {flag.confidence_score:.2f}\n",
+        f"  Transactions ({flag.transaction_count}):\n",
+    ]
+    lines.extend(
+        f"    - {user_id} | {timestamp} | {merchant_name} | ${amount:.2f}\n"
+        for user_id, timestamp, merchant_name, amount in zip(*transaction_fields(flag))
+    )
+    lines.append("\n")
+    return "".join(lines)
+
+
+class JsonlSink(FlagSink):
+    """One JSON object per flagged transaction with FLAG_COLUMNS as keys."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._out = open(path, 'w')
+
+    def _write(self, pattern: int, flag: FraudFlag) -> None:
+        columns = flag_columns(pattern, flag)
+        self._out.writelines(
+            json.dumps(dict(zip(FLAG_COLUMNS, row))) + "\n"
+            for row in zip(*(columns[name] for name in FLAG_COLUMNS))
+        )
+
+    def flush(self) -> None:
+        self._out.flush()
+
+    def close(self) -> None:
+        self._out.close()
+
+
+class CsvSink(FlagSink):
+    """CSV with a FLAG_COLUMNS header and one row per flagged transaction."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._out = open(path, 'w', newline='')
+        self._writer = csv.writer(self._out)
+        self._writer.writerow(FLAG_COLUMNS)
+
+    def _write(self, pattern: int, flag: FraudFlag) -> None:
+        columns = flag_columns(pattern, flag)
+        self._writer.writerows(zip(*(columns[name] for name in FLAG_COLUMNS)))
+
+    def flush(self) -> None:
+        self._out.flush()
+
+    def close(self) -> None:
+        self._out.close()
+
+
+class ParquetSink(FlagSink):
+    """Parquet with FLAG_COLUMNS, one row group per row_group_size flagged transactions.
+
+    Writes row groups through pyarrow when it is installed. Otherwise rows
+    are staged in an in-memory DuckDB table and written with COPY on close().
+    """
+
+    def __init__(self, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> None:
+        super().__init__(path)
+        self.row_group_size = row_group_size
+        self._pending: Dict[str, List[Any]] = {name: [] for name in FLAG_COLUMNS}
+        self._writer: Any = None
+        self._staging: Any = None
+        self._closed = False
+
+    def _write(self, pattern: int, flag: FraudFlag) -> None:
+        for name, values in flag_columns(pattern, flag).items():
+            self._pending[name].extend(values)
+        if len(self._pending['pattern']) >= self.row_group_size:
+            self._write_pending()
+
+    def flush(self) -> None:
+        self._write_pending()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._write_pending(final=True)
+        if self._writer is not None:
+            self._writer.close()
+        if self._staging is not None:
+            self._staging.execute(f"COPY flags TO '{self.path}' (FORMAT PARQUET)")
+            self._staging.close()
+        self._closed = True
+
+    def _write_pending(self, final: bool = False) -> None:
+        if not self._pending['pattern'] and not (final and self._writer is None
+                                                 and self._staging is None):
+            return
+        columns = {
+            'pattern': np.array(self._pending['pattern'], dtype=np.int64),
+            'checker': np.array(self._pending['checker'], dtype=object),
+            'reason': np.array(self._pending['reason'], dtype=object),
+            'confidence': np.array(self._pending['confidence'], dtype=np.float64),
+            'user_id': np.array(self._pending['user_id'], dtype=object),
+            'timestamp': np.array(self._pending['timestamp'], dtype=object),
+            'merchant_name': np.array(self._pending['merchant_name'], dtype=object),
+            'amount': np.array(self._pending['amount'], dtype=np.float64),
+        }
+        self._pending = {name: [] for name in FLAG_COLUMNS}
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            self._stage(columns)
+            return
+
+        schema = pyarrow.schema([
+            ('pattern', pyarrow.int64()), ('checker', pyarrow.string()),
+            ('reason', pyarrow.string()), ('confidence', pyarrow.float64()),
+            ('user_id', pyarrow.string()), ('timestamp', pyarrow.string()),
+            ('merchant_name', pyarrow.string()), ('amount', pyarrow.float64()),
+        ])
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, schema)
+        self._writer.write_table(pyarrow.table(columns, schema=schema))
+
+    def _stage(self, columns: Dict[str, np.ndarray]) -> None:
+        import duckdb
+        if self._staging is None:
+            self._staging = duckdb.connect()
+            self._staging.execute("""
+                CREATE TABLE flags (
+                    pattern BIGINT, checker VARCHAR, reason VARCHAR, confidence DOUBLE,
+                    user_id VARCHAR, timestamp VARCHAR, merchant_name VARCHAR, amount DOUBLE
+                )
+            """)
+        self._staging.register('pending_flags', columns)
+        self._staging.execute("INSERT INTO flags SELECT * FROM pending_flags")
+        self._staging.unregister('pending_flags')
+
+
+class ConsolidatedSink(FlagSink):
+    """Collects flags in a FlagStore and writes one record per flagged transaction on close().
+
+    Each record lists every checker hit against the transaction and their
+    combined risk score, highest risk first. Text is a readable report;
+    jsonl, csv and parquet have CONSOLIDATED_COLUMNS, with checkers and
+    reasons joined by '; '.
+    """
+
+    def __init__(self, path: str, format: str = 'text') -> None:
+        if format not in SINK_FORMATS:
+            raise ValueError(f"Unknown sink format {format!r}, expected one of {SINK_FORMATS}")
+        super().__init__(path)
+        self.format = format
+        self.store = FlagStore()
+        self._closed = False
+
+    def _write(self, pattern: int, flag: FraudFlag) -> None:
+        self.store.add(flag)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self.format == 'text':
+            self._write_text()
+            return
+
+        columns: Dict[str, List[Any]] = {name: [] for name in CONSOLIDATED_COLUMNS}
+        for entry in self.store.entries():
+            txn = entry.transaction
+            columns['user_id'].append(txn.user_id)
+            columns['timestamp'].append(txn.timestamp)
+            columns['merchant_name'].append(txn.merchant_name)
+            columns['amount'].append(float(txn.amount))
+            columns['risk_score'].append(round(entry.risk_score, 4))
+            columns['hit_count'].append(len(entry.hits))
+            columns['checkers'].append("; ".join(checker for checker, _, _ in entry.hits))
+            columns['reasons'].append("; ".join(reason for _, reason, _ in entry.hits))
+        columns['timestamp'] = format_timestamps(np.array(columns['timestamp'], dtype=np.int64)).tolist()
+
+        if self.format == 'parquet':
+            write_parquet(self.path, columns)
+            return
+        with open(self.path, 'w', newline='') as f:
+            rows = zip(*(columns[name] for name in CONSOLIDATED_COLUMNS))
+            if self.format == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(CONSOLIDATED_COLUMNS)
+                writer.writerows(rows)
+            else:
+                f.writelines(json.dumps(dict(zip(CONSOLIDATED_COLUMNS, row))) + "\n" for row in rows)
+
+    def _write_text(self) -> None:
+        with open(self.path, 'w') as f:
+            f.write("Fraud Detection Results\n")
+            f.write("=" * 80 + "\n\n")
+            if not len(self.store):
+                f.write("No suspicious transactions found.\n")
+                return
+            f.write(f"Flagged transactions: {len(self.store)} "
+                    f"({self.store.hit_count} checker hits from {self.pattern_count} patterns)\n\n")
+            f.write("Hits:\n")
+            f.writelines(f"  [{i + 1}] {checker} ({confidence:.2f}): {reason}\n"
+                         for i, (checker, reason, confidence) in enumerate(self.store.hits))
+            f.write("\nTransactions, highest risk first:\n")
+            labels: Dict[Tuple[int, ...], str] = {}
+            entries = self.store.entries()
+            while True:
+                block = list(itertools.islice(entries, FORMAT_BLOCK_SIZE))
+                if not block:
+                    break
+                timestamps = format_timestamps(np.array(
+                    [entry.transaction.timestamp for entry in block], dtype=np.int64))
+                for entry, timestamp in zip(block, timestamps.tolist()):
+                    label = labels.get(entry.hit_ids)
+                    if label is None:
+                        label = labels[entry.hit_ids] = hit_label(entry)
+                    f.write(format_entry(entry, label, timestamp))
+
+
+def hit_label(entry: FlaggedTransaction) -> str:
+    return ", ".join(str(h + 1) for h in entry.hit_ids)
+
+
+def format_entry(entry: FlaggedTransaction, label: Optional[str] = None,
+                 timestamp: Optional[str] = None) -> str:
+    """One transaction line of the consolidated text report; hits refer to the Hits list.
+
+    timestamp is the formatted timestamp, when the caller formatted a block of them at once.
+    """
+    txn = entry.transaction
+    if timestamp is None:
+        timestamp = format_timestamp(txn.timestamp)
+    return (f"  {txn.user_id} | {timestamp} | {txn.merchant_name} | ${txn.amount:.2f}"
+            f" | risk {entry.risk_score:.2f} | hits {label or hit_label(entry)}\n")
+
+
+def write_parquet(path: str, columns: Dict[str, List[Any]]) -> None:
+    """Write whole columns to one Parquet file, through pyarrow or else DuckDB."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        import duckdb
+        conn = duckdb.connect()
+        conn.register('columns', {name: np.array(values) for name, values in columns.items()})
+        conn.execute(f"COPY (SELECT * FROM columns) TO '{path}' (FORMAT PARQUET)")
+        conn.close()
+        return
+    pyarrow.parquet.write_table(pyarrow.table(columns), path)
+
+
+def open_sink(path: str, format: Optional[str] = None, streaming: bool = False,
+              consolidate: bool = False) -> FlagSink:
+    """Open a sink for path. format defaults from the extension; anything unknown is text.
+
+    With consolidate, overlapping flags are merged per transaction; see
+    ConsolidatedSink. It writes only on close(), so streaming is ignored.
+    """
+    if format is None:
+        format = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv',
+                  '.parquet': 'parquet'}.get(Path(path).suffix.lower(), 'text')
+    if consolidate:
+        return ConsolidatedSink(path, format)
+    if format == 'jsonl':
+        return JsonlSink(path)
+    if format == 'csv':
+        return CsvSink(path)
+    if format == 'parquet':
+        return ParquetSink(path)
+    if format == 'text':
+        return TextReportSink(path, streaming=streaming)
+    raise ValueError(f"Unknown sink format {format!r}, expected one of {SINK_FORMATS}")
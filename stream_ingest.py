@@ -0,0 +1,109 @@
+"""Newline-delimited JSON transaction streams and micro-batching."""
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Any, Iterable, Iterator, List, TextIO
+from checker import Transaction
+
+DEFAULT_MAX_BATCH_SIZE = 1000
+DEFAULT_MAX_BATCH_AGE = 1.0
+
+
+def read_lines(source: TextIO, follow: bool = False, poll_interval: float = 0.25) -> Iterator[str]:
+    """Yield complete lines from source. With follow, keep waiting for appended data."""
+    pending = ""
+    while True:
+        chunk = source.readline()
+        if not chunk:
+            if not follow:
+                if pending:
+                    yield pending
+                return
+            time.sleep(poll_interval)
+            continue
+        pending += chunk
+        if pending.endswith("\n"):
+            yield pending
+            pending = ""
+
+
+def parse_transaction(line: str) -> Transaction:
+    """Parse one JSON record; raises ValueError, KeyError or TypeError if it is malformed.
+
+    timestamp must be ISO 8601 text, as batch JSONL ingest reads it. A
+    number could be epoch seconds or microseconds, so it is rejected
+    rather than guessed.
+    """
+    record = json.loads(line)
+    timestamp = record['timestamp']
+    if not isinstance(timestamp, str):
+        raise ValueError(f"timestamp must be ISO 8601 text, got {timestamp!r}")
+    return Transaction(
+        user_id=str(record['user_id']),
+        timestamp=timestamp,
+        merchant_name=str(record['merchant_name']),
+        amount=float(record['amount'])
+    )
+
+
+def read_jsonl(source: TextIO, follow: bool = False) -> Iterator[Transaction]:
+    """Parse one transaction per line, skipping blank and malformed lines."""
+    for line_number, line in enumerate(read_lines(source, follow), 1):
+        if not line.strip():
+            continue
+        try:
+            yield parse_transaction(line)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Skipping malformed line {line_number}: {e}", file=sys.stderr)
+
+
+_END = object()
+
+
+def micro_batches(records: Iterable[Transaction],
+                  max_size: int = DEFAULT_MAX_BATCH_SIZE,
+                  max_age: float = DEFAULT_MAX_BATCH_AGE) -> Iterator[List[Transaction]]:
+    """Group records into batches closed by size or by the age of their first record.
+
+    Records are pulled on a background thread into a queue bounded by max_size,
+    so a slow source still gets its partial batch flushed after max_age seconds
+    and memory never exceeds roughly two batches.
+    """
+    pipe: "queue.Queue[Any]" = queue.Queue(maxsize=max_size)
+
+    def pump() -> None:
+        try:
+            for record in records:
+                pipe.put(record)
+        except BaseException as e:  # surfaced to the consumer below
+            pipe.put(e)
+        pipe.put(_END)
+
+    threading.Thread(target=pump, name="stream-reader", daemon=True).start()
+
+    batch: List[Transaction] = []
+    deadline = 0.0
+    while True:
+        timeout = max(0.0, deadline - time.monotonic()) if batch else None
+        try:
+            item = pipe.get(timeout=timeout)
+        except queue.Empty:
+            yield batch
+            batch = []
+            continue
+
+        if item is _END:
+            if batch:
+                yield batch
+            return
+        if isinstance(item, BaseException):
+            raise item
+
+        if not batch:
+            deadline = time.monotonic() + max_age
+        batch.append(item)
+        if len(batch) >= max_size:
+            yield batch
+            batch = []
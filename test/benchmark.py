@@ -0,0 +1,242 @@
+"""End-to-end pipeline benchmark with JSON baselines and regression checks.
+
+Examples:
+    python test/benchmark.py --sizes 10k,100k,1m --output baseline.json
+    python test/benchmark.py --sizes 10k,100k,1m --compare baseline.json --threshold 0.25
+
+Each size runs in its own process so peak RSS is not inherited from earlier
+sizes. Every stage runs --repeat times, keeping its fastest and median wall
+time and median peak RSS. --compare flags a stage only when its fastest time
+is past the baseline's median by --threshold, so one slow sample, in either
+run, does not read as a regression.
+Datasets come from test/generate_large_dataset.py and are cached in
+--data-dir.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from metrics import current_rss_bytes
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 5
+MIN_SECONDS = 0.05
+MIN_RSS_MB = 16.0
+
+
+def parse_size(text: str) -> int:
+    return SIZES.get(text.lower()) or int(text.replace('_', ''))
+
+
+def generate_dataset(path: Path, rows: int, seed: int = 42) -> None:
+    """Write rows transactions with test/generate_large_dataset.py."""
+    from test.generate_large_dataset import generate
+    generate(str(path), rows, users=max(rows // 100, 10), seed=seed)
+
+
+class PeakRSS:
+    """Samples resident memory on a background thread; peak_mb is the highest seen."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _current_mb(self) -> float:
+        return current_rss_bytes() / 2**20
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self._current_mb())
+            time.sleep(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        self.peak_mb = self._current_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._current_mb())
+
+
+def stage(results: Dict[str, Dict[str, float]], name: str, rows: int, repeat: int,
+          run: Callable[[], Any], setup: Optional[Callable[[], None]] = None) -> Any:
+    """Time run repeat times, after an untimed setup each time; returns the last run's result.
+
+    results[name] gets the fastest and median wall time, and the median peak RSS.
+    """
+    walls: List[float] = []
+    peaks: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            value = run()
+            walls.append(time.perf_counter() - start)
+        peaks.append(rss.peak_mb)
+    wall = min(walls)
+    peak = statistics.median(peaks)
+    results[name] = {
+        'wall_s': round(wall, 4),
+        'median_wall_s': round(statistics.median(walls), 4),
+        'peak_rss_mb': round(peak, 1),
+        'rows_per_sec': round(rows / wall) if wall > 0 else 0,
+        'repeat': repeat,
+    }
+    print(f"  {name:<40} {wall:8.3f}s {peak:8.1f} MB {rows / max(wall, 1e-9):14,.0f} rows/s",
+          file=sys.stderr)
+    return value
+
+
+def run_size(csv_path: Path, rows: int, repeat: int = DEFAULT_REPEAT) -> Dict[str, Dict[str, float]]:
+    """Time every pipeline stage on one dataset, each repeat times."""
+    from checker import PredicateBasedChecker, SQLChecker
+    from duckdb_repository import DuckDBRepository
+    from execution_engine import ExecutionEngine
+    from main import load_transactions_from_csv
+    from sinks import open_sink
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = ExecutionEngine(log_file=str(Path(tmp) / "benchmark.log"))
+        engine.configure_checkers()
+
+        with DuckDBRepository() as repo:
+            stage(results, "ingest", rows, repeat,
+                  lambda: repo.insert_from_csv(str(csv_path), 'transactions'),
+                  lambda: repo.execute("DROP TABLE IF EXISTS transactions"))
+
+        with DuckDBRepository() as repo:
+            transactions = stage(results, "load_transactions_from_csv", rows, repeat,
+                                 lambda: load_transactions_from_csv(str(csv_path), repo),
+                                 lambda: repo.execute("DROP TABLE IF EXISTS transactions"))
+
+            def check(checker: Any) -> List[Any]:
+                if isinstance(checker, SQLChecker):
+                    return checker.check_with_repo(repo)
+                if isinstance(checker, PredicateBasedChecker):
+                    return checker.check(transactions)
+                return []
+
+            flags = []
+            for checker in engine.checkers:
+                flags.extend(stage(results, f"checker:{checker.name}", rows, repeat,
+                                   lambda checker=checker: check(checker)))
+
+            stage(results, "execute_sql", rows, repeat, lambda: engine.execute_sql(repo))
+
+        flagged_rows = sum(flag.transaction_count for flag in flags)
+        def write(path: Path) -> None:
+            with open_sink(str(path)) as sink:
+                sink.write_all(flags)
+
+        for suffix in ("txt", "parquet"):
+            stage(results, f"output:{suffix}", flagged_rows, repeat,
+                  lambda path=Path(tmp) / f"results.{suffix}": write(path))
+
+    return results
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Stages whose fastest wall time or median peak RSS grew by more than threshold.
+
+    Wall times are compared with the baseline's median, or its only sample
+    for baselines written before --repeat.
+    """
+    regressions = []
+    for size, run in current['sizes'].items():
+        base_run = baseline['sizes'].get(size)
+        if base_run is None:
+            continue
+        for name, now in run.items():
+            before = base_run.get(name)
+            if before is None:
+                continue
+            # This run's fastest time against the baseline's typical one, so
+            # process-to-process noise in the baseline does not count either.
+            typical = before.get('median_wall_s', before['wall_s'])
+            if now['wall_s'] > typical * (1 + threshold) and now['wall_s'] - typical > MIN_SECONDS:
+                regressions.append(f"{size} {name}: wall {typical:.3f}s -> {now['wall_s']:.3f}s")
+            if now['peak_rss_mb'] > before['peak_rss_mb'] * (1 + threshold) and \
+                    now['peak_rss_mb'] - before['peak_rss_mb'] > MIN_RSS_MB:
+                regressions.append(f"{size} {name}: peak RSS {before['peak_rss_mb']:.1f} MB -> "
+                                   f"{now['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the fraud detection pipeline.")
+    parser.add_argument("--sizes", default="10k,100k,1m",
+                        help="Comma-separated row counts; 10k, 100k, 1m and 10m are accepted")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "fraud-benchmark"),
+                        help="Where generated datasets are cached")
+    parser.add_argument("--output", help="Write results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative growth before a stage counts as regressed")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Runs per stage; the fastest time and median peak RSS are compared")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.single is not None:
+        with redirect_stdout(io.StringIO()):
+            results = run_size(data_dir / f"transactions_{args.single}.csv", args.single, args.repeat)
+        Path(args.result_file).write_text(json.dumps(results))
+        return 0
+
+    current: Dict[str, Any] = {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                 'cpus': os.cpu_count(), 'created': time.strftime('%Y-%m-%d %H:%M:%S')},
+        'sizes': {},
+    }
+    for text in args.sizes.split(','):
+        rows = parse_size(text.strip())
+        csv_path = data_dir / f"transactions_{rows}.csv"
+        if not csv_path.exists():
+            print(f"Generating {rows:,} rows -> {csv_path}", file=sys.stderr)
+            generate_dataset(csv_path, rows)
+
+        print(f"\n{rows:,} rows", file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+            subprocess.run([sys.executable, __file__, "--single", str(rows), "--data-dir", str(data_dir),
+                            "--repeat", str(args.repeat), "--result-file", result_file.name], check=True)
+            current['sizes'][str(rows)] = json.loads(Path(result_file.name).read_text())
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2) + "\n")
+        print(f"\nBaseline written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), current, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressions past {args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"\n✓ No stage regressed past {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
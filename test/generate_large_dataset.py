@@ -1,96 +1,291 @@
-"""Generate 1M transaction dataset with fraud patterns."""
-import csv
-import random
-from datetime import datetime, timedelta
+"""Generate a reproducible transaction dataset with labelled fraud patterns.
+
+Examples:
+    python test/generate_large_dataset.py --rows 1000000 --seed 42
+    python test/generate_large_dataset.py --rows 100000000 --users 1000000 --format parquet \\
+        --output transactions_100m.parquet --hot-users 0.01 --hot-share 0.3 --time-skew 1.5
+
+Rows are generated a chunk at a time with NumPy and written as they are
+produced, so memory stays flat however large --rows is. The output has
+exactly --rows rows; a fraud pattern cut off by the end of the file is
+truncated. The label file has one row per transaction (row_id, event_id,
+fraud_type), with fraud_type 'normal' for non-fraud rows.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import numpy as np
 
-# Configuration
 NUM_TRANSACTIONS = 1_000_000
 NUM_USERS = 10_000
 OUTPUT_FILE = "transactions_1m.csv"
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_FRAUD_RATE = 0.05
+DEFAULT_DAYS = 300
+START = np.datetime64('2025-01-01T00:00:00', 's')
 
-# Merchants by category
-NORMAL_MERCHANTS = [
+NORMAL_MERCHANTS = np.array([
     "Starbucks", "Walmart", "Target", "Costco", "Whole Foods",
     "Shell Gas", "Chevron", "McDonald's", "Chipotle", "Safeway",
     "CVS Pharmacy", "Walgreens", "Home Depot", "Lowe's", "IKEA",
     "Nordstrom", "Macy's", "Gap", "H&M", "Trader Joe's"
-]
+], dtype=object)
 
-FRAUD_MERCHANTS = [
+FRAUD_MERCHANTS = np.array([
     "Casino Royal", "Bitcoin Exchange", "Crypto.com", "Luxury Cars Inc",
     "Electronics Warehouse", "Best Buy", "Apple Store", "Jewelry Palace"
-]
-
-# Generate users
-users = [f"user_{str(i).zfill(5)}" for i in range(NUM_USERS)]
-
-# Start date
-start_date = datetime(2025, 1, 1, 0, 0, 0)
-
-print(f"Generating {NUM_TRANSACTIONS:,} transactions...")
-
-with open(OUTPUT_FILE, 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['user_id', 'timestamp', 'merchant_name', 'amount'])
-
-    for i in range(NUM_TRANSACTIONS):
-        if i % 100_000 == 0:
-            print(f"  Progress: {i:,} / {NUM_TRANSACTIONS:,}")
-
-        user_id = random.choice(users)
-
-        # Random timestamp over ~300 days
-        days_offset = random.uniform(0, 300)
-        hours_offset = random.uniform(0, 24)
-        timestamp = start_date + timedelta(days=days_offset, hours=hours_offset)
-
-        # Inject fraud patterns (5% fraud rate)
-        is_fraud = random.random() < 0.05
-
-        if is_fraud:
-            fraud_type = random.choice(['velocity', 'high_value', 'nighttime', 'merchant_rep'])
-
-            if fraud_type == 'velocity':
-                # Velocity spike: 5 transactions in 10 minutes
-                base_time = timestamp
-                for j in range(5):
-                    merchant = random.choice(NORMAL_MERCHANTS)
-                    amount = round(random.uniform(50, 300), 2)
-                    txn_time = base_time + timedelta(minutes=j*2)
-                    writer.writerow([user_id, txn_time.strftime('%Y-%m-%d %H:%M:%S'), merchant, amount])
-                continue
-
-            elif fraud_type == 'high_value':
-                # High value anomaly
-                merchant = random.choice(FRAUD_MERCHANTS)
-                amount = round(random.uniform(2000, 10000), 2)
-
-            elif fraud_type == 'nighttime':
-                # Nighttime high value
-                night_hour = random.randint(2, 4)
-                timestamp = timestamp.replace(hour=night_hour)
-                merchant = random.choice(FRAUD_MERCHANTS)
-                amount = round(random.uniform(1000, 5000), 2)
-
-            elif fraud_type == 'merchant_rep':
-                # Merchant repetition: 7 transactions at same merchant in 1 hour
-                merchant = random.choice(NORMAL_MERCHANTS)
-                base_time = timestamp
-                for j in range(7):
-                    amount = round(random.uniform(5, 50), 2)
-                    txn_time = base_time + timedelta(minutes=j*8)
-                    writer.writerow([user_id, txn_time.strftime('%Y-%m-%d %H:%M:%S'), merchant, amount])
-                continue
+], dtype=object)
+
+# fraud_type -> rows per event. Index 0 is normal traffic.
+FRAUD_TYPES = ('normal', 'velocity', 'high_value', 'nighttime', 'merchant_rep')
+EVENT_ROWS = np.array([1, 5, 1, 1, 7])
+DEFAULT_FRAUD_MIX = {'velocity': 0.25, 'high_value': 0.25, 'nighttime': 0.25, 'merchant_rep': 0.25}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'velocity=0.5,high_value=0.5' -> weights; unknown types are an error."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_FRAUD_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown fraud type {name!r}, expected {list(DEFAULT_FRAUD_MIX)}")
+        mix[name.strip()] = float(weight)
+    if any(weight < 0 for weight in mix.values()) or not sum(mix.values()) > 0:
+        raise argparse.ArgumentTypeError(f"Fraud mix weights must be >= 0 with a positive total, got {text!r}")
+    return mix
+
+
+def generate_chunks(rows: int, users: int = NUM_USERS, seed: int = 0,
+                    fraud_rate: float = DEFAULT_FRAUD_RATE,
+                    fraud_mix: Optional[Dict[str, float]] = None,
+                    hot_users: float = 0.0, hot_share: float = 0.0,
+                    time_skew: float = 0.0, days: int = DEFAULT_DAYS,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield column chunks that add up to exactly rows rows.
+
+    Each chunk has user_id, timestamp (datetime64[s]), merchant_name,
+    amount, and the labels row_id, event_id and fraud_type. An event that
+    does not fit in a chunk continues in the next one, so only the end of
+    the file cuts an event short. hot_share of events go to the first
+    hot_users fraction of users. time_skew > 0 concentrates events
+    towards the end of the period.
+    """
+    rng = np.random.default_rng(seed)
+    mix = fraud_mix or DEFAULT_FRAUD_MIX
+    weights = np.array([1 - fraud_rate] + [fraud_rate * mix.get(t, 0.0) / sum(mix.values())
+                                           for t in FRAUD_TYPES[1:]])
+    mean_rows = float(weights @ EVENT_ROWS)
+    hot_count = max(int(users * hot_users), 1)
+    user_names = np.char.add('user_', np.char.zfill(np.arange(users).astype(str), 5)).astype(object)
+    period = days * 86_400
+
+    def events_covering(min_rows: int, first_event: int) -> Dict[str, np.ndarray]:
+        """Whole events adding up to at least min_rows rows, without row_id."""
+        kinds = rng.choice(len(FRAUD_TYPES), size=int(min_rows / mean_rows * 1.1) + 8, p=weights)
+        while EVENT_ROWS[kinds].sum() < min_rows:
+            kinds = np.concatenate([kinds, rng.choice(len(FRAUD_TYPES), size=len(kinds), p=weights)])
+        sizes = EVENT_ROWS[kinds]
+        events = int(np.searchsorted(np.cumsum(sizes), min_rows)) + 1
+        kinds, sizes = kinds[:events], sizes[:events]
+        total = int(sizes.sum())
+
+        users_of_event = rng.integers(0, users, size=events)
+        if hot_share > 0:
+            hot = rng.random(events) < hot_share
+            users_of_event[hot] = rng.integers(0, hot_count, size=int(hot.sum()))
+        position = rng.random(events) ** (1.0 / (1.0 + time_skew))
+        base = (position * period).astype(np.int64)
+        rep_merchant = rng.integers(0, len(NORMAL_MERCHANTS), size=events)
+
+        event = np.repeat(np.arange(events), sizes)
+        step = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        kind = kinds[event]
+
+        seconds = base[event].copy()
+        seconds += np.where(kind == 1, step * 120, 0)
+        seconds += np.where(kind == 4, step * 480, 0)
+        night = kind == 3
+        seconds[night] = (seconds[night] // 86_400) * 86_400 + \
+            rng.integers(2, 5, size=int(night.sum())) * 3600 + seconds[night] % 3600
+
+        merchant = NORMAL_MERCHANTS[rng.integers(0, len(NORMAL_MERCHANTS), size=total)]
+        fraud_merchant = (kind == 2) | night
+        merchant[fraud_merchant] = FRAUD_MERCHANTS[
+            rng.integers(0, len(FRAUD_MERCHANTS), size=int(fraud_merchant.sum()))]
+        merchant[kind == 4] = NORMAL_MERCHANTS[rep_merchant[event[kind == 4]]]
+
+        amount = np.clip(rng.lognormal(3.5, 1.0, size=total), 1.0, 500.0)
+        for code, low, high in ((1, 50, 300), (2, 2000, 10000), (3, 1000, 5000), (4, 5, 50)):
+            mask = kind == code
+            amount[mask] = rng.uniform(low, high, size=int(mask.sum()))
+
+        return {
+            'user_id': user_names[users_of_event[event]],
+            'timestamp': START + seconds.astype('timedelta64[s]'),
+            'merchant_name': merchant,
+            'amount': np.round(amount, 2),
+            'event_id': event.astype(np.int64) + first_event,
+            'fraud_type': np.array(FRAUD_TYPES, dtype=object)[kind],
+        }
+
+    produced = 0
+    next_event = 0
+    # Rows of the last chunk's final event that did not fit in it.
+    carried: Dict[str, np.ndarray] = {}
+    while produced < rows:
+        target = min(chunk_size, rows - produced)
+        pending = len(carried['event_id']) if carried else 0
+        if pending < target:
+            fresh = events_covering(target - pending, next_event)
+            next_event = int(fresh['event_id'][-1]) + 1
+            columns = ({name: np.concatenate([carried[name], fresh[name]]) for name in fresh}
+                       if carried else fresh)
         else:
-            # Normal transaction
-            merchant = random.choice(NORMAL_MERCHANTS)
+            columns = carried
+        carried = {name: values[target:] for name, values in columns.items()}
+        if not len(carried['event_id']):
+            carried = {}
+
+        chunk = {name: values[:target] for name, values in columns.items()}
+        chunk['row_id'] = np.arange(produced, produced + target, dtype=np.int64)
+        yield chunk
+        produced += target
+
+
+TRANSACTION_COLUMNS = ('user_id', 'timestamp', 'merchant_name', 'amount')
+LABEL_COLUMNS = ('row_id', 'event_id', 'fraud_type')
+
+
+class ChunkWriter:
+    """Appends column chunks to a CSV or Parquet file.
+
+    Uses pyarrow when it is installed; CSV falls back to NumPy string
+    formatting. Timestamps are written as 'YYYY-MM-DD HH:MM:SS'.
+    """
+
+    def __init__(self, path: str, columns: tuple, format: str) -> None:
+        self.path = path
+        self.columns = columns
+        self.format = format
+        self._writer = None
+        self._file = None
+        try:
+            import pyarrow  # noqa: F401
+            self._arrow = True
+        except ImportError:
+            if format == 'parquet':
+                raise SystemExit("Writing Parquet needs pyarrow: pip install pyarrow")
+            self._arrow = False
+
+    def write(self, chunk: Dict[str, np.ndarray]) -> None:
+        columns = {name: chunk[name] for name in self.columns}
+        if 'timestamp' in columns and self.format == 'csv':
+            text = np.datetime_as_string(columns['timestamp'], unit='s')
+            columns['timestamp'] = np.char.replace(text, 'T', ' ').astype(object)
+
+        if not self._arrow:
+            self._write_text(columns)
+            return
+
+        import pyarrow
+        table = pyarrow.table(columns)
+        if self._writer is None:
+            if self.format == 'parquet':
+                import pyarrow.parquet
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            else:
+                import pyarrow.csv
+                self._writer = pyarrow.csv.CSVWriter(
+                    self.path, table.schema,
+                    write_options=pyarrow.csv.WriteOptions(quoting_style='needed'))
+        self._writer.write_table(table)
+
+    def _write_text(self, columns: Dict[str, np.ndarray]) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'w')
+            self._file.write(",".join(self.columns) + "\n")
+        fields = []
+        for name in self.columns:
+            values = columns[name]
+            if values.dtype.kind == 'f':
+                fields.append(np.char.mod('%.2f', values))
+            else:
+                text = values.astype(str)
+                needs_quotes = np.char.find(text, ',') >= 0
+                fields.append(np.where(needs_quotes, np.char.add(np.char.add('"', text), '"'), text))
+        lines = fields[0]
+        for field in fields[1:]:
+            lines = np.char.add(np.char.add(lines, ','), field)
+        self._file.write("\n".join(lines.tolist()) + "\n")
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def generate(output: str, rows: int = NUM_TRANSACTIONS, labels: Optional[str] = None,
+             format: Optional[str] = None, **options) -> None:
+    """Write rows transactions to output and, if labels is given, their ground truth."""
+    format = format or ('parquet' if output.endswith('.parquet') else 'csv')
+    data = ChunkWriter(output, TRANSACTION_COLUMNS, format)
+    truth = ChunkWriter(labels, LABEL_COLUMNS, format) if labels else None
+    try:
+        for chunk in generate_chunks(rows, **options):
+            data.write(chunk)
+            if truth is not None:
+                truth.write(chunk)
+    finally:
+        data.close()
+        if truth is not None:
+            truth.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic transactions dataset.")
+    parser.add_argument("--rows", type=int, default=NUM_TRANSACTIONS, help="Exact number of transactions")
+    parser.add_argument("--users", type=int, default=NUM_USERS)
+    parser.add_argument("--seed", type=int, default=0, help="Same seed and options, --chunk-size included, give the same file")
+    parser.add_argument("--output", default=None, help=f"Output path (default: {OUTPUT_FILE})")
+    parser.add_argument("--labels", default=None,
+                        help="Ground-truth label file (default: <output stem>_labels.<ext>)")
+    parser.add_argument("--format", choices=("csv", "parquet"), default=None,
+                        help="Output format (default: from the output extension)")
+    parser.add_argument("--fraud-rate", type=float, default=DEFAULT_FRAUD_RATE,
+                        help="Fraction of events that are fraud patterns")
+    parser.add_argument("--fraud-mix", type=parse_mix, default=DEFAULT_FRAUD_MIX,
+                        help="Relative weights, e.g. velocity=0.4,high_value=0.2,nighttime=0.2,merchant_rep=0.2")
+    parser.add_argument("--hot-users", type=float, default=0.0,
+                        help="Fraction of users that are hot")
+    parser.add_argument("--hot-share", type=float, default=0.0,
+                        help="Fraction of events that go to hot users")
+    parser.add_argument("--time-skew", type=float, default=0.0,
+                        help="0 spreads events evenly; higher values pile them towards the end")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Length of the time period")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows generated and written per chunk")
+    args = parser.parse_args()
+
+    fmt = args.format or ('parquet' if (args.output or '').endswith('.parquet') else 'csv')
+    output = args.output or (OUTPUT_FILE if fmt == 'csv' else str(Path(OUTPUT_FILE).with_suffix('.parquet')))
+    labels = args.labels or str(Path(output).with_name(f"{Path(output).stem}_labels.{fmt}"))
+
+    print(f"Generating {args.rows:,} transactions...")
+    start = time.perf_counter()
+    generate(output, args.rows, labels=labels, format=fmt, users=args.users, seed=args.seed,
+             fraud_rate=args.fraud_rate, fraud_mix=args.fraud_mix, hot_users=args.hot_users,
+             hot_share=args.hot_share, time_skew=args.time_skew, days=args.days,
+             chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
 
-            # Normal amounts follow log-normal distribution
-            amount = round(random.lognormvariate(3.5, 1.0), 2)
-            amount = max(1.0, min(amount, 500.0))  # Cap at $500
+    print(f"\n✓ Generated {args.rows:,} transactions in {elapsed:.1f}s")
+    print(f"✓ Saved to {output}")
+    print(f"✓ Labels saved to {labels}")
+    print(f"✓ File size: {Path(output).stat().st_size / 1024 / 1024:.1f} MB")
 
-        writer.writerow([user_id, timestamp.strftime('%Y-%m-%d %H:%M:%S'), merchant, amount])
 
-print(f"\n✓ Generated {NUM_TRANSACTIONS:,} transactions")
-print(f"✓ Saved to {OUTPUT_FILE}")
-print(f"✓ File size: ~{NUM_TRANSACTIONS * 80 / 1024 / 1024:.1f} MB")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Stub Anthropic Messages API server for LLM checker tests."""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LINE = re.compile(r"^(\d+): user=(\S+), time=.*, amount=\$([\d.]+)$", re.MULTILINE)
+COMPACT_ROW = re.compile(r"^(\d+)\|-?\d+\|\d+\|([\d.]+)$", re.MULTILINE)
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class StubMessagesAPI(ThreadingHTTPServer):
+    """Flags every line over $1000. Sleeps latency seconds per request and fails the first failures.
+
+    count_tokens answers with the number of words and punctuation marks in the prompt.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.failures = failures
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts: list = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][0]['content']
+        if self.path.endswith("/count_tokens"):
+            self._reply(200, {"input_tokens": len(TOKEN.findall(prompt))})
+            return
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            fail = server.failures > 0
+            server.failures -= 1 if fail else 0
+        try:
+            time.sleep(server.latency)
+            if fail:
+                self._reply(500, {"type": "error", "error": {"type": "api_error", "message": "stub"}})
+                return
+            with server.lock:
+                server.prompts.append(prompt)
+            rows = [(i, amount) for i, _, amount in LINE.findall(prompt)] + COMPACT_ROW.findall(prompt)
+            indices = [int(i) for i, amount in rows if float(amount) > 1000]
+            text = json.dumps({"suspicious_indices": indices, "reason": "amount over $1000"})
+            self._reply(200, {
+                "id": "msg_stub", "type": "message", "role": "assistant", "model": body['model'],
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 1, "output_tokens": 1},
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _reply(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def serve(server: StubMessagesAPI) -> StubMessagesAPI:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test that model-based checkers only see users the cheap checkers flagged."""
+from typing import List
+from checker import ModelBasedChecker, Transaction, format_timestamp
+from duckdb_repository import DuckDBRepository
+from execution_engine import ExecutionEngine
+
+
+class RecordingModel(ModelBasedChecker):
+    """Flags nothing; records what the cascade forwarded. Costs 10 tokens per transaction."""
+
+    def __init__(self) -> None:
+        super().__init__("RecordingModel")
+        self.seen: List[List[Transaction]] = []
+
+    def initialize(self, historical_transactions=None, config=None) -> None:
+        pass
+
+    def estimate_tokens(self, transactions: List[Transaction]) -> int:
+        return 10 * len(transactions)
+
+    def predict(self, transactions: List[Transaction]):
+        self.seen.append(transactions)
+        return [(transactions[-1:], "model review", 0.6)]
+
+
+with DuckDBRepository() as repo:
+    repo.execute("""
+        CREATE TABLE transactions AS
+        SELECT
+            'user_' || (i % 50) AS user_id,
+            TIMESTAMP '2025-10-01 00:00:00' + INTERVAL (i * 3600) SECOND AS timestamp,
+            'Store ' || (i % 4) AS merchant_name,
+            CASE WHEN i IN (1203, 1207) THEN 750.0 WHEN i = 1211 THEN 1500.0 ELSE 20.0 + (i % 7) END AS amount
+        FROM range(2000) t(i)
+    """)
+    transactions = list(repo.fetch_items(
+        "SELECT user_id, strftime(timestamp, '%Y-%m-%d %H:%M:%S') AS timestamp, merchant_name, amount "
+        "FROM transactions ORDER BY timestamp"))
+    transactions = [Transaction(**row) for row in transactions]
+
+    engine = ExecutionEngine()
+    engine.configure_checkers()
+    model = RecordingModel()
+    engine.checkers.append(model)
+
+    flags = engine.execute_sql(repo)
+    forwarded = model.seen[-1]
+    users = {t.user_id for t in forwarded}
+    print(f"Cheap checkers flagged {users}; forwarded {len(forwarded)} of 2000 transactions")
+    assert users == {'user_3', 'user_7', 'user_11'}
+    assert len(forwarded) == 3, "each user transacts every 50 hours, so a day of context adds nothing"
+    assert any(f.checker_name == "RecordingModel" for f in flags)
+
+    engine.configure_cascade(context_seconds=5 * 24 * 3600)
+    engine.execute_sql(repo)
+    user_3 = [format_timestamp(t.timestamp) for t in model.seen[-1] if t.user_id == 'user_3']
+    print(f"Five days of context for user_3: {user_3}")
+    assert user_3 == ['2025-11-15 23:00:00', '2025-11-18 01:00:00', '2025-11-20 03:00:00']
+
+    engine.configure_cascade(max_users=1)
+    engine.execute(transactions)
+    assert {t.user_id for t in model.seen[-1]} == {'user_11'}, "the highest-confidence user goes first"
+
+    engine.configure_cascade(max_users=None, max_tokens=70, context_seconds=5 * 24 * 3600)
+    engine.execute_sql(repo)
+    print(f"Token cap 70: forwarded {len(model.seen[-1])} transactions")
+    assert len(model.seen[-1]) == 6, "two users with three transactions each fit in 70 tokens"
+
+    engine.configure_cascade()
+    model.seen.clear()
+    repo.execute("UPDATE transactions SET amount = 20.0")
+    engine.execute_sql(repo)
+    assert model.seen == [], "no flagged users, no model calls"
+    engine.shutdown()
+
+print("\n✓ Cascade forwards only flagged users to model checkers!")
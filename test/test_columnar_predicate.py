@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test columnar predicate evaluation matches per-row evaluation."""
+import random
+from checker import (
+    FieldPredicate,
+    AndPredicate,
+    OrPredicate,
+    NotPredicate,
+    Transaction
+)
+from checker.predicate_checker import transactions_to_columns
+
+random.seed(7)
+merchants = ["Starbucks", "Best Buy", "Bitcoin Exchange", "Casino Royal", "Apple Store", "Target"]
+transactions = [
+    Transaction(
+        f"user_{random.randint(1, 50):03d}",
+        f"2025-10-{random.randint(1, 28):02d} {random.randint(0, 23):02d}:00:00",
+        random.choice(merchants),
+        random.choice([1.0, 5.0, 10.0, round(random.uniform(1, 2000), 2)])
+    )
+    for _ in range(5000)
+]
+
+predicates = {
+    "amount > 500": FieldPredicate('amount', '>', 500),
+    "amount == 5.0": FieldPredicate('amount', '==', 5.0),
+    "merchant contains Bitcoin": FieldPredicate('merchant_name', 'contains', 'Bitcoin'),
+    "user_id >= user_025": FieldPredicate('user_id', '>=', 'user_025'),
+    "unknown operator": FieldPredicate('amount', '~', 1),
+    "nested": AndPredicate(
+        OrPredicate(
+            FieldPredicate('amount', '>', 1000),
+            FieldPredicate('merchant_name', 'contains', 'Casino')
+        ),
+        NotPredicate(FieldPredicate('user_id', '==', 'user_001'))
+    ),
+    "empty AND": AndPredicate(),
+    "empty OR": OrPredicate(),
+}
+
+columns = transactions_to_columns(transactions)
+for label, predicate in predicates.items():
+    mask = predicate.evaluate_columns(columns)
+    expected = [predicate.evaluate(txn) for txn in transactions]
+    assert mask.tolist() == expected, label
+    print(f"{label}: {int(mask.sum())} / {len(transactions)} match per-row result")
+
+print("\n✓ Columnar evaluation matches per-row evaluation")
@@ -0,0 +1,85 @@
+import sys
+import json
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test the queue-backed engine logging."""
+from engine_logging import BoundedQueueHandler, JsonFormatter
+from execution_engine import ExecutionEngine
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self.delay = delay
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.messages.append(record.getMessage())
+
+
+def log_burst(policy: str, count: int = 50):
+    target = SlowHandler(0.01)
+    handler = BoundedQueueHandler([target], queue_size=4, policy=policy)
+    logger = logging.getLogger(f"test_engine_logging.{policy}")
+    logger.propagate = False
+    logger.addHandler(handler)
+    start = time.perf_counter()
+    for i in range(count):
+        logger.warning("record %d", i)
+    elapsed = time.perf_counter() - start
+    handler.stop()
+    logger.removeHandler(handler)
+    return target, handler, elapsed
+
+
+target, handler, elapsed = log_burst('drop')
+assert handler.dropped > 0 and len(target.messages) + handler.dropped == 50
+assert elapsed < 0.2, f"dropping never waits on the slow handler: {elapsed:.3f}s"
+assert target.threads and "MainThread" not in target.threads, "records are written on the listener thread"
+
+target, handler, elapsed = log_burst('block')
+assert handler.dropped == 0
+assert target.messages == [f"record {i}" for i in range(50)], "blocking keeps every record, in order"
+
+try:
+    BoundedQueueHandler([], policy='spill')
+    raise AssertionError("unknown policies are rejected")
+except ValueError:
+    pass
+
+try:
+    raise RuntimeError("boom")
+except RuntimeError:
+    record = logging.LogRecord("x", logging.ERROR, __file__, 1, "failed %s", ("here",), sys.exc_info())
+entry = json.loads(JsonFormatter().format(record))
+assert entry['message'] == "failed here" and entry['level'] == "ERROR"
+assert "RuntimeError: boom" in entry['exc_info']
+
+with tempfile.TemporaryDirectory() as tmp:
+    log_file = Path(tmp) / "engine.log"
+    engine = ExecutionEngine(log_file=str(log_file), log_format='json')
+    engine.configure_checkers()
+    engine.execute([])
+    engine.shutdown()
+    engine.logger.info("after shutdown")
+    logging.shutdown()
+
+    lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+    messages = [line['message'] for line in lines]
+    assert "Shutting down execution engine" in messages, "shutdown drains the queue"
+    assert messages[-1] == "after shutdown", "records logged after shutdown are still written"
+
+    ExecutionEngine(log_file=str(log_file))
+    ExecutionEngine(log_file=str(log_file)).shutdown()
+    listeners = [t for t in threading.enumerate() if t.name.startswith("Thread") and t.daemon]
+    assert not listeners, "replacing an engine's logging stops its listener"
+
+print("\n✓ Engine logging goes through a bounded queue!")
@@ -0,0 +1,71 @@
+import sys
+import csv
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test consolidating overlapping flags per transaction."""
+import duckdb
+from checker import FraudFlag, Transaction
+from flag_store import FlagStore, combined_score
+from sinks import ConsolidatedSink, open_sink
+
+
+def txn(user: str, minute: int, amount: float) -> Transaction:
+    return Transaction(user, f"2025-10-29 10:{minute:02d}:00", "Best Buy", amount)
+
+
+# Every checker builds its own Transaction objects.
+flags = [
+    FraudFlag([txn("u1", 1, 700.0), txn("u2", 2, 1500.0)], "HighValueChecker", "over 500", 0.75),
+    FraudFlag([txn("u2", 2, 1500.0)], "VeryHighValueChecker", "over 1000", 0.85),
+    FraudFlag([txn("u1", 1, 700.0), txn("u1", 3, 20.0)], "VelocityChecker", "burst", 0.80),
+    FraudFlag([txn("u1", 1, 700.0)], "VelocityChecker", "burst", 0.80),
+    FraudFlag([txn("u1", 3, 20.0)], "VelocityChecker", "second burst", 0.60),
+]
+
+store = FlagStore()
+store.add_all(flags)
+assert len(store) == 3, "each transaction is stored once"
+assert store.flag_count == 5
+assert store.hit_count == 6, "a repeated hit on the same transaction counts once"
+
+u1 = store.get(txn("u1", 1, 700.0))
+assert [checker for checker, _, _ in u1.hits] == ["HighValueChecker", "VelocityChecker"]
+assert abs(u1.risk_score - (1 - 0.25 * 0.20)) < 1e-9
+
+burst = store.get(txn("u1", 3, 20.0))
+assert abs(burst.risk_score - 0.80) < 1e-9, "one checker counts once, at its highest confidence"
+assert combined_score([]) == 0.0
+assert txn("u9", 0, 1.0) not in store and txn("u2", 2, 1500.0) in store
+
+order = [(entry.transaction.user_id, entry.transaction.amount) for entry in store.entries()]
+assert order == [("u2", 1500.0), ("u1", 700.0), ("u1", 20.0)], "highest risk first"
+
+with tempfile.TemporaryDirectory() as tmp:
+    tmp = Path(tmp)
+
+    with ConsolidatedSink(str(tmp / "report.txt")) as sink:
+        sink.write_all(flags)
+    report = (tmp / "report.txt").read_text()
+    assert "Flagged transactions: 3 (6 checker hits from 5 patterns)" in report
+    assert "  [2] VeryHighValueChecker (0.85): over 1000\n" in report
+    assert report.count("u1 | 2025-10-29 10:01:00") == 1
+    assert "| $700.00 | risk 0.95 | hits 1, 3\n" in report
+
+    with open_sink(str(tmp / "report.csv"), consolidate=True) as sink:
+        sink.write_all(flags)
+    with open(tmp / "report.csv", newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3 and rows[1]["checkers"] == "HighValueChecker; VelocityChecker"
+    assert rows[1]["hit_count"] == "2"
+
+    with open_sink(str(tmp / "report.parquet"), consolidate=True) as sink:
+        sink.write_all(flags)
+    assert duckdb.sql(f"SELECT max(risk_score) FROM '{tmp / 'report.parquet'}'").fetchone()[0] == 0.9625
+
+    with open_sink(str(tmp / "empty.txt"), consolidate=True):
+        pass
+    assert (tmp / "empty.txt").read_text().endswith("No suspicious transactions found.\n")
+
+print("\n✓ Overlapping flags are consolidated per transaction!")
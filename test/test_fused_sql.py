@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test fused single-scan SQL execution against in-memory execution."""
+import csv
+import random
+import tempfile
+from execution_engine import ExecutionEngine
+from duckdb_repository import DuckDBRepository
+from main import load_transactions_from_csv
+
+random.seed(11)
+merchants = ["Starbucks", "Best Buy", "Bitcoin Exchange", "Crypto.com", "Casino Royal",
+             "Apple Store", "Electronics Warehouse", "Target"]
+
+with tempfile.TemporaryDirectory() as tmp:
+    csv_path = str(Path(tmp) / "transactions.csv")
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id', 'timestamp', 'merchant_name', 'amount'])
+        for i in range(2000):
+            writer.writerow([
+                f"user_{random.randint(1, 100):03d}",
+                f"2025-10-{1 + i // 96:02d} {(i // 4) % 24:02d}:{(i % 4) * 15:02d}:00",
+                random.choice(merchants),
+                random.choice([1.0, 5.0, 10.0, round(random.uniform(1, 2000), 2)])
+            ])
+
+    engine = ExecutionEngine(log_file=str(Path(tmp) / "engine.log"))
+    engine.configure_checkers()
+
+    with DuckDBRepository() as repo:
+        transactions = load_transactions_from_csv(csv_path, repo)
+        expected = engine.execute(transactions, repo=repo)
+        fused = engine.execute_sql(repo)
+
+    engine.shutdown()
+
+assert len(fused) == len(expected)
+for a, b in zip(expected, fused):
+    assert a.checker_name == b.checker_name
+    assert a.transactions == b.transactions, a.checker_name
+    print(f"{b.checker_name}: {b.transaction_count} transactions (matches in-memory path)")
+
+print("\n✓ Fused SQL scan matches per-checker execution")
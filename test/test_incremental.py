@@ -0,0 +1,64 @@
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test appending to a persistent store and re-checking only what new rows touch."""
+from duckdb_repository import DuckDBRepository
+from execution_engine import ExecutionEngine
+
+HEADER = "user_id,timestamp,merchant_name,amount\n"
+
+with tempfile.TemporaryDirectory() as tmp:
+    first = Path(tmp) / "day1.csv"
+    second = Path(tmp) / "day2.csv"
+    db_path = str(Path(tmp) / "fraud.duckdb")
+
+    rows = []
+    for u in range(10):
+        for i in range(6):
+            rows.append(f"user_{u},2025-10-01 10:{i:02d}:00,Store {i % 3},{25.0 + i}\n")
+    rows.append("user_3,2025-10-01 12:00:00,Bitcoin ATM,700.00\n")
+    first.write_text(HEADER + "".join(rows))
+
+    second.write_text(HEADER + "".join([
+        "user_1,2025-10-01 10:06:00,Casino Royale,800.00\n",
+        "user_1,2025-10-01 10:07:00,Store 0,30.00\n",
+        "user_new,2025-10-02 09:00:00,Target,45.00\n",
+    ]))
+
+    engine = ExecutionEngine()
+    engine.configure_checkers()
+
+    with DuckDBRepository(db_path) as repo:
+        print(f"Run 1 appended {repo.append_from_csv(str(first), 'transactions')} rows")
+        flags = engine.execute_incremental(repo)
+        users = {t.user_id for f in flags for t in f.transactions}
+        print(f"Run 1: {len(flags)} flags over users {sorted(users)}")
+        assert 'user_3' in users
+
+    with DuckDBRepository(db_path) as repo:
+        print(f"Run 2 appended {repo.append_from_csv(str(second), 'transactions')} rows")
+        flags = engine.execute_incremental(repo)
+        users = {t.user_id for f in flags for t in f.transactions}
+        print(f"Run 2: {len(flags)} flags over users {sorted(users)}")
+        for flag in flags:
+            print(f"  {flag.checker_name}: {flag.transaction_count} transactions")
+        assert users <= {'user_1', 'user_new'}, "only touched users are re-checked"
+
+        high_risk = [f for f in flags if f.checker_name == "CryptoMerchantChecker"]
+        assert [t.merchant_name for t in high_risk[0].transactions] == ["Casino Royale"]
+        velocity = [f for f in flags if f.checker_name == "VelocityChecker"]
+        assert velocity and all(t.user_id == 'user_1' for t in velocity[0].transactions)
+
+        total = repo.fetch_items("SELECT COUNT(*) AS n FROM transactions")[0]['n']
+        assert total == len(rows) + 3
+
+        assert engine.execute_incremental(repo) == [], "nothing new since the watermark"
+        leftovers = repo.fetch_items(
+            "SELECT table_name FROM duckdb_tables() WHERE table_name LIKE '\\_incr\\_%' ESCAPE '\\'")
+        assert leftovers == []
+
+    engine.shutdown()
+
+print("\n✓ Incremental runs only re-check users with new transactions!")
@@ -0,0 +1,93 @@
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test schema-pinned ingest of CSV, Parquet and JSONL files, globs and lists."""
+import duckdb
+from duckdb_repository import DuckDBRepository, TRANSACTION_SCHEMA, ingest_format
+
+csv_path = str(Path(__file__).parent.parent / "sample_transactions.csv")
+
+assert [ingest_format(p) for p in ("a.csv", "a.CSV.gz", "day.parquet", "a.jsonl", "a.ndjson.zst", "a")] == \
+       ['csv', 'csv', 'parquet', 'jsonl', 'jsonl', 'csv']
+
+with tempfile.TemporaryDirectory() as tmp:
+    conn = duckdb.connect()
+    conn.execute(f"CREATE TABLE source AS SELECT * FROM read_csv_auto('{csv_path}')")
+    conn.execute(f"""COPY (SELECT *, 'x' AS note, range AS wide_0, range * 2 AS wide_1
+                          FROM source, range(1) ORDER BY timestamp)
+                     TO '{tmp}/export.parquet' (FORMAT PARQUET)""")
+    conn.execute(f"COPY (SELECT * FROM source ORDER BY timestamp) TO '{tmp}/export.jsonl' (FORMAT JSON)")
+    conn.execute(f"""COPY (SELECT * FROM source ORDER BY timestamp LIMIT 6)
+                     TO '{tmp}/day-1.csv' (HEADER)""")
+    conn.execute(f"""COPY (SELECT * FROM source ORDER BY timestamp OFFSET 6)
+                     TO '{tmp}/day-2.csv' (HEADER)""")
+    with open(f"{tmp}/numeric_users.csv", "w") as f:
+        f.write("user_id,timestamp,merchant_name,amount\n1001,2025-10-29 10:00:00,Amazon,12\n")
+    conn.execute(f"""COPY (SELECT merchant_name, timestamp, user_id, amount FROM source ORDER BY timestamp)
+                     TO '{tmp}/reordered.csv' (HEADER)""")
+    conn.execute(f"""COPY (SELECT *, 100 + row_number() OVER (ORDER BY timestamp) AS row_id
+                           FROM source ORDER BY timestamp)
+                     TO '{tmp}/with_row_ids.csv' (HEADER)""")
+    conn.execute(f"""COPY (SELECT amount, 'x' AS note, * EXCLUDE (amount) FROM source ORDER BY timestamp)
+                     TO '{tmp}/extra.csv' (HEADER)""")
+    conn.execute(f"COPY (SELECT * EXCLUDE (amount) FROM source) TO '{tmp}/no_amount.csv' (HEADER)")
+
+    with DuckDBRepository() as repo:
+        repo.insert_from_csv(csv_path, "expected")
+        expected = repo.fetch_items("SELECT * EXCLUDE (row_id) FROM expected ORDER BY timestamp")
+
+        for table, paths in (("from_parquet", f"{tmp}/export.parquet"),
+                             ("from_jsonl", f"{tmp}/export.jsonl"),
+                             ("from_glob", f"{tmp}/day-*.csv"),
+                             ("from_reordered", f"{tmp}/reordered.csv"),
+                             ("from_extra", f"{tmp}/extra.csv"),
+                             ("from_list", [f"{tmp}/day-2.csv", f"{tmp}/day-1.csv"])):
+            count = repo.insert_from_files(paths, table)
+            columns = [row['column_name'] for row in repo.fetch_items(
+                f"SELECT column_name FROM duckdb_columns() WHERE table_name = '{table}'")]
+            assert count == len(expected), f"{table}: the count comes from the load itself"
+            assert columns == list(TRANSACTION_SCHEMA) + ["row_id"], f"{table}: only the schema is read"
+            rows = repo.fetch_items(f"SELECT * EXCLUDE (row_id) FROM {table} ORDER BY timestamp")
+            assert rows == expected, table
+            print(f"{table}: {count} rows")
+
+        first = repo.fetch_items("SELECT * EXCLUDE (row_id) FROM from_list ORDER BY row_id LIMIT 1")
+        assert first == expected[6:7], "rows are numbered in the order files are listed"
+
+        repo.insert_from_files(f"{tmp}/with_row_ids.csv", "own_ids")
+        own_ids = repo.fetch_items("SELECT row_id FROM own_ids ORDER BY timestamp")
+        assert [row['row_id'] for row in own_ids] == list(range(101, 101 + len(expected))), \
+            "a CSV with its own row_id column keeps it"
+
+        conn.execute(f"COPY (SELECT * FROM read_csv('{tmp}/with_row_ids.csv')) TO '{tmp}/ids.jsonl' (FORMAT JSON)")
+        repo.insert_from_files(f"{tmp}/ids.jsonl", "jsonl_ids")
+        assert repo.fetch_items("SELECT MIN(row_id) AS first FROM jsonl_ids")[0]['first'] != 101, \
+            "JSONL rows are numbered afresh"
+
+        repo.insert_from_files(f"{tmp}/numeric_users.csv", "numeric")
+        assert repo.fetch_items("SELECT typeof(user_id) AS t FROM numeric")[0]['t'] == 'VARCHAR', \
+            "ids that look numeric stay text"
+
+        assert repo.append_from_files(f"{tmp}/day-*.csv", "history") == len(expected)
+        assert repo.append_from_files(f"{tmp}/export.parquet", "history") == len(expected)
+        runs = repo.fetch_items("SELECT run_id, source FROM ingest_runs ORDER BY run_id")
+        assert [run['source'] for run in runs] == [f"{tmp}/day-*.csv", f"{tmp}/export.parquet"]
+
+        shards = repo.partition_files(f"{tmp}/export.parquet", f"{tmp}/shards", 2)
+        assert repo.insert_from_files(shards, "from_shards") == len(expected)
+
+        try:
+            repo.insert_from_files(f"{tmp}/no_amount.csv", "bad")
+            raise AssertionError("files without a schema column are rejected")
+        except ValueError as error:
+            assert "amount" in str(error), error
+
+        try:
+            repo.insert_from_files(csv_path, "bad", format='xlsx')
+            raise AssertionError("unknown formats are rejected")
+        except ValueError:
+            pass
+
+print("\n✓ Ingest reads CSV, Parquet and JSONL with a pinned schema!")
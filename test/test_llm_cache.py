@@ -0,0 +1,69 @@
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test the LLM response cache and its use by LLMChecker."""
+from checker import LLMResponseCache, Transaction
+from checker.llm_cache import cache_key
+
+print("Testing LLM response cache\n")
+
+assert cache_key("rows", "1", "model-a") != cache_key("rows", "2", "model-a")
+assert cache_key("rows", "1", "model-a") != cache_key("rows", "1", "model-b")
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = str(Path(tmp) / "llm_cache.sqlite")
+
+    with LLMResponseCache(path, max_memory_entries=2, max_disk_entries=3) as cache:
+        for i in range(5):
+            cache.put(f"k{i}", f"response {i}", latency=0.5)
+            time.sleep(0.01)
+        assert cache.get("k0") is None, "oldest entries are evicted past max_disk_entries"
+        assert cache.get("k2") == "response 2", "entries dropped from memory come back from disk"
+        print(f"Size eviction: {cache.stats()}")
+        assert cache.stats()['evictions'] == 2
+
+    with LLMResponseCache(path) as reopened:
+        assert reopened.get("k4") == "response 4", "entries survive a restart"
+        assert reopened.stats()['saved_seconds'] == 0.5
+
+    with LLMResponseCache(path, ttl=0.05) as short_lived:
+        short_lived.put("fresh", "value")
+        time.sleep(0.1)
+        assert short_lived.get("fresh") is None, "entries expire after ttl"
+        print(f"TTL eviction: {short_lived.stats()}")
+        assert short_lived.stats()['evictions'] >= 1
+
+try:
+    import anthropic  # noqa: F401
+except ImportError:
+    print("⚠️  Install the anthropic package to test LLMChecker caching")
+    sys.exit(0)
+
+from checker import LLMChecker
+from test.llm_stub import StubMessagesAPI, serve
+
+transactions = [
+    Transaction(f"user_{u}", f"2025-10-29 10:{i:02d}:00", "Store", 1500.0 if i == u else 30.0)
+    for u in range(6) for i in range(8)
+]
+
+server = serve(StubMessagesAPI(latency=0.1))
+cache = LLMResponseCache()
+checker = LLMChecker(api_key="test-key", base_url=server.base_url, max_chunk_tokens=300,
+                     cache=cache)
+
+first = checker.check(transactions)
+requests_after_first = len(server.prompts)
+second = checker.check(transactions)
+print(f"Checker: {requests_after_first} requests, then {len(server.prompts) - requests_after_first} "
+      f"on the repeat run; {cache.stats()}")
+assert len(server.prompts) == requests_after_first, "the repeat run is served from the cache"
+assert [[id(t) for t in f.transactions] for f in first] == [[id(t) for t in f.transactions] for f in second]
+assert cache.stats()['hits'] == requests_after_first
+assert cache.stats()['saved_seconds'] > 0
+server.shutdown()
+
+print("\n✓ LLM response cache test complete")
@@ -0,0 +1,55 @@
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test chunked, concurrent LLMChecker requests against a local stub Messages API."""
+try:
+    import anthropic  # noqa: F401
+except ImportError:
+    print("⚠️  Install the anthropic package to test the chunked LLM checker")
+    sys.exit(0)
+
+from checker import LLMChecker, Transaction
+from test.llm_stub import StubMessagesAPI, serve
+
+
+transactions = [
+    Transaction(f"user_{u:02d}", f"2025-10-29 10:{i:02d}:00", "Store",
+                2500.0 if (u * 7 + i) % 11 == 0 else 20.0 + i)
+    for i in range(12) for u in range(30)
+]
+expected = {id(t) for t in transactions if t.amount > 1000}
+
+print("Testing chunked LLM checker against a stub endpoint\n")
+
+server = serve(StubMessagesAPI(latency=0.2, failures=2))
+checker = LLMChecker(api_key="test-key", base_url=server.base_url, max_chunk_tokens=600,
+                     max_concurrency=3, max_retries=2, timeout=5.0, backoff=0.01)
+
+chunks = checker._chunk_transactions(transactions)
+print(f"{len(transactions)} transactions -> {len(chunks)} chunks")
+assert sorted(i for chunk in chunks for i in chunk) == list(range(len(transactions)))
+for chunk in chunks:
+    users = [transactions[i].user_id for i in chunk]
+    assert all(users.count(u) == sum(t.user_id == u for t in transactions) for u in set(users)), \
+        "a user's transactions stay in one chunk"
+
+start = time.perf_counter()
+flags = checker.check(transactions)
+elapsed = time.perf_counter() - start
+flagged = {id(t) for flag in flags for t in flag.transactions}
+print(f"{len(flags)} flags, {len(flagged)} transactions in {elapsed:.2f}s, "
+      f"max {server.max_in_flight} requests in flight")
+assert flagged == expected, "indices map back to the original transactions"
+assert server.max_in_flight <= 3
+assert elapsed < len(chunks) * 0.2, "chunks are sent concurrently"
+server.shutdown()
+
+slow = serve(StubMessagesAPI(latency=1.0))
+checker = LLMChecker(api_key="test-key", base_url=slow.base_url, max_retries=1,
+                     timeout=0.2, backoff=0.01)
+assert checker.check(transactions[:5]) == [], "timed out chunks give no flags"
+slow.shutdown()
+
+print("\n✓ Chunked LLM checker test complete")
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test the compact LLM prompt encoding against the verbose one."""
+from checker import LLMChecker, Transaction
+
+merchants = ["Starbucks", "Shell Gas Station", "Target", "Best Buy Electronics", "Whole Foods Market"]
+transactions = [
+    Transaction(f"user_{u:03d}", f"2025-10-29 {8 + i // 6:02d}:{(i * 7) % 60:02d}:{u % 60:02d}",
+                merchants[(u + i) % len(merchants)], 3000.0 if (u + i) % 17 == 0 else 12.5 + i)
+    for u in range(40) for i in range(10)
+]
+
+verbose = LLMChecker(encoding='verbose')
+compact = LLMChecker(encoding='compact')
+
+sample = compact._format_transactions(transactions[:4])
+print("Compact sample:\n" + sample + "\n")
+assert sample.splitlines()[0].startswith("merchants: 0=")
+assert sample.splitlines()[1] == "@user_000 2025-10-29 08:00:00"
+assert sample.splitlines()[3].split("|")[1] == "420", "rows carry seconds since the previous transaction"
+
+report = verbose.token_report(transactions)
+print(f"Estimated prompt tokens: {report}")
+assert report['compact'] < report['verbose'] * 0.6
+
+text = '{"suspicious_indices": [2, 0], "reason": "test"}'
+chunk = transactions[:4]
+flagged = compact._parse_llm_response(text, chunk)[0][0]
+assert flagged == [chunk[2], chunk[0]]
+
+try:
+    import anthropic  # noqa: F401
+except ImportError:
+    print("⚠️  Install the anthropic package to test compact prompts end to end")
+    sys.exit(0)
+
+from test.llm_stub import StubMessagesAPI, serve
+
+server = serve(StubMessagesAPI())
+counted = LLMChecker(api_key="test-key", base_url=server.base_url).token_report(transactions)
+print(f"Counted prompt tokens: {counted}")
+assert counted['method'] == 'count_tokens' and counted['compact'] < counted['verbose']
+
+expected = {id(t) for t in transactions if t.amount > 1000}
+for encoding in ('verbose', 'compact'):
+    checker = LLMChecker(api_key="test-key", base_url=server.base_url, encoding=encoding,
+                         max_chunk_tokens=2000)
+    chunks = checker._chunk_transactions(transactions)
+    flags = checker.check(transactions)
+    flagged = {id(t) for f in flags for t in f.transactions}
+    print(f"{encoding}: {len(chunks)} chunks, {len(flagged)} flagged")
+    assert flagged == expected
+server.shutdown()
+
+print("\n✓ Compact encoding test complete")
@@ -0,0 +1,72 @@
+import sys
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test per-checker metrics collection and export."""
+from checker import Transaction
+from duckdb_repository import DuckDBRepository
+from execution_engine import ExecutionEngine
+from metrics import MetricsRegistry
+
+registry = MetricsRegistry()
+with registry.measure('Grower', input_rows=10) as run:
+    block = bytearray(64 * 2**20)
+    for i in range(0, len(block), 4096):
+        block[i] = 1
+    run.flags = 2
+del block
+with registry.measure('Grower', input_rows=5):
+    pass
+with registry.measure('Quote"d', input_rows=1):
+    pass
+
+summary = registry.summary()
+assert list(summary) == ['Grower', 'Quote"d'], "checkers keep first-run order"
+assert summary['Grower']['runs'] == 2 and summary['Grower']['input_rows'] == 15
+assert summary['Grower']['flags'] == 2
+assert summary['Grower']['peak_rss_delta_bytes'] >= 32 * 2**20, \
+    f"a 64 MB allocation shows up as peak memory: {summary['Grower']['peak_rss_delta_bytes']}"
+assert registry.runs[0].wall_seconds > 0 and registry.runs[0].cpu_seconds > 0
+
+prometheus = registry.to_prometheus()
+assert "# TYPE fraud_checker_runs_total counter\n" in prometheus
+assert 'fraud_checker_runs_total{checker="Grower"} 2\n' in prometheus
+assert 'fraud_checker_input_rows_total{checker="Quote\\"d"} 1\n' in prometheus, "label values are escaped"
+
+csv_path = Path(__file__).parent.parent / "sample_transactions.csv"
+with tempfile.TemporaryDirectory() as tmp, DuckDBRepository() as repo:
+    tmp = Path(tmp)
+    repo.insert_from_csv(str(csv_path), "transactions")
+    row_count = repo.execute("SELECT COUNT(*) FROM transactions")
+
+    engine = ExecutionEngine(log_file=str(tmp / "engine.log"), max_workers=2)
+    engine.configure_checkers()
+    engine.configure_metrics(str(tmp / "metrics.prom"), str(tmp / "metrics.json"), profile_sql=True)
+    flags = engine.execute_sql(repo)
+    engine.execute([Transaction("user_1", "2025-10-29 10:00:00", "Starbucks", 900.0)])
+    engine.shutdown()
+
+    summary = json.loads((tmp / "metrics.json").read_text())
+    checkers = summary['checkers']
+    assert "FusedPredicateScan[5]" in checkers and "VelocityChecker" in checkers
+    assert checkers["VelocityChecker"]['runs'] == 2, "runs accumulate across execute calls"
+    assert checkers["HighValueChecker"]['input_rows'] == 1, "in-memory checkers count their transactions"
+    assert checkers["HighValueChecker"]['flags'] == 1
+    assert checkers["NighttimeChecker"]['input_rows'] == row_count + 1, \
+        "SQL checkers count their table, then the one in-memory transaction"
+    assert sum(c['flags'] for name, c in checkers.items() if name != "HighValueChecker") == len(flags)
+    assert checkers["FusedPredicateScan[5]"]['db_rows'] > 0, "rows fetched through the cursor are counted"
+
+    profiled = [run for run in summary['runs'] if run['profiles']]
+    assert profiled and all(run['checker'] != "HighValueChecker" for run in profiled), \
+        "only checkers that query DuckDB carry profiles"
+    assert all('query_name' in profile for run in profiled for profile in run['profiles'])
+    assert checkers["NighttimeChecker"]['duckdb_rows_scanned'] >= row_count
+
+    prometheus = (tmp / "metrics.prom").read_text()
+    assert 'fraud_checker_runs_total{checker="VelocityChecker"} 2' in prometheus
+    assert not (tmp / "metrics.prom.tmp").exists()
+
+print("\n✓ Checker metrics are recorded and exported!")
@@ -0,0 +1,50 @@
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test DuckDB resource settings and checking under a memory limit."""
+from duckdb_repository import DuckDBRepository, DuckDBSettings, parse_size
+from execution_engine import ExecutionEngine
+from sinks import open_sink
+from test.generate_large_dataset import generate
+
+assert parse_size("12GB") == 12 * 10 ** 9 and parse_size("1.5 GiB") == 3 * 2 ** 29
+assert parse_size("512MiB") == 2 ** 29 and parse_size("1000") == 1000
+try:
+    parse_size("lots")
+    raise AssertionError("unparseable sizes are rejected")
+except ValueError:
+    pass
+
+settings = DuckDBSettings("8GB", 4, "/scratch/spill")
+shares = [settings.share(4, index) for index in range(8)]
+assert shares[0].memory_limit == "2000000000B" and shares[0].threads == 1
+assert len({share.temp_directory for share in shares}) == 8, "each process spills on its own"
+assert DuckDBSettings().share(2, 0).memory_limit is None
+
+with tempfile.TemporaryDirectory() as tmp:
+    with DuckDBRepository(settings=DuckDBSettings("100MB", 1, f"{tmp}/spill")) as repo:
+        limits = repo.fetch_items("SELECT current_setting('memory_limit') AS memory, "
+                                  "current_setting('threads') AS threads, "
+                                  "current_setting('temp_directory') AS temp")[0]
+        assert limits == {'memory': "95.3 MiB", 'threads': 1, 'temp': f"{tmp}/spill"}, limits
+
+    csv_path = f"{tmp}/transactions.csv"
+    generate(csv_path, rows=200_000, users=2_000, seed=3)
+    engine = ExecutionEngine(log_file=f"{tmp}/engine.log")
+    engine.configure_checkers()
+
+    reports = []
+    for name, limits in (("default", None), ("limited", DuckDBSettings("96MB", 1, f"{tmp}/spill"))):
+        with DuckDBRepository(f"{tmp}/{name}.duckdb", limits) as repo, \
+                open_sink(f"{tmp}/{name}.txt", consolidate=True) as sink:
+            engine.attach_sink(sink)
+            repo.insert_from_csv(csv_path, "transactions")
+            flags = engine.execute_sql(repo)
+        reports.append(Path(f"{tmp}/{name}.txt").read_text())
+        print(f"{name}: {len(flags)} flags")
+    engine.shutdown()
+    assert reports[0] == reports[1], "a memory limit changes where DuckDB works, not what it finds"
+
+print("\n✓ DuckDB runs within its configured limits!")
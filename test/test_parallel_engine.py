@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test that the parallel checker scheduler matches sequential execution."""
+import tempfile
+import time
+from execution_engine import ExecutionEngine
+from duckdb_repository import DuckDBRepository
+from checker import FraudChecker, FraudFlag, TransactionBatch
+from sinks import open_sink
+
+
+class SlowChecker(FraudChecker):
+    """Finishes after every other checker, then flags the first transaction."""
+
+    def __init__(self) -> None:
+        super().__init__("SlowChecker")
+
+    def initialize(self, historical_transactions=None, config=None) -> None:
+        pass
+
+    def check(self, transactions):
+        time.sleep(0.5)
+        return [FraudFlag(transactions[:1], self.name, "slow review", 0.5)]
+
+
+with DuckDBRepository() as repo:
+    repo.execute("""
+        CREATE TABLE transactions AS
+        SELECT
+            'user_' || (i % 500) AS user_id,
+            TIMESTAMP '2025-10-01 00:00:00' + INTERVAL (i * 37) SECOND AS timestamp,
+            ['Starbucks', 'Best Buy', 'Bitcoin Exchange', 'Casino Royal', 'Target'][1 + (i // 500) % 5]
+                AS merchant_name,
+            CASE WHEN i % 89 = 0 THEN 2500.0 ELSE 1.0 + (i % 300) END AS amount
+        FROM range(200000) t(i)
+    """)
+    transactions = TransactionBatch.from_repo(repo)
+
+    results = {}
+    for workers in (1, 4):
+        engine = ExecutionEngine(max_workers=workers)
+        engine.configure_checkers()
+        start = time.perf_counter()
+        flags = engine.execute(transactions, repo=repo)
+        fused = engine.execute_sql(repo)
+        results[workers] = (flags, fused)
+        print(f"max_workers={workers}: {len(flags)} flags, {len(fused)} fused flags "
+              f"in {time.perf_counter() - start:.2f}s")
+        engine.shutdown()
+
+    # A sink receives flags in the same order whatever the number of workers.
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = {}
+        for workers in (1, 4):
+            engine = ExecutionEngine(max_workers=workers, log_file=f"{tmp}/engine.log")
+            engine.configure_checkers()
+            engine.checkers.insert(0, SlowChecker())
+            for name, consolidate in (("report.txt", True), ("per_checker.txt", False),
+                                      ("flags.jsonl", False)):
+                with open_sink(f"{tmp}/{workers}-{name}", consolidate=consolidate) as sink:
+                    engine.attach_sink(sink)
+                    engine.execute(transactions, repo=repo)
+                    engine.execute_sql(repo)
+                reports[workers, name] = Path(f"{tmp}/{workers}-{name}").read_text()
+            engine.shutdown()
+        for name in ("report.txt", "per_checker.txt", "flags.jsonl"):
+            assert reports[1, name] == reports[4, name], f"{name} differs between 1 and 4 workers"
+        print("Sink output is the same with 1 and 4 workers")
+
+
+def summary(flags):
+    return [(f.checker_name, f.reason, f.transactions) for f in flags]
+
+assert summary(results[1][0]) == summary(results[4][0])
+assert summary(results[1][1]) == summary(results[4][1])
+print("\n✓ Parallel execution returns the same flags in the same order")
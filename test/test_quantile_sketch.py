@@ -0,0 +1,118 @@
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test per-user quantile sketches and the approximate HighValueAnomalyChecker."""
+import numpy as np
+from checker import DDSketch, UserQuantileSketches, HighValueAnomalyChecker, SQLChecker, Transaction
+from duckdb_repository import DuckDBRepository
+from execution_engine import ExecutionEngine
+
+
+class FailingChecker(SQLChecker):
+    """Fails every run, after the sketches have been built."""
+
+    def __init__(self) -> None:
+        super().__init__("FailingChecker")
+
+    def check_with_repo(self, repo, table_name="transactions", plan=None):
+        raise RuntimeError("checker failed")
+
+
+rng = np.random.default_rng(7)
+values = rng.lognormal(3.0, 1.2, 20001)
+
+for accuracy in (0.05, 0.01, 0.001):
+    sketch = DDSketch(accuracy)
+    sketch.add_many(values)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = np.sort(values)[int(q * (len(values) - 1))]
+        estimate = sketch.quantile(q)
+        assert abs(estimate - exact) <= accuracy * exact + 1e-12, (accuracy, q, estimate, exact)
+    print(f"accuracy {accuracy}: {len(sketch.keys)} buckets, median {sketch.quantile(0.5):.3f} "
+          f"vs exact {np.median(values):.3f}")
+
+left, right, whole = DDSketch(), DDSketch(), DDSketch()
+left.add_many(values[:5000])
+right.add_many(values[5000:])
+whole.add_many(values)
+left.merge(right)
+assert left.count == whole.count and left.quantile(0.5) == whole.quantile(0.5)
+
+with DuckDBRepository() as repo:
+    repo.execute("""
+        CREATE TABLE transactions AS
+        SELECT
+            'user_' || (i % 25) AS user_id,
+            TIMESTAMP '2025-10-01 00:00:00' + INTERVAL (i * 37) SECOND AS timestamp,
+            'Merchant ' || (i % 9) AS merchant_name,
+            CASE WHEN i % 173 = 0 THEN 900.0 + i % 7 ELSE 10.0 + (i * 7919) % 90 END AS amount
+        FROM range(6000) t(i)
+    """)
+
+    exact = HighValueAnomalyChecker().check_with_repo(repo)
+    approx_checker = HighValueAnomalyChecker(approximate=True, relative_accuracy=0.01)
+    approx = approx_checker.check_with_repo(repo)
+    exact_txns = {(t.user_id, t.timestamp) for f in exact for t in f.transactions}
+    approx_txns = {(t.user_id, t.timestamp) for f in approx for t in f.transactions}
+    report = approx_checker.approximation_report(repo)
+    print(f"Exact: {len(exact_txns)} transactions, approximate: {len(approx_txns)}; report {report}")
+    assert report['exact_transactions'] == len(exact_txns)
+    assert report['approximate_transactions'] == len(approx_txns)
+    assert report['missed_transactions'] == len(exact_txns - approx_txns)
+    assert report['extra_transactions'] == len(approx_txns - exact_txns)
+
+    sketches = approx_checker.sketches
+    sketches.save(repo, 'amount_sketches')
+    loaded = UserQuantileSketches.load(repo, 'amount_sketches')
+    assert loaded.medians()['median_amount'].tolist() == sketches.medians()['median_amount'].tolist()
+
+with tempfile.TemporaryDirectory() as tmp:
+    csv_path = Path(tmp) / "day.csv"
+    csv_path.write_text("user_id,timestamp,merchant_name,amount\n" + "".join(
+        f"user_{i % 3},2025-10-01 10:{i:02d}:00,Store,{20.0 + i % 5}\n" for i in range(30)))
+    checker = HighValueAnomalyChecker(approximate=True, sketch_table='amount_sketches')
+    assert checker.incremental_scope() == 'rows'
+
+    with DuckDBRepository(str(Path(tmp) / "fraud.duckdb")) as repo:
+        repo.append_from_csv(str(csv_path), 'transactions')
+        assert checker.check_with_repo(repo) == []
+        assert not repo.table_exists('amount_sketches'), "sketches are saved only on commit"
+        checker.commit_state(repo)
+        repo.execute("CREATE TABLE new_rows AS SELECT * FROM (VALUES "
+                     "('user_1', TIMESTAMP '2025-10-01 11:00:00', 'Store', 500.0)) "
+                     "t(user_id, timestamp, merchant_name, amount)")
+        flags = checker.check_with_repo(repo, 'new_rows')
+        print(f"Incremental: {[f.reason for f in flags]}")
+        assert len(flags) == 1 and flags[0].transactions[0].amount == 500.0
+        checker.commit_state(repo)
+        assert UserQuantileSketches.load(repo, 'amount_sketches').count('user_1') == 11
+
+    # A failed incremental run leaves the saved sketches as they were, so the rerun counts rows once
+    engine = ExecutionEngine(log_file=str(Path(tmp) / "engine.log"))
+    engine.checkers = [HighValueAnomalyChecker(approximate=True, sketch_table='run_sketches'),
+                       FailingChecker()]
+    with DuckDBRepository(str(Path(tmp) / "incremental.duckdb")) as repo:
+        repo.append_from_csv(str(csv_path), 'transactions')
+        try:
+            engine.execute_incremental(repo)
+            raise AssertionError("the failing checker fails the run")
+        except RuntimeError:
+            pass
+        assert not repo.table_exists('run_sketches')
+        engine.checkers = engine.checkers[:1]
+        engine.execute_incremental(repo)
+        assert UserQuantileSketches.load(repo, 'run_sketches').count('user_1') == 10
+        assert engine.execute_incremental(repo) == []
+        assert UserQuantileSketches.load(repo, 'run_sketches').count('user_1') == 10
+    engine.shutdown()
+
+streaming = HighValueAnomalyChecker(approximate=True)
+batch = [Transaction('user_a', f'2025-10-01 10:0{i}:00', 'Store', 20.0) for i in range(5)]
+assert streaming.check(batch) == []
+flags = streaming.check([Transaction('user_a', '2025-10-01 10:09:00', 'Store', 300.0)])
+assert len(flags) == 1
+print(f"Streaming: {flags[0].reason}")
+
+print("\n✓ Quantile sketches stay within their error bound and drive approximate medians!")
@@ -0,0 +1,68 @@
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test that SQL checkers give identical flags with and without a shared QueryPlan."""
+from checker import (
+    VelocityChecker,
+    HighValueAnomalyChecker,
+    MerchantRepetitionChecker,
+    GeographicShiftChecker,
+    NighttimeChecker,
+    UnusualMerchantChecker
+)
+from duckdb_repository import DuckDBRepository
+from query_plan import QueryPlan
+
+with DuckDBRepository() as repo:
+    repo.execute("""
+        CREATE TABLE transactions AS
+        SELECT
+            'user_' || (i % 40) AS user_id,
+            TIMESTAMP '2025-10-01 00:00:00' + INTERVAL (i * 7 + (i % 13) * 60) SECOND AS timestamp,
+            CASE WHEN i % 211 = 0 THEN 'Rare Merchant ' || i
+                 ELSE ['Starbucks', 'Target', 'Casino', 'Shell'][1 + (i // 40) % 4] END AS merchant_name,
+            CASE WHEN i % 97 = 0 OR i % 211 = 0 THEN 2500.0 ELSE 5.0 + (i % 50) END AS amount
+        FROM range(5000) t(i)
+    """)
+
+    checkers = [
+        VelocityChecker(threshold=3),
+        GeographicShiftChecker(threshold=2),
+        MerchantRepetitionChecker(threshold=2),
+        HighValueAnomalyChecker(multiplier=3.0),
+        NighttimeChecker(min_amount=1000),
+        UnusualMerchantChecker(multiplier=2.0)
+    ]
+
+    standalone = {c.name: c.check_with_repo(repo) for c in checkers}
+
+    with QueryPlan(repo).build(checkers) as plan:
+        print(f"Shared relations: user_stats={plan.user_stats}, "
+              f"window hits={sorted(set(t for t, _ in (plan.window_hits(c) for c in checkers[:3])))}")
+        planned = {c.name: c.check_with_repo(repo, plan=plan) for c in checkers}
+
+    leftover = repo.fetch_items("SELECT table_name FROM duckdb_tables() WHERE table_name LIKE '_plan_%'")
+
+for checker in checkers:
+    a, b = standalone[checker.name], planned[checker.name]
+    assert [(f.reason, f.transactions) for f in a] == [(f.reason, f.transactions) for f in b], checker.name
+    print(f"{checker.name}: {len(b)} flags (identical with shared plan)")
+
+assert not leftover
+
+# Tables a crashed run left in a database file do not collide with the next run's
+with tempfile.TemporaryDirectory() as tmp:
+    with DuckDBRepository(f"{tmp}/fraud.duckdb") as repo:
+        repo.execute("CREATE TABLE transactions AS SELECT * FROM read_csv_auto('sample_transactions.csv')")
+        crashed = QueryPlan(repo).build(checkers)
+    with DuckDBRepository(f"{tmp}/fraud.duckdb") as repo:
+        expected = [(f.reason, f.transactions) for f in checkers[3].check_with_repo(repo)]
+        with QueryPlan(repo).build(checkers) as plan:
+            assert plan.user_stats != crashed.user_stats
+            flags = checkers[3].check_with_repo(repo, plan=plan)
+            assert [(f.reason, f.transactions) for f in flags] == expected
+        leftover = repo.fetch_items("SELECT table_name FROM duckdb_tables() WHERE table_name LIKE '_plan_%'")
+    assert len(leftover) == len(crashed._tables), "only the crashed plan's tables remain"
+print("\n✓ Shared plan matches standalone queries and cleans up its tables")
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test streaming and columnar fetch APIs on DuckDBRepository."""
+from duckdb_repository import DuckDBRepository
+
+query = "SELECT * FROM transactions ORDER BY user_id, timestamp"
+
+with DuckDBRepository() as repo:
+    repo.insert_from_csv('sample_transactions.csv', 'transactions')
+    expected = repo.fetch_items(query)
+
+    columns = repo.fetch_numpy(query)
+    print(f"fetch_numpy: {len(columns['amount'])} rows, columns {list(columns)}")
+    assert columns['amount'].tolist() == [row['amount'] for row in expected]
+
+    batches = list(repo.iter_batches(query, batch_size=4))
+    print(f"iter_batches(batch_size=4): {[len(b['user_id']) for b in batches]} rows per batch")
+    assert sum((b['user_id'].tolist() for b in batches), []) == [row['user_id'] for row in expected]
+
+    try:
+        table = repo.fetch_arrow(query)
+        print(f"fetch_arrow: {table.num_rows} rows, schema {table.schema.names}")
+    except ImportError:
+        print("fetch_arrow: pyarrow not installed, skipped")
+
+    pyarrow_module = sys.modules.get('pyarrow')
+    sys.modules['pyarrow'] = None  # force the fetchmany() fallback
+    try:
+        fallback = list(repo.iter_batches(query, batch_size=4))
+    finally:
+        if pyarrow_module is None:
+            del sys.modules['pyarrow']
+        else:
+            sys.modules['pyarrow'] = pyarrow_module
+    print(f"iter_batches without pyarrow: {[len(b['user_id']) for b in fallback]} rows per batch")
+    assert sum((b['merchant_name'].tolist() for b in fallback), []) == \
+           [row['merchant_name'] for row in expected]
+
+print("\n✓ Streaming APIs return the same rows as fetch_items")
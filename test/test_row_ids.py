@@ -0,0 +1,85 @@
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test row ids assigned at ingest and flags that refer to rows by id."""
+import numpy as np
+from checker import RowRefs, RowStore, TransactionBatch
+from duckdb_repository import DuckDBRepository
+from execution_engine import ExecutionEngine
+from flag_store import FlagStore
+from sinks import open_sink
+
+csv_path = str(Path(__file__).parent.parent / "sample_transactions.csv")
+
+with DuckDBRepository() as repo:
+    count = repo.insert_from_csv(csv_path, "transactions")
+    ids = repo.fetch_numpy("SELECT row_id FROM transactions")['row_id'].tolist()
+    assert ids == list(range(count)), "row ids follow file order"
+    repo.insert_from_csv(csv_path, "more_transactions")
+    more = repo.fetch_numpy("SELECT row_id FROM more_transactions")['row_id'].tolist()
+    assert more == list(range(count, 2 * count)), "row ids are unique across tables"
+
+    repo.execute("CREATE TABLE plain AS SELECT * EXCLUDE (row_id) FROM transactions")
+    assert repo.has_row_ids("transactions") and not repo.has_row_ids("plain")
+
+    engine = ExecutionEngine(max_workers=2)
+    engine.configure_checkers()
+    flags = engine.execute_sql(repo)
+    plain_flags = engine.execute_sql(repo, "plain")
+    batch_flags = engine.execute(TransactionBatch.from_repo(repo), repo=repo)
+    engine.shutdown()
+
+    assert all(isinstance(f.transactions, RowRefs) for f in flags + batch_flags)
+    assert all(isinstance(f.transactions, list) and f.row_ids is None for f in plain_flags)
+    assert [(f.checker_name, f.transactions) for f in flags] == \
+           [(f.checker_name, f.transactions) for f in plain_flags], "ids do not change what is flagged"
+
+    flagged_ids = np.concatenate([f.row_ids for f in flags + batch_flags])
+    assert len(repo.row_store) == len(np.unique(flagged_ids)) < len(flagged_ids), \
+        "a row flagged by several checkers is stored once"
+    txn = flags[0].transactions[0]
+    assert txn.row_id == flags[0].row_ids[0] and txn == list(flags[0].transactions)[0]
+
+    store = FlagStore()
+    store.add_all(flags)
+    plain_store = FlagStore()
+    plain_store.add_all(plain_flags)
+    assert len(store) == len(plain_store) and store.hit_count == plain_store.hit_count
+    assert [e.transaction for e in store.entries()] == [e.transaction for e in plain_store.entries()]
+    assert store.get(txn).transaction.row_id == txn.row_id
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, report in (("refs", flags), ("plain", plain_flags)):
+            with open_sink(f"{tmp}/{name}.txt", consolidate=False) as sink:
+                sink.write_all(report)
+        assert Path(f"{tmp}/refs.txt").read_text() == Path(f"{tmp}/plain.txt").read_text()
+
+with DuckDBRepository() as repo:
+    repo.append_from_csv(csv_path, "transactions")
+    repo.append_from_csv(csv_path, "transactions")
+    ids = repo.fetch_numpy("SELECT row_id FROM transactions ORDER BY ingest_run, row_id")['row_id']
+    assert ids.tolist() == list(range(2 * count)), "appends continue the numbering"
+
+row_store = RowStore()
+batch = TransactionBatch.from_columns({
+    'row_id': np.array([7, 3, 7]),
+    'user_id': ['u1', 'u2', 'u1'],
+    'timestamp': np.array(['2025-10-29T10:00:00'] * 3, dtype='datetime64[us]'),
+    'merchant_name': ['Amazon', 'Target', 'Amazon'],
+    'amount': [10.0, 20.0, 10.0],
+}, store=row_store)
+refs = batch.refs(np.array([0, 1, 2]))
+assert len(row_store) == 2 and refs.row_ids.tolist() == [7, 3, 7]
+assert [t.user_id for t in refs] == ['u1', 'u2', 'u1'] and refs[1:].row_ids.tolist() == [3, 7]
+for _ in range(RowStore.MAX_CHUNKS + 1):
+    row_store.add(batch)
+assert len(row_store) == 2, "adding stored rows again keeps one copy"
+try:
+    row_store.rows(np.array([4]))
+    raise AssertionError("unknown row ids are rejected")
+except KeyError:
+    pass
+
+print("\n✓ Flags refer to rows by id!")
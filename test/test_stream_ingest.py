@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test JSONL stream parsing and size/age based micro-batching."""
+import io
+import json
+import tempfile
+import time
+import duckdb
+from stream_ingest import read_jsonl, micro_batches
+from checker import Transaction, TransactionBatch
+from duckdb_repository import DuckDBRepository
+
+lines = [
+    json.dumps({"user_id": "user_001", "timestamp": f"2025-10-29 10:0{i}:00",
+                "merchant_name": "Starbucks", "amount": 5.0 + i})
+    for i in range(7)
+]
+lines.insert(3, "{not json")
+stream = io.StringIO("\n".join(lines) + "\n")
+
+transactions = list(read_jsonl(stream))
+print(f"Parsed {len(transactions)} transactions (1 malformed line skipped)")
+assert len(transactions) == 7
+assert transactions[0] == Transaction("user_001", "2025-10-29 10:00:00", "Starbucks", 5.0)
+
+# Stream and batch ingest read the same file the same way, and both refuse numeric timestamps
+records = [{"user_id": "user_002", "timestamp": stamp, "merchant_name": "Shell", "amount": 40.0}
+           for stamp in ("2025-10-29 10:00:00", "2025-10-29T10:01:00", "2025-10-29T10:02:00.250")]
+numeric = json.dumps(dict(records[0], timestamp=1761732000))
+with tempfile.TemporaryDirectory() as tmp:
+    path = Path(tmp) / "stream.jsonl"
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    with open(path) as source:
+        streamed = list(read_jsonl(source))
+    with DuckDBRepository() as repo:
+        repo.insert_from_files(str(path), "transactions")
+        batched = list(TransactionBatch.from_repo(repo))
+    assert streamed == batched and len(streamed) == 3, (streamed, batched)
+
+    path.write_text(numeric + "\n")
+    with open(path) as source:
+        assert list(read_jsonl(source)) == [], "numeric timestamps are skipped as malformed"
+    with DuckDBRepository() as repo:
+        try:
+            repo.insert_from_files(str(path), "transactions")
+            raise AssertionError("batch ingest rejects numeric timestamps")
+        except duckdb.Error:
+            pass
+print("Stream and batch JSONL ingest agree")
+
+sizes = [len(b) for b in micro_batches(transactions, max_size=3, max_age=60)]
+print(f"Size-closed batches: {sizes}")
+assert sizes == [3, 3, 1]
+
+
+def slow_source():
+    for txn in transactions[:4]:
+        yield txn
+    time.sleep(0.5)
+    for txn in transactions[4:]:
+        yield txn
+
+
+start = time.monotonic()
+arrivals = []
+for batch in micro_batches(slow_source(), max_size=100, max_age=0.1):
+    arrivals.append((len(batch), round(time.monotonic() - start, 1)))
+print(f"Age-closed batches (size, seconds): {arrivals}")
+assert [size for size, _ in arrivals] == [4, 3]
+assert arrivals[0][1] < 0.5
+
+print("\n✓ Stream ingestion batches by size and by age")
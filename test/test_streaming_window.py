@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test streaming window checkers against their SQL counterparts on a full replay."""
+from checker import (
+    Transaction,
+    TransactionBatch,
+    VelocityChecker,
+    GeographicShiftChecker,
+    MerchantRepetitionChecker,
+    StreamingVelocityChecker,
+    StreamingGeographicShiftChecker,
+    StreamingMerchantRepetitionChecker
+)
+from duckdb_repository import DuckDBRepository
+
+with DuckDBRepository() as repo:
+    repo.execute("""
+        CREATE TABLE transactions AS
+        SELECT
+            'user_' || (i % 200) AS user_id,
+            TIMESTAMP '2025-10-01 00:00:00'
+                + INTERVAL ((i // 200) * 300 * (1 + i % 7) + CAST(hash(i) % 1500 AS BIGINT)) SECOND AS timestamp,
+            ['Starbucks', 'Target', 'Casino', 'Shell', 'Walmart'][1 + CAST(hash(i * 7) % 5 AS BIGINT)] AS merchant_name,
+            1.0 + (i % 200) AS amount
+        FROM range(60000) t(i)
+    """)
+    replay = list(TransactionBatch.from_repo(repo))
+
+    pairs = [
+        (VelocityChecker(threshold=4), StreamingVelocityChecker(threshold=4)),
+        (GeographicShiftChecker(threshold=4), StreamingGeographicShiftChecker(threshold=4)),
+        (MerchantRepetitionChecker(time_window_hours=1, threshold=3),
+         StreamingMerchantRepetitionChecker(time_window_hours=1, threshold=3)),
+    ]
+
+    for sql_checker, streaming_checker in pairs:
+        expected = {sql_checker.get_group_key(f.transactions[0])
+                    for f in sql_checker.check_with_repo(repo)}
+
+        # Feed the stream in micro-batches of arrival (timestamp) order
+        arrival = sorted(replay, key=lambda t: t.timestamp)
+        flagged = set()
+        for start in range(0, len(arrival), 5000):
+            flagged |= {streaming_checker.get_group_key(f.transactions[0])
+                        for f in streaming_checker.check(arrival[start:start + 5000])}
+
+        assert flagged == expected, sql_checker.name
+        print(f"{sql_checker.name}: {len(expected)} keys flagged by both SQL and streaming replay")
+
+# A key is flagged once per burst: when its window drops back to the threshold
+# while it keeps trading, and when it goes quiet long enough to be dropped.
+checker = StreamingVelocityChecker(time_window_minutes=10, threshold=2)
+times = ["09:00", "09:01", "09:02", "09:03", "09:30", "09:31", "09:32", "12:00", "12:01", "12:02"]
+flags = []
+for time in times:
+    flags += checker.check([Transaction("user_1", f"2025-10-01 {time}:00", "Shell", 20.0)])
+    if time == "09:32":
+        flags += checker.check([Transaction("user_2", "2025-10-01 11:00:00", "Target", 5.0)])
+        assert "user_1" not in checker._windows and not checker.flagged_keys, "quiet keys are dropped"
+assert [f.transactions[0].user_id for f in flags] == ["user_1"] * 3, "each burst is flagged once"
+assert [len(f.transactions) for f in flags] == [3, 3, 3]
+assert set(checker._windows) == {"user_1", "user_2"}
+print(f"Bursting three times: {len(flags)} flags")
+
+# Another user's later event does not drop a window that is still within the allowed lateness
+for lateness, expected_sizes in ((None, [4]), (0, [])):
+    options = {} if lateness is None else {'allowed_lateness_us': lateness}
+    checker = StreamingVelocityChecker(time_window_minutes=10, threshold=3, **options)
+    flags = []
+    for user_id, time in (("A", "09:00"), ("A", "09:01"), ("B", "10:00"), ("A", "09:02"), ("A", "09:03")):
+        flags += checker.check([Transaction(user_id, f"2025-10-01 {time}:00", "Shell", 20.0)])
+    assert [len(f.transactions) for f in flags] == expected_sizes, lateness
+print("Interleaved users: A is flagged within the allowed lateness")
+
+print("\n✓ Streaming window state matches the SQL window queries")
@@ -0,0 +1,56 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test epoch-microsecond timestamps and time predicates."""
+import numpy as np
+from checker import (
+    Transaction, TransactionBatch, FieldPredicate, AndPredicate, PredicateBasedChecker,
+    to_micros, format_timestamp
+)
+from duckdb_repository import DuckDBRepository
+from stream_ingest import parse_transaction
+
+micros = to_micros("2025-10-29 02:30:00")
+assert micros == 1761705000000000
+for value in (micros, "2025-10-29T02:30:00", datetime(2025, 10, 29, 2, 30),
+              datetime(2025, 10, 29, 4, 30, tzinfo=timezone(timedelta(hours=2))),
+              np.datetime64("2025-10-29T02:30:00")):
+    assert Transaction("u1", value, "Amazon", 1.0).timestamp == micros, value
+assert format_timestamp(micros) == "2025-10-29 02:30:00"
+assert format_timestamp(micros + 5) == "2025-10-29 02:30:00.000005"
+txn = Transaction("u1", "2025-10-29 02:30:00", "Amazon", 1.0)
+assert txn.hour == 2 and isinstance(txn.timestamp, int)
+assert parse_transaction('{"user_id": "u1", "timestamp": "2025-10-29T02:30:00", '
+                         '"merchant_name": "Amazon", "amount": 1}') == txn
+
+night = AndPredicate(FieldPredicate('hour', '>=', 2), FieldPredicate('hour', '<', 5))
+assert night.to_sql() == "(HOUR(timestamp) >= 2 AND HOUR(timestamp) < 5)"
+after = FieldPredicate('timestamp', '>', datetime(2025, 10, 29, 12))
+assert after.to_sql() == "timestamp > TIMESTAMP '2025-10-29 12:00:00'"
+assert FieldPredicate('timestamp', '>', "2025-10-29 12:00:00").evaluate(
+    Transaction("u1", "2025-10-29 12:00:01", "Amazon", 1.0))
+
+csv_path = str(Path(__file__).parent.parent / "sample_transactions.csv")
+with DuckDBRepository() as repo:
+    repo.insert_from_csv(csv_path, "transactions")
+    batch = TransactionBatch.from_repo(repo)
+    rows = list(batch)
+    assert batch.column('timestamp').dtype == np.int64
+    assert [t.timestamp for t in rows] == batch.timestamp.tolist(), "no formatting on the way in"
+
+    for predicate in (night, after, FieldPredicate('hour', '==', 14),
+                      FieldPredicate('timestamp', 'contains', '10-29 1')):
+        in_memory = [t for t in rows if predicate.evaluate(t)]
+        columnar = batch.rows(np.flatnonzero(predicate.evaluate_columns(batch.columns())))
+        in_sql = repo.fetch_numpy(
+            f"SELECT epoch_us(timestamp) AS ts FROM transactions WHERE {predicate.to_sql()} "
+            "ORDER BY user_id, timestamp")['ts'].tolist()
+        assert in_memory == columnar and [t.timestamp for t in in_memory] == in_sql, predicate.to_sql()
+        print(f"{predicate.to_sql()}: {len(in_sql)} rows")
+
+    checker = PredicateBasedChecker("Afternoon", after, "after noon")
+    assert checker.check(rows) == checker.check(batch)
+
+print("\n✓ Timestamps stay typed until output!")
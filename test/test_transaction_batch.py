@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""Test columnar TransactionBatch against row-by-row materialization."""
+from checker import TransactionBatch, Transaction
+from duckdb_repository import DuckDBRepository
+from execution_engine import ExecutionEngine
+
+with DuckDBRepository() as repo:
+    repo.insert_from_csv('sample_transactions.csv', 'transactions')
+
+    batch = TransactionBatch.from_repo(repo, 'transactions')
+    rows = repo.fetch_items("SELECT * FROM transactions ORDER BY user_id, timestamp")
+    expected = [
+        Transaction(row['user_id'], str(row['timestamp']), row['merchant_name'], float(row['amount']))
+        for row in rows
+    ]
+
+print(f"Batch: {len(batch)} rows, {len(batch.user_id.values)} users, "
+      f"{len(batch.merchant_name.values)} merchants")
+print(f"Column dtypes: timestamp={batch.timestamp.dtype}, amount={batch.amount.dtype}, "
+      f"user codes={batch.user_id.codes.dtype}")
+print(f"First row view: {batch[0]}")
+
+assert list(batch) == expected
+assert list(TransactionBatch.from_transactions(expected)[:]) == expected
+print("✓ Row views match materialized Transactions")
+
+engine = ExecutionEngine()
+engine.configure_checkers()
+batch_flags = engine.execute(batch)
+list_flags = engine.execute(expected)
+engine.shutdown()
+
+assert [(f.checker_name, f.transactions) for f in batch_flags] == \
+       [(f.checker_name, f.transactions) for f in list_flags]
+print(f"✓ {len(batch_flags)} flags identical for batch and list input")